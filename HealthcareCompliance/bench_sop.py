@@ -0,0 +1,248 @@
+# bench_sop.py
+# End-to-end benchmark of the SOP compliance pipeline with local stand-ins for
+# Snowflake (stage + results table) and Cortex, so it runs anywhere:
+#
+#   python bench_sop.py --out bench.json            # full run, JSON report
+#   python bench_sop.py --quick                     # small sizes (smoke run)
+#   python bench_sop.py --baseline bench.json       # exit 1 if anything regressed
+#
+# Scenarios:
+#   pipeline   N synthetic SOPs x M sections: stage LIST/download (FakeStageSession),
+#              streaming parse, Cortex calls (FakeComplete: latency, failures, quota),
+#              results saved to SQLiteResultsStore; then an unchanged re-run
+#   dashboard  dashboard queries against results tables of growing size
+#
+# All data and fakes are seeded, and each scenario runs --repeat times with the
+# median of every metric reported. Metrics ending in _per_s are better higher,
+# _ms lower (max_ms is informational; changes under --min-delta-ms are ignored).
+import argparse
+import os
+import sys
+import time
+import zipfile
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from bench_common import add_common_args, pcts, rate, run  # noqa: E402
+from sop_compliance import (  # noqa: E402
+    PROMPT_FILE, SCORE_PROMPT_FILE, ComplianceEngine, FakeComplete, RateLimiter, SQLiteResultsStore,
+    StageSource, run_pipeline
+)
+from sop_compliance_fakes import FakeStageSession  # noqa: E402
+
+SCENARIOS = ["pipeline", "dashboard"]
+
+# ---------------------------
+# Synthetic SOPs
+# ---------------------------
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_DOCX_PARTS = {
+    "[Content_Types].xml":
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.'
+        'wordprocessingml.document.main+xml"/>'
+        '<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.'
+        'wordprocessingml.styles+xml"/></Types>',
+    "_rels/.rels":
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+        'officeDocument" Target="word/document.xml"/></Relationships>',
+    "word/_rels/document.xml.rels":
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+        'styles" Target="styles.xml"/></Relationships>',
+    "word/styles.xml":
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:styles xmlns:w="{_W_NS}">'
+        '<w:style w:type="paragraph" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+        '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/>'
+        '<w:basedOn w:val="Normal"/><w:pPr><w:outlineLvl w:val="0"/></w:pPr></w:style></w:styles>',
+}
+_WORDS = """batch record operator verify sign deviation calibration equipment cleaning training
+approval review sample label storage temperature log audit trail validation protocol""".split()
+
+def section_names(m):
+    return [f"Section {i:02d}" for i in range(1, m + 1)]
+
+def _para(text, style=None):
+    ppr = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f"<w:p>{ppr}<w:r><w:t xml:space=\"preserve\">{escape(text)}</w:t></w:r></w:p>"
+
+def _table(rows):
+    cells = "".join("<w:tr>" + "".join(f"<w:tc>{_para(c)}</w:tc>" for c in row) + "</w:tr>" for row in rows)
+    return f"<w:tbl>{cells}</w:tbl>"
+
+# Minimal .docx: title block, then per section a Heading 1, paragraphs and a small table
+def synthetic_sop(rng, doc_id, sections, paragraphs):
+    body = [_para(f"SOP-{doc_id:05d} Synthetic Procedure"), _para("Version: 1.0")]
+    for name in sections:
+        body.append(_para(name, "Heading1"))
+        for _ in range(paragraphs):
+            body.append(_para(" ".join(rng.choice(_WORDS) for _ in range(rng.randint(12, 30))).capitalize() + "."))
+        body.append(_table([["Step", "Owner"]] + [[str(k), rng.choice(["QA", "QC", "Production"])]
+                                                   for k in range(1, 4)]))
+    document = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document xmlns:w="{_W_NS}">'
+                f'<w:body>{"".join(body)}</w:body></w:document>')
+    return {"word/document.xml": document, **_DOCX_PARTS}
+
+def write_stage(folder, docs, sections, paragraphs, rng):
+    names = section_names(sections)
+    os.makedirs(os.path.join(folder, "sops"))
+    for i in range(docs):
+        path = os.path.join(folder, "sops", f"sop_{i:05d}.docx")
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+            for part, xml in synthetic_sop(rng, i, names, paragraphs).items():
+                zf.writestr(zipfile.ZipInfo(part, (2024, 1, 1, 0, 0, 0)), xml)
+    with open(os.path.join(folder, PROMPT_FILE), "w", encoding="utf-8") as f:
+        f.writelines(f"{n}(\nDoes the {n.lower()} describe who does what, with numbered steps?\n)\n\n" for n in names)
+    with open(os.path.join(folder, SCORE_PROMPT_FILE), "w", encoding="utf-8") as f:
+        f.writelines(f"{n}(\nRate the findings as Critical, Major or Minor.\n)\n\n" for n in names)
+
+# ---------------------------
+# Instrumented pieces
+# ---------------------------
+# Engine that records each section's wall time (analysis + scoring, limiter waits, retries)
+class TimedEngine(ComplianceEngine):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.section_seconds = []
+
+    def analyze_section(self, *args):
+        started = time.perf_counter()
+        row = super().analyze_section(*args)
+        with self.lock:
+            self.section_seconds.append(time.perf_counter() - started)
+        return row
+
+# SQLite results table with a simulated network round trip per statement
+class RemoteStore(SQLiteResultsStore):
+    def __init__(self, path, latency=0.0):
+        super().__init__(path)
+        self.latency = latency
+
+    def _query(self, sql, params=None):
+        time.sleep(self.latency)
+        return super()._query(sql, params)
+
+    def upsert(self, rows, delete=()):
+        time.sleep(self.latency)
+        return super().upsert(rows, delete)
+
+# ---------------------------
+# Scenarios
+# ---------------------------
+def bench_pipeline(args, workdir, rng):
+    stage_dir = os.path.join(workdir, "stage")
+    write_stage(stage_dir, args.docs, args.sections, args.paragraphs, rng)
+    fake = FakeComplete(latency=args.latency, jitter=args.latency / 2, failure_rate=args.failure_rate,
+                        seed=args.seed, rpm=args.quota_rpm)
+    limiter = RateLimiter(args.rpm, burst=args.section_workers) if args.rpm else None
+    engine = TimedEngine(fake, limiter, args.section_workers, args.document_workers, mode=args.mode)
+    store = RemoteStore(os.path.join(workdir, "results.db"), args.store_latency)
+    session = FakeStageSession(stage_dir, args.stage_latency)
+    download_dir = os.path.join(workdir, "downloads")
+
+    def run():
+        source = StageSource(session, "@bench_stage", download_dir)
+        return run_pipeline(source, engine.analyze_documents, previous_for=store.load, save=store.save,
+                            download_workers=args.download_workers, log=None)
+
+    started = time.perf_counter()
+    first = run()
+    elapsed = time.perf_counter() - started
+    calls = fake.calls
+    started = time.perf_counter()
+    rerun = run()
+    rerun_elapsed = time.perf_counter() - started
+    return {
+        "documents": first["documents"],
+        "sections": first["sections"],
+        "documents_per_s": rate(first["documents"], elapsed),
+        "sections_per_s": rate(first["sections"], elapsed),
+        **pcts(engine.section_seconds, "section_"),
+        "completions": calls,
+        "throttled": fake.throttled,
+        "failed_sections": sum(1 for r in store._query("SELECT severity FROM sop_compliance_results")
+                               if r["severity"] == "Error"),
+        "rerun_ms": round(rerun_elapsed * 1000, 1),
+        "rerun_completions": fake.calls - calls,
+        "rerun_downloads": rerun["downloaded"],
+    }
+
+def fill_results(store, rows, sections, rng):
+    names = section_names(sections)
+    start = datetime(2024, 1, 1)
+    batch = []
+    for i in range(rows):
+        doc, section = divmod(i, sections)
+        severity = rng.choice(["Minor", "Major", "Critical"])
+        ts = (start + timedelta(minutes=doc, seconds=section)).isoformat()
+        batch.append((f"sop_{doc:06d}.docx", names[section], "prompt", severity,
+                      {"Minor": 1, "Major": 2, "Critical": 3}[severity], "analysis " * 40, ts, "h", "p"))
+        if len(batch) == 5000:
+            store.upsert(batch)
+            batch = []
+    if batch:
+        store.upsert(batch)
+
+def bench_dashboard(args, workdir, rng):
+    out = {}
+    for rows in [int(n) for n in args.table_rows.split(",")]:
+        store = SQLiteResultsStore(os.path.join(workdir, f"results_{rows}.db"))
+        fill_results(store, rows, args.sections, rng)
+        docs = max(1, rows // args.sections)
+        pages = max(1, -(-docs // 25))
+        queries = {
+            "version": lambda: store.version(),
+            "latest": lambda: store.latest_document(),
+            "count": lambda: store.document_count(""),
+            "page_first": lambda: store.document_summaries(25, 0),
+            "page_last": lambda: store.document_summaries(25, (pages - 1) * 25),
+            "search": lambda: store.document_summaries(25, 0, "sop_0001"),
+            "sections": lambda: store.document_sections(f"sop_{rng.randrange(docs):06d}.docx"),
+        }
+        for name, query in queries.items():
+            query()  # warm-up: first call pays for page cache and statement compilation
+            seconds = []
+            for _ in range(args.query_repeats):
+                t = time.perf_counter()
+                query()
+                seconds.append(time.perf_counter() - t)
+            out.update({f"{name}_{rows}_{k}": v for k, v in pcts(seconds).items() if not k.startswith("max")})
+        store.close()
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline end-to-end benchmark of the SOP compliance pipeline.")
+    add_common_args(ap, SCENARIOS)
+    ap.add_argument("--docs", type=int, default=30)
+    ap.add_argument("--sections", type=int, default=8, help="sections per document (all prompted)")
+    ap.add_argument("--paragraphs", type=int, default=6, help="paragraphs per section")
+    ap.add_argument("--mode", choices=["two_pass", "structured"], default="structured")
+    ap.add_argument("--latency", type=float, default=0.25, help="mean seconds per fake Cortex call")
+    ap.add_argument("--failure-rate", type=float, default=0.02)
+    ap.add_argument("--quota-rpm", type=int, default=1500, help="fake server quota (429 above it)")
+    ap.add_argument("--rpm", type=int, default=1200, help="client-side limiter (CORTEX_RPM)")
+    ap.add_argument("--section-workers", type=int, default=8)
+    ap.add_argument("--document-workers", type=int, default=4)
+    ap.add_argument("--download-workers", type=int, default=8)
+    ap.add_argument("--stage-latency", type=float, default=0.05, help="seconds per stage LIST/GET")
+    ap.add_argument("--store-latency", type=float, default=0.02, help="seconds per results-table round trip")
+    ap.add_argument("--table-rows", default="1000,20000,100000", help="results table sizes for dashboard queries")
+    ap.add_argument("--query-repeats", type=int, default=30)
+    args = ap.parse_args(argv)
+    if args.quick:
+        args.docs, args.sections, args.latency = min(args.docs, 8), min(args.sections, 6), 0.05
+        args.table_rows = "1000,10000"
+
+    return run(ap, args, {"pipeline": bench_pipeline, "dashboard": bench_dashboard}, "sop_compliance", HERE)
+
+if __name__ == "__main__":
+    sys.exit(main())
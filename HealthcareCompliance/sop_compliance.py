@@ -0,0 +1,1014 @@
+# sop_compliance.py
+# SOP compliance analysis engine used by SOP_Compliance.ipynb.
+# Pure Python: Snowflake is only imported when the Cortex backend is used, so the
+# pipeline can run and be benchmarked offline with FakeComplete.
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import zipfile
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from xml.etree import ElementTree
+
+CORTEX_MODEL = os.getenv("CORTEX_MODEL", "claude-3-5-sonnet")
+# Max in-flight completions (all documents share them) and documents analyzed at once
+SECTION_WORKERS = int(os.getenv("SOP_SECTION_WORKERS", "8"))
+DOCUMENT_WORKERS = int(os.getenv("SOP_DOCUMENT_WORKERS", "4"))
+CORTEX_RPM = int(os.getenv("CORTEX_RPM", "120"))  # 0 disables rate limiting
+CORTEX_RETRIES = int(os.getenv("CORTEX_RETRIES", "2"))
+# "two_pass" (analysis call + scoring call), "structured" (one JSON call per section)
+# or "sql" (one set-based COMPLETE statement in the warehouse for every section)
+ANALYSIS_MODE = os.getenv("SOP_ANALYSIS_MODE", "two_pass")
+BATCH_TABLE = os.getenv("SOP_BATCH_TABLE", "sop_prompt_batch")
+# Bulk ingestion: stage to scan, parallel downloads, and where downloaded files are kept
+SOP_STAGE = os.getenv("SOP_STAGE", "@my_stage")
+DOWNLOAD_WORKERS = int(os.getenv("SOP_DOWNLOAD_WORKERS", "8"))
+DOWNLOAD_DIR = os.getenv("SOP_DOWNLOAD_DIR", "temp_stage_files")
+PROMPT_FILE = os.getenv("SOP_PROMPT_FILE", "gxP_prompts.txt")
+SCORE_PROMPT_FILE = os.getenv("SOP_SCORE_PROMPT_FILE", "score_prompts.txt")
+DOC_EXTENSIONS = (".docx",)
+
+RESULTS_TABLE = os.getenv("SOP_RESULTS_TABLE", "sop_compliance_results")
+RESULTS_BACKEND = os.getenv("SOP_RESULTS_BACKEND", "snowflake")  # snowflake | sqlite
+RESULTS_DB_PATH = os.getenv("SOP_RESULTS_DB", "sop_compliance_results.db")  # sqlite backend
+UPSERT_BATCH_ROWS = int(os.getenv("SOP_UPSERT_BATCH_ROWS", "200"))  # rows per MERGE statement
+# Result row layout (sop_compliance_results); the hashes drive incremental re-analysis
+RESULT_COLUMNS = [
+    "document_name", "section", "issue", "severity", "score", "ai_response", "timestamp",
+    "section_hash", "prompt_hash"
+]
+SEVERITY_SCORES = {"Critical": 3, "Major": 2, "Minor": 1}
+# JSON schema for the single-pass analysis + scoring result
+RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "analysis": {"type": "string"},
+        "severity": {"type": "string", "enum": list(SEVERITY_SCORES)},
+        "score": {"type": "integer", "minimum": 1, "maximum": 3},
+    },
+    "required": ["analysis", "severity", "score"],
+}
+
+SECTION_HEADINGS = [
+    "Revision History", "Introduction", "Purpose", "Scope",
+    "Responsibilities", "Definitions", "Procedure", "References", "Approvals"
+]
+
+# ---------------------------
+# Streaming DOCX section parser
+# ---------------------------
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_HEADING_STYLE_RE = re.compile(r"^heading\s*(\d)$", re.IGNORECASE)
+_NUMBERING_RE = re.compile(r"^(?:#+\s*|section\s+\d+[.:]?\s*|\d+(?:\.\d+)*[.)]?\s+)", re.IGNORECASE)
+_CANONICAL_HEADINGS = {h.lower(): h for h in SECTION_HEADINGS}
+
+# styleId -> outline level (0 = Heading 1) for heading styles: the style's own outlineLvl,
+# its "heading N" name, or the level of the heading style it is basedOn
+def _heading_styles(zf):
+    try:
+        root = ElementTree.fromstring(zf.read("word/styles.xml"))
+    except KeyError:
+        return {}
+    info = {}
+    for style in root.iter(_W + "style"):
+        style_id = style.get(_W + "styleId")
+        name = style.find(_W + "name")
+        based = style.find(_W + "basedOn")
+        outline = style.find(f"{_W}pPr/{_W}outlineLvl")
+        info[style_id] = (
+            name.get(_W + "val") if name is not None else style_id,
+            based.get(_W + "val") if based is not None else None,
+            _outline_level(outline),
+        )
+
+    def level(style_id, depth=0):
+        if style_id not in info or depth > 10:
+            return None
+        name, based, outline = info[style_id]
+        if outline is not None:
+            return outline
+        match = _HEADING_STYLE_RE.match(name)
+        if match:
+            return int(match.group(1)) - 1
+        return level(based, depth + 1) if based else None
+    levels = {style_id: level(style_id) for style_id in info}
+    return {style_id: lvl for style_id, lvl in levels.items() if lvl is not None}
+
+# <w:outlineLvl w:val="N"/> -> N; 9 means body text
+def _outline_level(el):
+    if el is None:
+        return None
+    try:
+        lvl = int(el.get(_W + "val"))
+    except (TypeError, ValueError):
+        return None
+    return lvl if lvl < 9 else None
+
+def _paragraph_text(p):
+    parts = []
+    for el in p.iter():
+        if el.tag == _W + "t":
+            parts.append(el.text or "")
+        elif el.tag == _W + "tab":
+            parts.append("\t")
+        elif el.tag in (_W + "br", _W + "cr"):
+            parts.append("\n")
+    return "".join(parts).strip()
+
+# "## 2. Purpose:" -> "Purpose"; known headings get their canonical spelling
+def normalize_heading(text):
+    name = _NUMBERING_RE.sub("", text.strip()).strip().rstrip(":").strip()
+    return _CANONICAL_HEADINGS.get(name.lower(), name)
+
+# Yield (section, text) for each section as soon as it ends, reading word/document.xml
+# incrementally and discarding each block once handled. A new section starts at "##" lines,
+# the known SECTION_HEADINGS, and top-level headings (Heading 1 / outline level 0); lower
+# headings such as "5.1 Sample receipt" stay in the current section as text, so prompts
+# see them. Table rows become "cell | cell | ..." lines in the section they appear in.
+def iter_sections(doc_path):
+    with zipfile.ZipFile(doc_path) as zf:
+        heading_styles = _heading_styles(zf)
+        with zf.open("word/document.xml") as xml:
+            current, lines = "Header", []
+            body, p_depth, table_depth, row, cell = None, 0, 0, [], []
+            for event, el in ElementTree.iterparse(xml, events=("start", "end")):
+                tag = el.tag
+                if event == "start":
+                    if tag == _W + "p":
+                        p_depth += 1
+                    elif tag == _W + "tbl":
+                        table_depth += 1
+                    elif tag == _W + "body":
+                        body = el
+                    continue
+                if tag == _W + "p":
+                    p_depth -= 1
+                    if p_depth:
+                        continue  # text box paragraph: read with its outer paragraph
+                    text = _paragraph_text(el)
+                    if table_depth:
+                        if text:
+                            cell.append(text)
+                        continue
+                    style = el.find(f"{_W}pPr/{_W}pStyle")
+                    level = _outline_level(el.find(f"{_W}pPr/{_W}outlineLvl"))
+                    if level is None and style is not None:
+                        level = heading_styles.get(style.get(_W + "val"))
+                    if body is not None:
+                        body.clear()  # everything before this point has been consumed
+                    if not text:
+                        continue
+                    if text.startswith("##") or level == 0 or normalize_heading(text) in SECTION_HEADINGS:
+                        yield current, "\n".join(lines)
+                        current, lines = normalize_heading(text), []
+                    else:
+                        lines.append(text)
+                elif tag == _W + "tc" and table_depth == 1:
+                    row.append(" ".join(cell))
+                    cell = []
+                elif tag == _W + "tr" and table_depth == 1:
+                    if any(row):
+                        lines.append(" | ".join(row))
+                    row = []
+                elif tag == _W + "tbl":
+                    table_depth -= 1
+                    if not table_depth and body is not None:
+                        body.clear()
+            yield current, "\n".join(lines)
+
+# Parse SOP document into sections
+def parse_document(doc_path):
+    return dict(iter_sections(doc_path))
+
+# Load prompts from file with section headers
+def load_prompts(prompt_path):
+    with open(prompt_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    pattern = r"([\w\s]+)\s*\(\s*(.*?)\s*\)"
+    matches = re.findall(pattern, content, re.DOTALL)
+    return {section.strip(): prompt.strip() for section, prompt in matches}
+
+# ---------------------------
+# LLM backends: any callable (prompt, schema=None) -> str
+# ---------------------------
+# Snowflake Cortex COMPLETE through a Snowpark session; a schema turns on structured output
+def cortex_complete_fn(session, model=CORTEX_MODEL):
+    from snowflake.cortex import complete
+
+    def complete_fn(prompt, schema=None):
+        if schema is None:
+            return complete(model=model, prompt=prompt, session=session)
+        options = {"temperature": 0, "response_format": {"type": "json", "schema": schema}}
+        return complete(model=model, prompt=prompt, options=options, session=session)
+    return complete_fn
+
+# Offline stand-in with simulated latency and failures (deterministic per prompt).
+# rpm > 0 adds a server-side quota: calls beyond rpm/60 in one second fail fast with 429.
+class FakeComplete:
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0, rpm=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.prompt_chars = 0
+        self.per_second = -(-rpm // 60) if rpm else 0
+        self.window = (0, 0)  # (second, calls admitted in it)
+        self.throttled = 0
+
+    def __call__(self, prompt, schema=None):
+        with self.lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+            fail = self.rng.random() < self.failure_rate
+            if self.per_second:
+                second = int(time.monotonic())
+                admitted = self.window[1] if self.window[0] == second else 0
+                if admitted >= self.per_second:
+                    self.throttled += 1
+                    fail, delay = True, delay / 4
+                else:
+                    self.window = (second, admitted + 1)
+        time.sleep(delay)
+        if fail:
+            raise RuntimeError("simulated 429 Too Many Requests")
+        level = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16) % 3
+        severity = ["Minor", "Major", "Critical"][level]
+        if schema is not None:
+            return json.dumps({"analysis": f"The section was reviewed against the checklist. "
+                                           f"Findings: {severity.lower()} gaps noted.",
+                               "severity": severity, "score": level + 1})
+        if prompt.startswith("AI Response:"):
+            return f"Severity: {severity}\nScore: {level + 1}"
+        return f"The section was reviewed against the checklist. Findings: {severity.lower()} gaps noted."
+
+# ---------------------------
+# Rate limiting
+# ---------------------------
+# Thread-safe token bucket shared by every worker calling the same backend
+class RateLimiter:
+    def __init__(self, rate_per_min, burst=1):
+        self.interval = 60.0 / max(rate_per_min, 1)
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.interval
+            time.sleep(wait)
+
+# ---------------------------
+# Prompts + parsing
+# ---------------------------
+def build_analysis_prompt(section_text, analysis_prompt):
+    return f"Section Content:\n{section_text}\n\nPrompt:\n{analysis_prompt}"
+
+def build_score_prompt(ai_response, score_prompt):
+    return f"AI Response:\n{ai_response}\n\nBased on the following scoring rules, assign severity and score:\n{score_prompt}"
+
+# Analysis and scoring in one request; the reply must match RESULT_SCHEMA
+def build_structured_prompt(section_text, analysis_prompt, score_prompt):
+    return (
+        f"Section Content:\n{section_text}\n\nPrompt:\n{analysis_prompt}\n\n"
+        f"Scoring rules:\n{score_prompt}\n\n"
+        "Put your answer to the prompt in \"analysis\". Then apply the scoring rules to that analysis and set "
+        "\"severity\" (Critical, Major or Minor) and \"score\" (Critical 3, Major 2, Minor 1). Return JSON only."
+    )
+
+def parse_score(score_response):
+    severity_match = re.search(r"Severity\s*[:\-]?\s*(Critical|Major|Minor)", score_response, re.IGNORECASE)
+    score_match = re.search(r"Score\s*[:\-]?\s*(\d+)", score_response)
+    severity = severity_match.group(1).capitalize() if severity_match else "Minor"
+    score = int(score_match.group(1)) if score_match else 1
+    return severity, score
+
+# Validate a structured reply -> (analysis, severity, score); raises ValueError instead of guessing
+def parse_structured(response):
+    if isinstance(response, str):
+        start, end = response.find("{"), response.rfind("}")
+        if start == -1 or end == -1:
+            raise ValueError("no JSON object in response")
+        response = json.loads(response[start:end + 1])
+    if not isinstance(response, dict):
+        raise ValueError(f"expected a JSON object, got {type(response).__name__}")
+    severity = str(response.get("severity", "")).strip().capitalize()
+    if severity not in SEVERITY_SCORES:
+        raise ValueError(f"invalid severity {response.get('severity')!r}")
+    analysis = str(response.get("analysis", "")).strip()
+    if not analysis:
+        raise ValueError("empty analysis")
+    # The scoring rules define score from severity, so severity wins if the two disagree.
+    return analysis, severity, SEVERITY_SCORES[severity]
+
+# ---------------------------
+# Fingerprints for incremental re-analysis
+# ---------------------------
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()[:32]
+
+# Section text hash (whitespace-insensitive) and prompt hash (both prompts + mode + model),
+# so a re-run reuses a row only when nothing that produced it has changed
+def fingerprints(section_text, analysis_prompt, score_prompt, mode=ANALYSIS_MODE, model=CORTEX_MODEL):
+    mode = "structured" if mode == "sql" else mode  # same prompt and schema either way
+    return _digest(" ".join(section_text.split())), _digest(analysis_prompt, score_prompt, mode, model)
+
+# ("reuse", stored row) when `old` was produced from exactly these inputs, else
+# ("run", (section, analysis_prompt, score_prompt, section_text, section_hash, prompt_hash))
+def plan_section(section, analysis_prompt, score_prompt, section_text, old=None, mode=ANALYSIS_MODE,
+                 model=CORTEX_MODEL):
+    section_hash, prompt_hash = fingerprints(section_text, analysis_prompt, score_prompt, mode, model)
+    if old is not None and tuple(old[7:9]) == (section_hash, prompt_hash) and old[3] != "Error":
+        return "reuse", tuple(old)
+    return "run", (section, analysis_prompt, score_prompt, section_text, section_hash, prompt_hash)
+
+# Split a document's sections into rows that can be reused from `previous`
+# ({section: stored row}) and sections that need a fresh analysis, in prompt order
+def plan_sections(prompts, score_prompts, sections, previous=None, mode=ANALYSIS_MODE, model=CORTEX_MODEL):
+    previous = previous or {}
+    return [plan_section(section, analysis_prompt, score_prompts.get(section, ""), sections.get(section, ""),
+                         previous.get(section), mode, model)
+            for section, analysis_prompt in prompts.items()]
+
+# Rows from a run that differ from what is stored (reused rows are returned unchanged)
+def changed_rows(rows, previous=None):
+    previous = previous or {}
+    return [r for r in rows if tuple(previous.get(r[1], ())) != tuple(r)]
+
+# Stored sections that the current prompts no longer cover
+def stale_sections(prompts, previous=None):
+    return [section for section in (previous or {}) if section not in prompts]
+
+# ---------------------------
+# Concurrent engine
+# ---------------------------
+# Runs sections (and documents) in parallel on one bounded pool; each section's
+# scoring call starts as soon as its own analysis returns. Rows come back in
+# prompt order, documents in submission order, whatever order calls finish in.
+class ComplianceEngine:
+    def __init__(self, complete_fn, limiter=None, section_workers=SECTION_WORKERS,
+                 document_workers=DOCUMENT_WORKERS, retries=CORTEX_RETRIES, mode=ANALYSIS_MODE,
+                 model=CORTEX_MODEL):
+        if mode not in ("two_pass", "structured"):
+            raise ValueError(f"unsupported engine mode {mode!r} (use analyze_documents_sql for 'sql')")
+        self.complete_fn = complete_fn
+        self.mode = mode
+        self.model = model  # only used for prompt fingerprints; the backend picks the model
+        self.reused = 0
+        self.limiter = limiter
+        self.section_workers = max(1, section_workers)
+        self.document_workers = max(1, document_workers)
+        self.retries = retries
+        self.calls = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    # One completion through the shared limiter, retried with backoff.
+    # With a schema the reply is validated too, and an unusable reply is retried.
+    def complete(self, prompt, schema=None):
+        for attempt in range(self.retries + 1):
+            if self.limiter:
+                self.limiter.acquire()
+            with self.lock:
+                self.calls += 1
+            try:
+                if schema is None:
+                    return self.complete_fn(prompt)
+                return parse_structured(self.complete_fn(prompt, schema=schema))
+            except Exception:
+                with self.lock:
+                    self.errors += 1
+                if attempt == self.retries:
+                    raise
+                time.sleep(min(2 ** attempt, 8) * (0.5 + random.random() / 2))
+
+    # Analysis then scoring for one section -> result row
+    def analyze_section(self, doc_name, section, analysis_prompt, score_prompt, section_text, timestamp):
+        try:
+            if self.mode == "structured":
+                ai_response, severity, score = self.complete(
+                    build_structured_prompt(section_text, analysis_prompt, score_prompt), RESULT_SCHEMA)
+            else:
+                ai_response = self.complete(build_analysis_prompt(section_text, analysis_prompt))
+                severity, score = parse_score(self.complete(build_score_prompt(ai_response, score_prompt)))
+        except Exception as ex:
+            # Keep the row so the document stays complete; it scores as worst case until re-run.
+            ai_response, severity, score = f"ANALYSIS FAILED: {type(ex).__name__}: {ex}", "Error", 3
+        section_hash, prompt_hash = fingerprints(section_text, analysis_prompt, score_prompt, self.mode, self.model)
+        return (doc_name, section, analysis_prompt, severity, score, ai_response, timestamp, section_hash, prompt_hash)
+
+    # Future for one planned section: stored rows resolve immediately, the rest go to the pool
+    def _schedule(self, pool, doc_name, action, item, timestamp):
+        if action == "reuse":
+            with self.lock:
+                self.reused += 1
+            done = Future()
+            done.set_result(item)
+            return done
+        section, analysis_prompt, score_prompt, section_text = item[:4]
+        return pool.submit(self.analyze_section, doc_name, section, analysis_prompt, score_prompt,
+                           section_text, timestamp)
+
+    # Futures for every prompted section, in prompt order. `sections` is a dict or a stream of
+    # (section, text) pairs such as iter_sections(): each section is submitted as soon as the
+    # parser yields it, so analysis overlaps parsing. A repeated heading replaces the earlier
+    # text (as dict() would); sections the document never reached are analyzed as empty.
+    def _submit(self, pool, doc_name, prompts, score_prompts, sections, previous=None):
+        timestamp = datetime.utcnow().isoformat()
+        previous = previous or {}
+        if isinstance(sections, dict):
+            return [self._schedule(pool, doc_name, action, item, timestamp)
+                    for action, item in plan_sections(prompts, score_prompts, sections, previous,
+                                                      self.mode, self.model)]
+        futures = {}
+        for section, section_text in sections:
+            if section not in prompts:
+                continue
+            if section in futures:
+                futures[section].cancel()
+            futures[section] = self._schedule(pool, doc_name, *plan_section(
+                section, prompts[section], score_prompts.get(section, ""), section_text,
+                previous.get(section), self.mode, self.model), timestamp)
+        for section in prompts:
+            if section not in futures:
+                futures[section] = self._schedule(pool, doc_name, *plan_section(
+                    section, prompts[section], score_prompts.get(section, ""), "",
+                    previous.get(section), self.mode, self.model), timestamp)
+        return [futures[section] for section in prompts]
+
+    # Same result rows as the sequential notebook version, sections in parallel.
+    # previous: stored rows {section: row}; unchanged sections are reused, not re-analyzed.
+    def analyze_document(self, doc_name, prompts, score_prompts, sections, previous=None):
+        with ThreadPoolExecutor(max_workers=self.section_workers) as pool:
+            return [f.result() for f in self._submit(pool, doc_name, prompts, score_prompts, sections, previous)]
+
+    # documents: iterable of (doc_name, sections); yields (doc_name, rows) in input order.
+    # Up to document_workers documents are in flight, so the iterable can be a lazy stream.
+    # previous_for(doc_name) -> {section: stored row} enables incremental re-analysis.
+    def analyze_documents(self, documents, prompts, score_prompts, previous_for=None):
+        in_flight = deque()
+        with ThreadPoolExecutor(max_workers=self.section_workers) as pool:
+            for doc_name, sections in documents:
+                previous = previous_for(doc_name) if previous_for else None
+                in_flight.append((doc_name, self._submit(pool, doc_name, prompts, score_prompts, sections, previous)))
+                if len(in_flight) >= self.document_workers:
+                    name, futures = in_flight.popleft()
+                    yield name, [f.result() for f in futures]
+            while in_flight:
+                name, futures = in_flight.popleft()
+                yield name, [f.result() for f in futures]
+
+# ---------------------------
+# Set-based execution in the warehouse
+# ---------------------------
+# One COMPLETE per row of BATCH_TABLE, run as a single statement (structured output)
+def build_batch_sql(model=CORTEX_MODEL, table=BATCH_TABLE):
+    if not re.fullmatch(r"[\w.\-]+", model) or not re.fullmatch(r"[\w.$]+", table):
+        raise ValueError("model and table names must be plain identifiers")
+    options = json.dumps({"temperature": 0, "response_format": {"type": "json", "schema": RESULT_SCHEMA}})
+    return f"""
+        SELECT seq,
+               SNOWFLAKE.CORTEX.COMPLETE(
+                   '{model}',
+                   [{{'role': 'user', 'content': prompt}}],
+                   PARSE_JSON('{options}')::OBJECT
+               ) AS response
+        FROM {table}
+        ORDER BY seq
+    """
+
+# COMPLETE with options returns a JSON envelope; pull out the model's reply
+def parse_sql_response(raw):
+    data = json.loads(raw) if isinstance(raw, str) else raw
+    if data.get("structured_output"):
+        return data["structured_output"][0].get("raw_message", data["structured_output"][0])
+    choice = (data.get("choices") or [{}])[0]
+    return choice.get("messages") or choice.get("message") or ""
+
+# documents: iterable of (doc_name, sections) -> [(doc_name, rows)] in input order.
+# Every section prompt that needs analysis is loaded into a temporary table and
+# completed by one SQL statement inside the warehouse; rows whose reply does not
+# validate are retried client-side through `engine` when one is given.
+# previous_for(doc_name) -> {section: stored row} skips unchanged sections.
+def analyze_documents_sql(session, documents, prompts, score_prompts, model=CORTEX_MODEL, engine=None,
+                          previous_for=None):
+    batch, results = [], {}
+    for doc_name, sections in documents:
+        timestamp = datetime.utcnow().isoformat()
+        previous = previous_for(doc_name) if previous_for else None
+        sections = sections if isinstance(sections, dict) else dict(sections)
+        results[doc_name] = slots = []
+        for action, item in plan_sections(prompts, score_prompts, sections, previous, "sql", model):
+            if action == "reuse":
+                slots.append(item)
+                continue
+            section, analysis_prompt, score_prompt, section_text, section_hash, prompt_hash = item
+            prompt = build_structured_prompt(section_text, analysis_prompt, score_prompt)
+            batch.append((len(batch), doc_name, section, analysis_prompt, prompt, timestamp,
+                          score_prompt, section_text, section_hash, prompt_hash, len(slots)))
+            slots.append(None)
+    if batch:
+        session.create_dataframe(
+            [b[:6] for b in batch], schema=["seq", "document_name", "section", "issue", "prompt", "timestamp"]
+        ).write.mode("overwrite").save_as_table(BATCH_TABLE, table_type="temporary")
+        responses = {row[0]: row[1] for row in session.sql(build_batch_sql(model)).collect()}
+
+    for (seq, doc_name, section, analysis_prompt, _, timestamp, score_prompt, section_text,
+         section_hash, prompt_hash, slot) in batch:
+        try:
+            ai_response, severity, score = parse_structured(parse_sql_response(responses[seq]))
+            row = (doc_name, section, analysis_prompt, severity, score, ai_response, timestamp,
+                   section_hash, prompt_hash)
+        except Exception as ex:
+            if engine is None:
+                row = (doc_name, section, analysis_prompt, "Error", 3,
+                       f"ANALYSIS FAILED: {type(ex).__name__}: {ex}", timestamp, section_hash, prompt_hash)
+            else:
+                row = engine.analyze_section(doc_name, section, analysis_prompt, score_prompt, section_text, timestamp)
+        results[doc_name][slot] = row
+    return list(results.items())
+
+# Compliance percentage for a document's rows (score 1 = Minor ... 3 = Critical)
+def compliance_score(results):
+    total_score = sum([r[4] for r in results])
+    max_score = len(results) * 3
+    return 100 - int((total_score / max_score) * 100) if max_score else 100
+
+# Calculate and print compliance score
+def print_compliance_score(results):
+    print(f"Compliance Score: {compliance_score(results)}/100")
+
+# ---------------------------
+# Results stores
+# ---------------------------
+# One row per (document_name, section). A store loads a document's rows for incremental
+# re-analysis, saves a run's changes atomically, and answers the dashboard's queries
+# server-side (filter, sort and aggregate in the database, fetch only a page / one
+# document). Rows come back from the dashboard queries as dicts with lower-case keys.
+class ResultsStore(ABC):
+    # dialect pieces used by the shared dashboard SQL
+    _count_if = "COUNT_IF({})"
+    _like = "ILIKE"
+    _floor = "FLOOR({})"
+
+    def __init__(self, table=RESULTS_TABLE):
+        self.table = table
+
+    # Rows of `sql` (qmark parameters) as dicts with lower-case keys
+    @abstractmethod
+    def _query(self, sql, params=None):
+        ...
+
+    # Insert or update `rows` and delete the (document_name, section) pairs in `delete`,
+    # all in one transaction
+    @abstractmethod
+    def upsert(self, rows, delete=()):
+        ...
+
+    # Stored rows for a document, keyed by section (used to skip unchanged sections)
+    def load(self, doc_name):
+        rows = self._query(f"SELECT {', '.join(RESULT_COLUMNS)} FROM {self.table} WHERE document_name = ?",
+                           [doc_name])
+        return {row["section"]: tuple(row[c] for c in RESULT_COLUMNS) for row in rows}
+
+    # Write only the rows that changed, and drop sections no longer prompted -> rows written
+    def save(self, doc_name, results, previous=None, prompts=None):
+        changed = changed_rows(results, previous)
+        stale = stale_sections(prompts, previous) if prompts is not None else []
+        if changed or stale:
+            self.upsert(changed, [(doc_name, section) for section in stale])
+        return len(changed)
+
+    def _summary_columns(self):
+        return f"""
+            document_name,
+            COUNT(*) AS sections,
+            SUM(score) AS total_score,
+            100 - {self._floor.format("SUM(score) * 100 / (COUNT(*) * 3)")} AS compliance_score,
+            {self._count_if.format("severity = 'Critical'")} AS critical,
+            {self._count_if.format("severity = 'Error'")} AS failed,
+            MAX(timestamp) AS last_analyzed
+        """
+
+    # Cheap change marker (row count + newest timestamp); it moves whenever a pipeline
+    # run writes or deletes rows, so it works as a cache key
+    def version(self):
+        row = self._query(f"SELECT COUNT(*) AS n, MAX(timestamp) AS latest FROM {self.table}")[0]
+        return f"{row['n']}:{row['latest']}"
+
+    # Summary of the most recently analyzed document, or None when the table is empty
+    def latest_document(self):
+        rows = self._query(f"""
+            SELECT {self._summary_columns()} FROM {self.table}
+            WHERE document_name = (SELECT document_name FROM {self.table} ORDER BY timestamp DESC LIMIT 1)
+            GROUP BY document_name
+        """)
+        return rows[0] if rows else None
+
+    # Number of documents matching `search` (case-insensitive substring of the name)
+    def document_count(self, search=""):
+        return self._query(f"SELECT COUNT(DISTINCT document_name) AS n FROM {self.table} "
+                           f"WHERE document_name {self._like} ?", [f"%{search}%"])[0]["n"]
+
+    # One page of per-document summaries, most recently analyzed first
+    def document_summaries(self, limit=25, offset=0, search=""):
+        return self._query(f"""
+            SELECT {self._summary_columns()} FROM {self.table}
+            WHERE document_name {self._like} ?
+            GROUP BY document_name
+            ORDER BY last_analyzed DESC, document_name
+            LIMIT {int(limit)} OFFSET {int(offset)}
+        """, [f"%{search}%"])
+
+    # Section rows of one document
+    def document_sections(self, doc_name):
+        return self._query(f"""
+            SELECT section, severity, score, ai_response, timestamp FROM {self.table}
+            WHERE document_name = ?
+            ORDER BY section
+        """, [doc_name])
+
+
+# Snowflake: each save is one MERGE per UPSERT_BATCH_ROWS rows (bound VALUES, no staging
+# table) plus the stale-section DELETE, inside BEGIN/COMMIT. The table is clustered by
+# document_name (see SOPComplianceSQL.txt) so per-document lookups prune partitions.
+class SnowflakeResultsStore(ResultsStore):
+    def __init__(self, session, table=RESULTS_TABLE, batch_rows=UPSERT_BATCH_ROWS):
+        super().__init__(table)
+        self.session = session
+        self.batch_rows = max(1, batch_rows)
+
+    def _query(self, sql, params=None):
+        return [{k.lower(): v for k, v in row.as_dict().items()}
+                for row in self.session.sql(sql, params=params).collect()]
+
+    def _merge_sql(self, n_rows):
+        values = ", ".join(["(" + ", ".join(["?"] * len(RESULT_COLUMNS)) + ")"] * n_rows)
+        source = ", ".join((f"TO_TIMESTAMP_NTZ(${i})" if c == "timestamp" else f"${i}") + f" AS {c}"
+                           for i, c in enumerate(RESULT_COLUMNS, 1))
+        updates = ", ".join(f"{c} = s.{c}" for c in RESULT_COLUMNS[2:])
+        return f"""
+            MERGE INTO {self.table} t
+            USING (SELECT {source} FROM VALUES {values}) s
+            ON t.document_name = s.document_name AND t.section = s.section
+            WHEN MATCHED THEN UPDATE SET {updates}
+            WHEN NOT MATCHED THEN INSERT ({', '.join(RESULT_COLUMNS)})
+                VALUES ({', '.join('s.' + c for c in RESULT_COLUMNS)})
+        """
+
+    def upsert(self, rows, delete=()):
+        rows = [tuple(r[:6]) + (str(r[6]),) + tuple(r[7:]) for r in rows]
+        stale = {}
+        for doc_name, section in delete:
+            stale.setdefault(doc_name, []).append(section)
+        self.session.sql("BEGIN").collect()
+        try:
+            for i in range(0, len(rows), self.batch_rows):
+                chunk = rows[i:i + self.batch_rows]
+                self.session.sql(self._merge_sql(len(chunk)), params=[v for r in chunk for v in r]).collect()
+            for doc_name, sections in stale.items():
+                self.session.sql(f"DELETE FROM {self.table} WHERE document_name = ? AND section IN "
+                                 f"({', '.join(['?'] * len(sections))})", params=[doc_name, *sections]).collect()
+            self.session.sql("COMMIT").collect()
+        except Exception:
+            self.session.sql("ROLLBACK").collect()
+            raise
+
+
+# SQLite file with the same schema and queries, so the pipeline and the dashboard run
+# (and can be load-tested) without Snowflake. (document_name, section) is the primary
+# key; ON CONFLICT gives the same upsert as MERGE.
+class SQLiteResultsStore(ResultsStore):
+    _count_if = "SUM(CASE WHEN {} THEN 1 ELSE 0 END)"
+    _like = "LIKE"  # case-insensitive for ASCII in SQLite
+    _floor = "CAST({} AS INTEGER)"  # operands are never negative
+
+    def __init__(self, path=RESULTS_DB_PATH, table=RESULTS_TABLE):
+        import sqlite3
+        super().__init__(table)
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    document_name TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    issue TEXT,
+                    severity TEXT,
+                    score INTEGER,
+                    ai_response TEXT,
+                    timestamp TEXT,
+                    section_hash TEXT,
+                    prompt_hash TEXT,
+                    PRIMARY KEY (document_name, section)
+                )
+            """)
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_timestamp ON {table} (timestamp)")
+
+    def _query(self, sql, params=None):
+        with self.lock:
+            return [{k.lower(): row[k] for k in row.keys()} for row in self.conn.execute(sql, params or [])]
+
+    def upsert(self, rows, delete=()):
+        updates = ", ".join(f"{c} = excluded.{c}" for c in RESULT_COLUMNS[2:])
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany(
+                    f"INSERT INTO {self.table} ({', '.join(RESULT_COLUMNS)}) "
+                    f"VALUES ({', '.join(['?'] * len(RESULT_COLUMNS))}) "
+                    f"ON CONFLICT (document_name, section) DO UPDATE SET {updates}",
+                    [tuple(r[:6]) + (str(r[6]),) + tuple(r[7:]) for r in rows])
+                self.conn.executemany(f"DELETE FROM {self.table} WHERE document_name = ? AND section = ?",
+                                      list(delete))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+# Store for the configured backend (SOP_RESULTS_BACKEND); Snowflake needs a session
+def open_results_store(session=None, backend=RESULTS_BACKEND):
+    if backend == "sqlite":
+        return SQLiteResultsStore(RESULTS_DB_PATH)
+    if backend == "snowflake":
+        return SnowflakeResultsStore(session)
+    raise ValueError(f"unknown results backend {backend!r} (use snowflake or sqlite)")
+
+# ---------------------------
+# Bulk ingestion
+# ---------------------------
+# A stage file: path relative to the stage root plus a version (md5 / size+mtime)
+class SourceFile:
+    def __init__(self, name, version, size=0):
+        self.name = name
+        self.version = version
+        self.size = size
+
+# Every file in a Snowflake stage; downloads are skipped when the local copy has the same md5
+class StageSource:
+    def __init__(self, session, stage=SOP_STAGE, download_dir=DOWNLOAD_DIR):
+        self.session = session
+        self.stage = stage.rstrip("/")
+        self.download_dir = download_dir
+        self.manifest_path = os.path.join(download_dir, ".manifest.json")
+        self.lock = threading.Lock()
+        os.makedirs(download_dir, exist_ok=True)
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        self.downloaded = self.cached = 0
+
+    def list(self):
+        files = []
+        for row in self.session.sql(f"LIST {self.stage}").collect():
+            name, size, md5 = row[0], row[1], row[2]
+            files.append(SourceFile(name.split("/", 1)[1] if "/" in name else name, md5, size))
+        return files
+
+    def _local_path(self, name):
+        return os.path.join(self.download_dir, *name.split("/"))
+
+    def fetch(self, file):
+        path = self._local_path(file.name)
+        with self.lock:
+            fresh = self.manifest.get(file.name) == file.version and os.path.exists(path)
+        if fresh:
+            with self.lock:
+                self.cached += 1
+            return path
+        self.session.file.get(f"{self.stage}/{file.name}", os.path.dirname(path))
+        with self.lock:
+            self.downloaded += 1
+            self.manifest[file.name] = file.version
+            tmp = self.manifest_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f)
+            os.replace(tmp, self.manifest_path)
+        return path
+
+# Local directory stand-in for a stage (offline runs, benchmarks)
+class LocalSource:
+    def __init__(self, directory):
+        self.directory = directory
+        self.downloaded = self.cached = 0
+
+    def list(self):
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for fn in names:
+                path = os.path.join(root, fn)
+                st = os.stat(path)
+                rel = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                files.append(SourceFile(rel, f"{st.st_size}-{st.st_mtime_ns}", st.st_size))
+        return files
+
+    def fetch(self, file):
+        self.cached += 1
+        return os.path.join(self.directory, *file.name.split("/"))
+
+# Prompt files are fetched and parsed once per run
+def load_run_prompts(source, files=None):
+    files = files or {f.name: f for f in source.list()}
+    missing = [name for name in (PROMPT_FILE, SCORE_PROMPT_FILE) if name not in files]
+    if missing:
+        raise FileNotFoundError(f"prompt files not found in source: {', '.join(missing)}")
+    return load_prompts(source.fetch(files[PROMPT_FILE])), load_prompts(source.fetch(files[SCORE_PROMPT_FILE]))
+
+# Fetch a stage file and check it is a readable .docx (zip with a document part), so
+# broken files fail in the download pool instead of part-way through analysis
+def _fetch_docx(source, file):
+    path = source.fetch(file)
+    with zipfile.ZipFile(path) as zf:
+        zf.getinfo("word/document.xml")
+    return path
+
+# Sections streamed from iter_sections; a parse error part-way through is recorded in
+# `errors` (when given) and ends the stream, and run_pipeline then discards the rows
+def _stream_sections(name, path, errors=None):
+    try:
+        yield from iter_sections(path)
+    except Exception as ex:
+        if errors is None:
+            raise
+        errors.append((name, f"{type(ex).__name__}: {ex}"))
+
+# Download (when new or changed) every SOP concurrently, yielding (doc_name, sections) as
+# each one arrives; sections is an iter_sections stream, so each document is parsed
+# while its sections are being analyzed and never held whole in memory
+def ingest_documents(source, files, workers=DOWNLOAD_WORKERS, errors=None):
+    docs = [f for f in files if f.name.lower().endswith(DOC_EXTENSIONS)
+            and os.path.basename(f.name) not in (PROMPT_FILE, SCORE_PROMPT_FILE)
+            and not os.path.basename(f.name).startswith("~$")]  # Word lock files
+    if not docs:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(docs)))) as pool:
+        futures = {pool.submit(_fetch_docx, source, f): f for f in docs}
+        for fut in as_completed(futures):
+            name = futures[fut].name
+            try:
+                path = fut.result()
+            except Exception as ex:
+                if errors is None:
+                    raise
+                errors.append((name, f"{type(ex).__name__}: {ex}"))
+                continue
+            yield name, _stream_sections(name, path, errors)
+
+# Whole run: list the source once, load prompts once, stream documents through
+# `analyze` and hand each document's rows to `save`; returns a run summary.
+#   analyze(documents, prompts, score_prompts, previous_for) -> iterable of (doc_name, rows)
+#   previous_for(doc_name) -> {section: stored row};  save(doc_name, rows, previous, prompts) -> rows written
+def run_pipeline(source, analyze, previous_for=None, save=None, download_workers=DOWNLOAD_WORKERS, log=print):
+    started = time.perf_counter()
+    files = {f.name: f for f in source.list()}
+    prompts, score_prompts = load_run_prompts(source, files)
+    previous_cache, errors = {}, []
+
+    def previous(doc_name):
+        if doc_name not in previous_cache:
+            previous_cache[doc_name] = previous_for(doc_name) if previous_for else {}
+        return previous_cache[doc_name]
+
+    documents = sections_total = updated_total = 0
+    documents_iter = ingest_documents(source, list(files.values()), download_workers, errors)
+    for doc_name, rows in analyze(documents_iter, prompts, score_prompts, previous):
+        if any(name == doc_name for name, _ in errors):
+            previous_cache.pop(doc_name, None)
+            continue  # parsing failed part-way: keep the stored rows
+        old = previous(doc_name)
+        updated = save(doc_name, rows, old, prompts) if save else len(changed_rows(rows, old))
+        documents += 1
+        sections_total += len(rows)
+        updated_total += updated
+        previous_cache.pop(doc_name, None)
+        if log:
+            log(f"{doc_name}: {compliance_score(rows)}/100 ({updated} of {len(rows)} sections updated)")
+    elapsed = time.perf_counter() - started
+    summary = {
+        "documents": documents,
+        "failed_documents": len(errors),
+        "downloaded": source.downloaded,
+        "unchanged_files": source.cached,
+        "sections": sections_total,
+        "sections_updated": updated_total,
+        "seconds": round(elapsed, 2),
+        "documents_per_min": round(documents / elapsed * 60, 1) if elapsed else 0.0,
+    }
+    for name, err in errors:
+        if log:
+            log(f"{name}: FAILED {err}")
+    return summary
+
+# ---------------------------
+# Offline run / benchmark
+# ---------------------------
+def main(argv=None):
+    here = os.path.dirname(os.path.abspath(__file__))
+    inputs = os.path.join(here, "input files")
+    ap = argparse.ArgumentParser(description="Run the SOP compliance analysis against a fake LLM backend.")
+    ap.add_argument("--doc", default=os.path.join(inputs, "Synthetic_SOP_Compliant.docx"))
+    ap.add_argument("--prompts", default=os.path.join(inputs, "gxP_prompts.txt"))
+    ap.add_argument("--score-prompts", default=os.path.join(inputs, "score_prompts.txt"))
+    ap.add_argument("--copies", type=int, default=20, help="Analyze the document this many times")
+    ap.add_argument("--latency", type=float, default=0.5, help="Mean seconds per fake completion")
+    ap.add_argument("--failure-rate", type=float, default=0.0)
+    ap.add_argument("--section-workers", type=int, default=SECTION_WORKERS)
+    ap.add_argument("--document-workers", type=int, default=DOCUMENT_WORKERS)
+    ap.add_argument("--rpm", type=int, default=0, help="Shared rate limit (0 = none)")
+    ap.add_argument("--mode", choices=["two_pass", "structured"],
+                    default="structured" if ANALYSIS_MODE == "sql" else ANALYSIS_MODE)
+    ap.add_argument("--stream", action="store_true",
+                    help="Re-parse each copy with iter_sections so analysis overlaps parsing")
+    ap.add_argument("--source", help="Run the bulk pipeline over this directory (SOPs + prompt files) instead")
+    ap.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS)
+    ap.add_argument("--results-db", help="With --source: load/save results in this SQLite file, so re-runs "
+                                         "are incremental and the dashboard can read them")
+    ap.add_argument("--revise", type=int, default=0,
+                    help="Then edit this many sections per document and re-audit incrementally")
+    args = ap.parse_args(argv)
+
+    fake = FakeComplete(latency=args.latency, jitter=args.latency / 2, failure_rate=args.failure_rate)
+    engine = ComplianceEngine(fake, RateLimiter(args.rpm, burst=args.section_workers) if args.rpm else None,
+                              args.section_workers, args.document_workers, mode=args.mode)
+    if args.source:
+        store = SQLiteResultsStore(args.results_db) if args.results_db else None
+        summary = run_pipeline(LocalSource(args.source), engine.analyze_documents,
+                               previous_for=store.load if store else None, save=store.save if store else None,
+                               download_workers=args.download_workers)
+        print(json.dumps(dict(summary, completions=engine.calls), indent=2))
+        return
+
+    sections = parse_document(args.doc)
+    prompts, score_prompts = load_prompts(args.prompts), load_prompts(args.score_prompts)
+    docs = ((f"copy_{i:04d}.docx", iter_sections(args.doc) if args.stream else sections)
+            for i in range(args.copies))
+    started = time.perf_counter()
+    stored = {name: {r[1]: r for r in rows} for name, rows in engine.analyze_documents(docs, prompts, score_prompts)}
+    scores = {name: compliance_score(list(rows.values())) for name, rows in stored.items()}
+    elapsed = time.perf_counter() - started
+    sequential = fake.calls * args.latency
+    report = {
+        "documents": len(scores),
+        "sections_per_document": len(prompts),
+        "mode": args.mode,
+        "completions": engine.calls,
+        "prompt_chars": fake.prompt_chars,
+        "errors": engine.errors,
+        "seconds": round(elapsed, 2),
+        "documents_per_min": round(len(scores) / elapsed * 60, 1) if elapsed else 0.0,
+        "sequential_estimate_seconds": round(sequential, 1),
+        "speedup": round(sequential / elapsed, 1) if elapsed else 0.0,
+    }
+    if args.revise:
+        # Edit the first N analyzed sections of every copy and re-audit against the stored rows
+        edited = [section for section in prompts if section in sections][:args.revise]
+        revised = dict(sections, **{section: sections[section] + "\nRevised." for section in edited})
+        calls_before = engine.calls
+        started = time.perf_counter()
+        changed = 0
+        for name, rows in engine.analyze_documents(((n, revised) for n in stored), prompts, score_prompts,
+                                                   previous_for=stored.get):
+            changed += len(changed_rows(rows, stored[name]))
+        report["reaudit"] = {
+            "sections_edited_per_document": len(edited),
+            "completions": engine.calls - calls_before,
+            "rows_changed": changed,
+            "rows_reused": engine.reused,
+            "seconds": round(time.perf_counter() - started, 2),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
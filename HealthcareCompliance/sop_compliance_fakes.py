@@ -0,0 +1,53 @@
+# sop_compliance_fakes.py
+# Offline stand-ins for Snowflake pieces used by bench_sop.py and dry runs.
+# Kept out of sop_compliance.py so the notebook and the dashboard never import them.
+import hashlib
+import os
+import shutil
+import threading
+import time
+
+
+# LIST result: (stage/relative path, size, md5) rows like Snowflake returns
+class _FakeListing:
+    def __init__(self, session, stage):
+        self.session, self.stage = session, stage
+
+    def collect(self):
+        self.session._wait()
+        rows = []
+        for root, _, names in os.walk(self.session.directory):
+            for fn in sorted(names):
+                path = os.path.join(root, fn)
+                rel = os.path.relpath(path, self.session.directory).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    md5 = hashlib.md5(f.read()).hexdigest()
+                rows.append((f"{self.stage}/{rel}", os.path.getsize(path), md5))
+        return rows
+
+# Offline stand-in for the two Snowpark calls StageSource makes (LIST and file.get),
+# serving a local directory as a stage with `latency` seconds per request
+class FakeStageSession:
+    def __init__(self, directory, latency=0.0):
+        self.directory = directory
+        self.latency = latency
+        self.file = self
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def _wait(self):
+        with self.lock:
+            self.requests += 1
+        time.sleep(self.latency)
+
+    def sql(self, query, params=None):
+        if not query.upper().startswith("LIST "):
+            raise NotImplementedError(f"FakeStageSession only supports LIST, got {query[:40]!r}")
+        stage = query.split()[1].lstrip("@").rstrip("/")
+        return _FakeListing(self, stage)
+
+    def get(self, stage_path, target_dir):
+        self._wait()
+        rel = stage_path.split("/", 1)[1]
+        os.makedirs(target_dir, exist_ok=True)
+        shutil.copy(os.path.join(self.directory, *rel.split("/")), target_dir)
@@ -0,0 +1,202 @@
+# test_sop_compliance.py
+# python -m pytest -q test_sop_compliance.py
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from sop_compliance import (PROMPT_FILE, RESULT_COLUMNS, SCORE_PROMPT_FILE, ComplianceEngine, FakeComplete,
+                            LocalSource, SnowflakeResultsStore, SQLiteResultsStore, parse_document, run_pipeline)
+
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_STYLES = (
+    f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:styles xmlns:w="{_W_NS}">'
+    '<w:style w:type="paragraph" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/>'
+    '<w:basedOn w:val="Normal"/><w:pPr><w:outlineLvl w:val="0"/></w:pPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading2"><w:name w:val="heading 2"/>'
+    '<w:basedOn w:val="Normal"/><w:pPr><w:outlineLvl w:val="1"/></w:pPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading3"><w:name w:val="heading 3"/>'
+    '<w:basedOn w:val="Normal"/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="SopTitle"><w:name w:val="SOP Title"/>'
+    '<w:basedOn w:val="Heading1"/></w:style>'
+    '</w:styles>'
+)
+
+def _para(text, style=None):
+    ppr = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f'<w:p>{ppr}<w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+def _write_docx(path, paragraphs):
+    body = "".join(_para(*p) if isinstance(p, tuple) else _para(p) for p in paragraphs)
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("word/document.xml", f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                                         f'<w:document xmlns:w="{_W_NS}"><w:body>{body}</w:body></w:document>')
+        zf.writestr("word/styles.xml", _STYLES)
+    return path
+
+def test_subheadings_stay_in_their_section(tmp_path):
+    doc = _write_docx(tmp_path / "nested.docx", [
+        "SOP-001 Sample Handling",
+        ("5. Procedure", "Heading1"),
+        "Samples are handled as follows.",
+        ("5.1 Sample receipt", "Heading2"),
+        "QC logs every sample on arrival.",
+        ("5.1.1 Labels", "Heading3"),
+        "Labels carry the batch number.",
+        ("5.2 Deviations", "Heading2"),
+        "Deviations are raised within 24 hours.",
+        ("6. References", "Heading1"),
+        "SOP-000",
+    ])
+    sections = parse_document(doc)
+    assert list(sections) == ["Header", "Procedure", "References"]
+    assert sections["Procedure"].splitlines() == [
+        "Samples are handled as follows.",
+        "5.1 Sample receipt",
+        "QC logs every sample on arrival.",
+        "5.1.1 Labels",
+        "Labels carry the batch number.",
+        "5.2 Deviations",
+        "Deviations are raised within 24 hours.",
+    ]
+
+def test_top_level_headings_split_by_style_or_name(tmp_path):
+    doc = _write_docx(tmp_path / "top.docx", [
+        ("Site Overview", "SopTitle"),   # custom style based on Heading 1
+        "Overview text.",
+        ("Scope", "Heading2"),           # known section name at any level
+        "Scope text.",
+        "## Appendix",
+        "Appendix text.",
+    ])
+    assert parse_document(doc) == {"Header": "", "Site Overview": "Overview text.", "Scope": "Scope text.",
+                                   "Appendix": "Appendix text."}
+
+_SECTIONS = {"Purpose": "Defines sample handling.", "Scope": "Applies to the QC lab.",
+             "Procedure": "1. Receive. 2. Log. 3. Store."}
+
+def _write_sop(path, sections):
+    paragraphs = ["SOP-001 Sample Handling"]
+    for heading, text in sections.items():
+        paragraphs += [(heading, "Heading1"), text]
+    return _write_docx(path, paragraphs)
+
+def _write_prompts(directory, suffix=""):
+    (directory / PROMPT_FILE).write_text(
+        "".join(f"{s}(\nIs the {s.lower()} complete?{suffix}\n)\n" for s in _SECTIONS), encoding="utf-8")
+    (directory / SCORE_PROMPT_FILE).write_text(
+        "".join(f"{s}(\nRate the {s.lower()} as Critical, Major or Minor.\n)\n" for s in _SECTIONS),
+        encoding="utf-8")
+
+def test_rerun_only_analyzes_what_changed(tmp_path):
+    source = tmp_path / "stage"
+    source.mkdir()
+    _write_prompts(source)
+    _write_sop(source / "sop.docx", _SECTIONS)
+    fake = FakeComplete()
+    engine = ComplianceEngine(fake, mode="structured")
+    store = SQLiteResultsStore(str(tmp_path / "results.db"))
+
+    def run():
+        before = fake.calls
+        summary = run_pipeline(LocalSource(str(source)), engine.analyze_documents, previous_for=store.load,
+                               save=store.save, log=None)
+        return fake.calls - before, summary["sections_updated"]
+
+    assert run() == (3, 3)
+    assert run() == (0, 0)  # unchanged document and prompts: everything is reused
+    stored = store.load("sop.docx")
+    _write_sop(source / "sop.docx", dict(_SECTIONS, Scope="Applies to the QC and stability labs."))
+    assert run() == (1, 1)
+    rows = store.load("sop.docx")
+    assert [s for s in rows if rows[s] != stored[s]] == ["Scope"]
+    _write_prompts(source, " Cite the SOP number.")
+    assert run() == (3, 3)
+    store.close()
+
+def test_broken_documents_fail_alone(tmp_path):
+    source = tmp_path / "stage"
+    source.mkdir()
+    _write_prompts(source)
+    _write_sop(source / "good.docx", _SECTIONS)
+    (source / "corrupt.docx").write_bytes(b"not a zip")
+    with zipfile.ZipFile(source / "truncated.docx", "w") as zf:  # XML cut off after the first section
+        zf.writestr("word/document.xml", f'<w:document xmlns:w="{_W_NS}"><w:body>'
+                                         + _para("Purpose", "Heading1") + _para("Defines sample handling."))
+        zf.writestr("word/styles.xml", _STYLES)
+    store = SQLiteResultsStore(str(tmp_path / "results.db"))
+    log = []
+    summary = run_pipeline(LocalSource(str(source)), ComplianceEngine(FakeComplete(), mode="structured")
+                           .analyze_documents, previous_for=store.load, save=store.save, log=log.append)
+    assert (summary["documents"], summary["failed_documents"]) == (1, 2)
+    assert sorted(line.split(":")[0] for line in log if "FAILED" in line) == ["corrupt.docx", "truncated.docx"]
+    assert set(store.load("good.docx")) == set(_SECTIONS)
+    assert store.load("truncated.docx") == {}
+    store.close()
+
+def _row(section, severity="Minor", text="ok", ts="2026-01-01T00:00:00"):
+    score = {"Critical": 3, "Major": 2, "Minor": 1}[severity]
+    return ("sop.docx", section, f"Check {section}", severity, score, text, ts, f"s-{text}", "p1")
+
+def test_sqlite_store_insert_update_remove_section(tmp_path):
+    store = SQLiteResultsStore(str(tmp_path / "results.db"))
+    prompts = {"Purpose": "", "Scope": ""}
+    first = [_row("Purpose"), _row("Scope")]
+    assert store.save("sop.docx", first, store.load("sop.docx"), prompts) == 2
+    assert store.load("sop.docx") == {r[1]: r for r in first}
+
+    previous = store.load("sop.docx")
+    second = [first[0], _row("Scope", "Critical", "missing", "2026-01-02T00:00:00")]
+    assert store.save("sop.docx", second, previous, prompts) == 1  # only the changed row is written
+    assert store.load("sop.docx")["Scope"] == second[1]
+
+    # Scope is no longer prompted: its stored row is deleted
+    assert store.save("sop.docx", second[:1], store.load("sop.docx"), {"Purpose": ""}) == 0
+    assert store.load("sop.docx") == {"Purpose": first[0]}
+    assert store.document_sections("sop.docx")[0]["section"] == "Purpose"
+    store.close()
+
+
+class _FakeSnowpark:
+    def __init__(self):
+        self.statements = []
+
+    def sql(self, query, params=None):
+        self.statements.append((" ".join(query.split()), params))
+        return self
+
+    def collect(self):
+        return []
+
+def test_snowflake_store_merges_bound_rows_in_one_transaction():
+    session = _FakeSnowpark()
+    store = SnowflakeResultsStore(session, batch_rows=2)
+    rows = [_row("Purpose"), _row("Scope"), _row("Procedure", ts=datetime(2026, 1, 2, 3, 4, 5))]
+    store.upsert(rows, delete=[("sop.docx", "Appendix"), ("sop.docx", "Annex")])
+
+    assert [q.split()[0] for q, _ in session.statements] == ["BEGIN", "MERGE", "MERGE", "DELETE", "COMMIT"]
+    merge, binds = session.statements[1]
+    n = len(RESULT_COLUMNS)
+    assert merge.startswith("MERGE INTO sop_compliance_results t USING (SELECT $1 AS document_name, "
+                            "$2 AS section,")
+    assert "TO_TIMESTAMP_NTZ($7) AS timestamp" in merge
+    assert "FROM VALUES " + ", ".join(["(" + ", ".join(["?"] * n) + ")"] * 2) + ") s" in merge
+    assert "ON t.document_name = s.document_name AND t.section = s.section" in merge
+    assert binds == [v for r in rows[:2] for v in r]
+    assert session.statements[2][1] == list(rows[2][:6]) + ["2026-01-02 03:04:05"] + list(rows[2][7:])
+    assert session.statements[3] == (
+        "DELETE FROM sop_compliance_results WHERE document_name = ? AND section IN (?, ?)",
+        ["sop.docx", "Appendix", "Annex"])
+
+def test_snowflake_store_rolls_back_on_error():
+    class Failing(_FakeSnowpark):
+        def sql(self, query, params=None):
+            if query.lstrip().startswith("MERGE"):
+                raise RuntimeError("merge failed")
+            return super().sql(query, params)
+
+    session = Failing()
+    with pytest.raises(RuntimeError):
+        SnowflakeResultsStore(session).upsert([_row("Purpose")])
+    assert [q for q, _ in session.statements] == ["BEGIN", "ROLLBACK"]
@@ -1,83 +1,47 @@
 # jadehire_app.py
 import streamlit as st
 import datetime
-import pickle
 import os
 import json
-import base64
-from email.mime.text import MIMEText
-
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
+import csv
+import io
 
 from dotenv import load_dotenv
-import google.generativeai as genai
 
-from docx import Document
-import PyPDF2
-import matplotlib.pyplot as plt
+load_dotenv()  # before the jadehire_* imports, which read their settings from the environment
+
+# Heavy libraries (matplotlib, numpy, google.generativeai, googleapiclient, docx, PyPDF2)
+# are imported lazily by the code paths that need them, so cold start and reruns stay cheap.
+from jadehire_engagement import engagement_prompt, get_engagement_store, run_due_checkpoints, start_scheduler
+from jadehire_files import read_file_content, read_many
+from jadehire_google import get_calendar_store, get_google_service, send_bulk_emails, send_email_gmail
+from jadehire_llm import CachedLLM, gemini_model, get_llm_cache, get_llm_metrics
+from jadehire_prompt import STANDARDIZE_TOKEN_BUDGET, clean_text, count_tokens, fit_prompt, pack_pair
+from jadehire_render import (STANDARDIZE_CONCURRENCY, StandardizedResume, build_zip, render_docx, render_pdf,
+                             standardize_many)
+from jadehire_screening import get_shared_limiter, rank_results, screen_resumes
 
 # ---------------------------
 # ENV & GENAI
 # ---------------------------
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-LLM = genai.GenerativeModel("gemini-2.5-flash")
-
-# Combined scope for Calendar + Gmail
-SCOPES = [
-    "https://www.googleapis.com/auth/calendar",
-    "https://www.googleapis.com/auth/gmail.send",
-]
+# Parallel screening requests per session + process-wide Gemini rate limit
+SCREEN_CONCURRENCY = int(os.getenv("SCREEN_CONCURRENCY", "4"))
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "60"))
 
-TIMEZONE = "Asia/Kolkata"
-
-# ---------------------------
-# Helpers: file readers
-# ---------------------------
-def read_file_content(uploaded_file):
-    """Extract plain text from TXT/DOCX/PDF uploads."""
-    name = uploaded_file.name.lower()
-    if name.endswith(".txt"):
-        return uploaded_file.read().decode("utf-8", errors="ignore")
-    if name.endswith(".docx"):
-        doc = Document(uploaded_file)
-        return "\n".join(p.text for p in doc.paragraphs)
-    if name.endswith(".pdf"):
-        reader = PyPDF2.PdfReader(uploaded_file)
-        return "\n".join(pg.extract_text() or "" for pg in reader.pages)
-    return uploaded_file.read().decode("utf-8", errors="ignore")
+@st.cache_resource
+def get_llm() -> CachedLLM:
+    """Gemini client + response cache + metrics, created once per process on first use."""
+    return CachedLLM(gemini_model(), get_llm_cache(), get_llm_metrics(), limiter=get_shared_limiter(GEMINI_RPM))
 
-# ---------------------------
-# Helpers: Google unified OAuth + services
-# ---------------------------
-def get_google_service(api_name: str, api_version: str):
-    creds = None
-    if os.path.exists("token.pickle"):
-        with open("token.pickle", "rb") as f:
-            creds = pickle.load(f)
-    if not creds or not creds.valid:
-        flow = InstalledAppFlow.from_client_secrets_file(
-            "client_secret_deep_personal.json", SCOPES
-        )
-        creds = flow.run_local_server(port=0)
-        with open("token.pickle", "wb") as f:
-            pickle.dump(creds, f)
-    return build(api_name, api_version, credentials=creds)
-
-def send_email_gmail(to_email: str, subject: str, message_text: str):
-    service = get_google_service("gmail", "v1")
-    msg = MIMEText(message_text)
-    msg["to"] = to_email
-    msg["subject"] = subject
-    raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
-    body = {"raw": raw}
-    return service.users().messages().send(userId="me", body=body).execute()
+TIMEZONE = "Asia/Kolkata"
+# Local pre-filter defaults (how many resumes reach the LLM)
+PREFILTER_TOP_K = int(os.getenv("PREFILTER_TOP_K", "25"))
+PREFILTER_MIN_SCORE = int(os.getenv("PREFILTER_MIN_SCORE", "0"))
 
 # ---------------------------
 # AI helpers
 # ---------------------------
-def ai_extract_schedule(text_input: str):
+def ai_extract_schedule(text_input: str, bypass_cache: bool = False):
     prompt = f"""
     Extract scheduling details from the following instruction and return JSON ONLY:
 
@@ -93,37 +57,14 @@ def ai_extract_schedule(text_input: str):
     Instruction:
     {text_input}
     """
-    resp = LLM.generate_content(prompt)
+    resp = get_llm().generate(prompt, bypass_cache=bypass_cache, helper="ai_extract_schedule")
     try:
         txt = resp.text.strip().replace("```json", "").replace("```", "")
         return json.loads(txt)
     except Exception:
         return {}
 
-def ai_screen_resumes_with_match(jd_text: str, resumes_dict: dict):
-    combined = "\n\n".join([f"Candidate: {k}\n{v}" for k, v in resumes_dict.items()])
-    prompt = f"""
-    You are an AI recruiter. Compare the following job description with the candidate's resume
-        and provide a suitability percentage match with reasoning.
-
-        Job Description:
-        {jd_text}
-
-        Candidate Resume:
-        {combined}
-
-        Output format strictly:
-        Candidate: <name>
-        Match: <percentage>
-        Summary: <short reasoning>
-    """
-    resp = LLM.generate_content(prompt)
-    # Track usage locally
-    st.session_state["llm_calls"] = st.session_state.get("llm_calls", 0) + 1
-    return resp.text
-
-def ai_standardize_resume(candidate_resume: str, jade_format_sample: str):
-    prompt = f"""
+STANDARDIZE_PROMPT = """
     Convert the following resume into Jade sample style.
     Keep Summary, Education, Work Experience, Projects, Certificates.
 
@@ -133,60 +74,78 @@ def ai_standardize_resume(candidate_resume: str, jade_format_sample: str):
     Candidate Resume:
     {candidate_resume}
     """
-    resp = LLM.generate_content(prompt)
-    st.session_state["llm_calls"] = st.session_state.get("llm_calls", 0) + 1
-    return resp.text
 
-def generate_ai_email(name: str, role: str, days_left: int):
-    prompt = f"""
-    Draft a warm, short email to {name} who accepted {role}.
-    Their Day 1 is in {days_left} days. Encourage them.
+def _standardize_prompt(candidate_resume: str, jade_format_sample: str) -> tuple:
+    """(prompt, warning): cleaned sample + resume, trimmed only past STANDARDIZE_TOKEN_BUDGET.
+
+    Standardization must keep the whole resume, so nothing is dropped for relevance;
+    `warning` is empty unless the budget forced text out.
     """
-    resp = LLM.generate_content(prompt)
-    st.session_state["llm_calls"] = st.session_state.get("llm_calls", 0) + 1
-    return resp.text.strip()
+    sample, resume = clean_text(jade_format_sample), clean_text(candidate_resume)
+    warning = ""
+    if STANDARDIZE_TOKEN_BUDGET:
+        budget = fit_prompt(STANDARDIZE_PROMPT, STANDARDIZE_TOKEN_BUDGET)
+        before = count_tokens(sample), count_tokens(resume)
+        if sum(before) > budget:
+            sample, resume = pack_pair(sample, resume, budget, primary_share=0.3, relevant=False)
+            cut = [f"~{b - count_tokens(t)} of {b} {what} tokens"
+                   for what, t, b in (("resume", resume, before[1]), ("sample", sample, before[0]))
+                   if count_tokens(t) < b]
+            warning = (f"Input exceeds STANDARDIZE_TOKEN_BUDGET ({STANDARDIZE_TOKEN_BUDGET}); dropped "
+                       f"{' and '.join(cut)}. The standardized resume may be missing content.")
+    return STANDARDIZE_PROMPT.format(jade_format_sample=sample, candidate_resume=resume), warning
+
+def ai_standardize_resume(candidate_resume: str, jade_format_sample: str, bypass_cache: bool = False):
+    prompt, warning = _standardize_prompt(candidate_resume, jade_format_sample)
+    if warning:
+        st.warning(warning)
+    resp = get_llm().generate(prompt, bypass_cache=bypass_cache, helper="ai_standardize_resume")
+    return resp.text
 
-# ---------------------------
-# LLM Usage Tracker
-# ---------------------------
-def estimate_tokens(text: str) -> int:
-    """Approximate tokens by word count."""
-    return len(text.split())
-
-def track_llm_usage(prompt: str, response: str):
-    """Track local token and call usage."""
-    in_toks = estimate_tokens(prompt)
-    out_toks = estimate_tokens(response)
-    st.session_state["llm_calls"] = st.session_state.get("llm_calls", 0) + 1
-    st.session_state["llm_in_tokens"] = st.session_state.get("llm_in_tokens", 0) + in_toks
-    st.session_state["llm_out_tokens"] = st.session_state.get("llm_out_tokens", 0) + out_toks
-
-def ai_screen_resumes_with_match(jd_text: str, resumes_dict: dict):
-    combined = "\n\n".join([f"Candidate: {k}\n{v}" for k, v in resumes_dict.items()])
-    prompt = f"""
-    You are an AI recruiter...
-    Job Description:
-    {jd_text}
+def ai_standardize_resume_stream(candidate_resume: str, jade_format_sample: str, bypass_cache: bool = False):
+    """Same as ai_standardize_resume, but yields text chunks as Gemini produces them."""
+    prompt, warning = _standardize_prompt(candidate_resume, jade_format_sample)
+    if warning:
+        st.warning(warning)
+    return get_llm().stream(prompt, bypass_cache=bypass_cache, helper="ai_standardize_resume")
 
-    Candidate Resumes:
-    {combined}
+def ai_standardize_many(resumes_dict: dict, jade_format_sample: str, max_workers: int = STANDARDIZE_CONCURRENCY,
+                        template: bytes = None, bypass_cache: bool = False):
+    """Standardize + render many resumes concurrently; yields StandardizedResume records as they finish.
+
+    A record's `warning` is set when its input had to be trimmed to the budget.
     """
-    resp = LLM.generate_content(prompt)
-    track_llm_usage(prompt, resp.text)
-    return resp.text
+    llm = get_llm()  # resolved here: workers run outside the Streamlit script thread
+    warnings = {}
 
-def ai_standardize_resume(candidate_resume: str, jade_format_sample: str):
-    prompt = f"Convert resume...\n\n{candidate_resume}\n\nJade Sample:\n{jade_format_sample}"
-    resp = LLM.generate_content(prompt)
-    track_llm_usage(prompt, resp.text)
-    return resp.text
+    def standardize(resume_text):
+        prompt, warnings[resume_text] = _standardize_prompt(resume_text, jade_format_sample)
+        return llm.generate(prompt, bypass_cache=bypass_cache, helper="ai_standardize_resume").text
 
-def generate_ai_email(name: str, role: str, days_left: int):
-    prompt = f"Draft a warm, short email to {name} who accepted {role}..."
-    resp = LLM.generate_content(prompt)
-    track_llm_usage(prompt, resp.text)
+    for res in standardize_many(standardize, resumes_dict, max_workers=max_workers, template=template):
+        res.warning = warnings.get(resumes_dict[res.candidate], "")
+        yield res
+
+def generate_ai_email(name: str, role: str, days_left: int, bypass_cache: bool = False):
+    prompt = engagement_prompt(name, role, days_left)
+    resp = get_llm().generate(prompt, bypass_cache=bypass_cache, helper="generate_ai_email")
     return resp.text.strip()
 
+def ai_screen_resumes_with_match(jd_text: str, resumes_dict: dict, max_workers: int = SCREEN_CONCURRENCY,
+                                 bypass_cache: bool = False):
+    """Score each resume in its own request; yields CandidateResult records as they finish."""
+    llm = get_llm()  # resolved here: workers run outside the Streamlit script thread
+
+    def generate(prompt, fresh=False):
+        return llm.generate(prompt, generation_config={"response_mime_type": "application/json"},
+                            bypass_cache=bypass_cache or fresh, helper="ai_screen_resumes_with_match").text
+
+    return screen_resumes(generate, jd_text, resumes_dict, max_workers=max_workers)
+
+# Daily post-offer engagement run (one background thread per process)
+if os.getenv("ENGAGEMENT_SCHEDULER", "0") == "1":
+    start_scheduler(generate_ai_email, send_bulk_emails)
+
 # ---------------------------
 # STREAMLIT CONFIG
 # ---------------------------
@@ -206,6 +165,7 @@ menu = [
     "🧠 LLM Utilization",
 ]
 choice = st.sidebar.radio("Modules", menu)
+bypass_cache = st.sidebar.checkbox("Bypass LLM cache", help="Force fresh Gemini responses instead of cached ones.")
 
 # ====================================================
 # 1) Resume Screening
@@ -222,31 +182,67 @@ if choice == "🔍 Resume Screening":
     resumes = st.file_uploader(
         "Upload Candidate Resumes (.txt/.docx/.pdf)", type=["txt", "docx", "pdf"], accept_multiple_files=True
     )
+    workers = st.slider("Parallel screening requests", 1, 16, SCREEN_CONCURRENCY)
+    c1, c2, c3 = st.columns(3)
+    use_prefilter = c1.checkbox("Pre-filter with local index", value=True,
+                                help="Rank the pool locally (BM25) and send only the shortlist to the LLM.")
+    top_k = c2.number_input("Top K sent to LLM", min_value=1, max_value=1000, value=PREFILTER_TOP_K)
+    min_score = c3.slider("Min pre-filter score", 0, 100, PREFILTER_MIN_SCORE)
 
     if st.button("Start Screening"):
         if not jd_text or not resumes:
             st.warning("Please provide a JD and at least one resume.")
         else:
-            resumes_dict = {r.name: read_file_content(r) for r in resumes}
-            report = ai_screen_resumes_with_match(jd_text, resumes_dict)
-            st.text_area("AI Recruiter Report", value=report, height=350)
-
-            matches = {}
-            current = None
-            for line in report.splitlines():
-                if line.lower().startswith("candidate:"):
-                    current = line.split(":", 1)[1].strip()
-                elif line.lower().startswith("match:") and current:
-                    try:
-                        matches[current] = int(line.split(":", 1)[1].replace("%", "").strip())
-                    except: pass
-            if matches:
-                sorted_items = sorted(matches.items(), key=lambda x: x[1], reverse=True)
-                fig, ax = plt.subplots()
-                ax.barh([k for k, _ in sorted_items], [v for _, v in sorted_items])
-                ax.set_xlabel("Suitability %"); ax.set_title("Candidate Suitability vs JD")
-                ax.invert_yaxis()
-                st.pyplot(fig)
+            import matplotlib.pyplot as plt
+
+            unreadable = {}
+            resumes_dict = read_many(resumes, unreadable)
+            if unreadable:
+                st.warning(f"Skipped {len(unreadable)} unreadable file(s): " +
+                           "; ".join(f"{n} ({e})" for n, e in unreadable.items()))
+            if use_prefilter:
+                from jadehire_index import get_resume_index
+                ranked_pool = get_resume_index().rank(jd_text, resumes_dict, top_k=int(top_k), min_score=min_score)
+                st.caption(f"Pre-filter shortlisted {len(ranked_pool)} of {len(resumes_dict)} resumes.")
+                with st.expander("Pre-filter scores"):
+                    st.table({"Candidate": [n for n, _ in ranked_pool], "Score": [sc for _, sc in ranked_pool]})
+                resumes_dict = {n: resumes_dict[n] for n, _ in ranked_pool}
+            progress = st.progress(0.0, text="Screening candidates...")
+            chart = st.empty()
+            results = []
+            for res in ai_screen_resumes_with_match(jd_text, resumes_dict, max_workers=workers,
+                                                    bypass_cache=bypass_cache):
+                results.append(res)
+                progress.progress(len(results) / len(resumes_dict),
+                                  text=f"Screened {len(results)}/{len(resumes_dict)}: {res.candidate}")
+                ranked = [r for r in rank_results(results) if r.ok]
+                if ranked:
+                    fig, ax = plt.subplots()
+                    ax.barh([r.candidate for r in ranked], [r.match for r in ranked])
+                    ax.set_xlabel("Suitability %"); ax.set_title("Candidate Suitability vs JD")
+                    ax.invert_yaxis()
+                    chart.pyplot(fig)
+                    plt.close(fig)
+            progress.empty()
+
+            ranked = rank_results(results)
+            st.session_state["screening_results"] = [r.to_dict() for r in ranked]
+            st.write("### AI Recruiter Report")
+            for r in ranked:
+                if not r.ok:
+                    st.error(f"{r.candidate}: screening failed — {r.error}")
+                    continue
+                with st.expander(f"{r.candidate} — {r.match}%"):
+                    st.write(r.summary)
+                    if r.strengths:
+                        st.write("**Strengths:** " + "; ".join(r.strengths))
+                    if r.gaps:
+                        st.write("**Gaps:** " + "; ".join(r.gaps))
+            st.download_button(
+                "📥 Download Results (JSON)",
+                json.dumps(st.session_state["screening_results"], indent=2).encode(),
+                "screening_results.json",
+            )
 
 # ====================================================
 # 2) Standardization
@@ -254,15 +250,66 @@ if choice == "🔍 Resume Screening":
 elif choice == "📑 Standardization":
     st.subheader("📑 Resume Standardization")
     jade_fmt = st.file_uploader("Upload Jade Sample Format", type=["txt", "docx", "pdf"])
-    cand_res = st.file_uploader("Upload Candidate Resume", type=["txt", "docx", "pdf"])
-    if st.button("Convert"):
-        if jade_fmt and cand_res:
-            out_text = ai_standardize_resume(read_file_content(cand_res), read_file_content(jade_fmt))
-            st.text_area("Standardized Resume", value=out_text, height=380)
-            st.download_button("📥 Download DOCX", out_text.encode(), "standardized_resume.docx")
-            st.download_button("📥 Download PDF", out_text.encode(), "standardized_resume.pdf")
-        else:
-            st.warning("Upload both files.")
+    # A .docx sample doubles as the template (styles, header/footer) for the rendered DOCX
+    jade_template = jade_fmt.getvalue() if jade_fmt and jade_fmt.name.lower().endswith(".docx") else None
+    single_tab, bulk_tab = st.tabs(["Single Resume", "Bulk"])
+
+    with single_tab:
+        cand_res = st.file_uploader("Upload Candidate Resume", type=["txt", "docx", "pdf"])
+        stream_out = st.checkbox("Stream output as it is generated", value=True)
+        if st.button("Convert"):
+            if jade_fmt and cand_res:
+                if stream_out:
+                    st.write("**Standardized Resume**")
+                    with st.container(height=380):
+                        out_text = st.write_stream(ai_standardize_resume_stream(
+                            read_file_content(cand_res), read_file_content(jade_fmt), bypass_cache=bypass_cache
+                        ))
+                else:
+                    out_text = ai_standardize_resume(read_file_content(cand_res), read_file_content(jade_fmt),
+                                                     bypass_cache=bypass_cache)
+                    st.text_area("Standardized Resume", value=out_text, height=380)
+                stem = os.path.splitext(cand_res.name)[0]
+                st.download_button("📥 Download DOCX", render_docx(out_text, template=jade_template),
+                                   f"{stem}_standardized.docx",
+                                   mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
+                st.download_button("📥 Download PDF", render_pdf(out_text), f"{stem}_standardized.pdf",
+                                   mime="application/pdf")
+            else:
+                st.warning("Upload both files.")
+
+    with bulk_tab:
+        bulk_res = st.file_uploader("Upload Candidate Resumes", type=["txt", "docx", "pdf"],
+                                    accept_multiple_files=True, key="bulk_resumes")
+        bulk_workers = st.slider("Parallel conversions", 1, 16, STANDARDIZE_CONCURRENCY)
+        if st.button("Convert All"):
+            if jade_fmt and bulk_res:
+                progress = st.progress(0.0, text="Standardizing resumes...")
+                status = st.empty()
+                unreadable = {}
+                bulk_texts = read_many(bulk_res, unreadable)
+                # unreadable files are listed as failures (and in the ZIP's errors.txt)
+                results = [StandardizedResume(candidate=n, error=f"unreadable: {e}") for n, e in unreadable.items()]
+                rows = [{"Resume": r.candidate, "Status": f"❌ {r.error}", "Seconds": 0.0} for r in results]
+                for res in ai_standardize_many(bulk_texts, read_file_content(jade_fmt),
+                                               max_workers=bulk_workers, template=jade_template,
+                                               bypass_cache=bypass_cache):
+                    results.append(res)
+                    status_text = f"❌ {res.error}" if not res.ok else f"⚠️ {res.warning}" if res.warning else "✅ Done"
+                    rows.append({"Resume": res.candidate, "Status": status_text, "Seconds": res.seconds})
+                    progress.progress(len(results) / len(bulk_res),
+                                      text=f"Standardized {len(results)}/{len(bulk_res)}: {res.candidate}")
+                    status.dataframe(rows, use_container_width=True)
+                ok = sum(r.ok for r in results)
+                st.success(f"{ok}/{len(results)} resumes standardized.")
+                trimmed = [r.candidate for r in results if r.warning]
+                if trimmed:
+                    st.warning(f"{len(trimmed)} resume(s) exceeded STANDARDIZE_TOKEN_BUDGET and were trimmed, so "
+                               f"their output may be missing content: {', '.join(trimmed)}")
+                st.download_button("📦 Download ZIP (DOCX + PDF)", build_zip(results),
+                                   "standardized_resumes.zip", mime="application/zip")
+            else:
+                st.warning("Upload the Jade sample and at least one resume.")
 
 # ====================================================
 # 3) Scheduling & Coordination
@@ -283,7 +330,7 @@ elif choice == "📅 Scheduling & Coordination":
             value="Schedule interview with candidate jane.doe@example.com and panel lead@jadehire.com on Friday at 3pm IST for Data Engineer.",
         )
         if st.button("AI Extract Details"):
-            parsed = ai_extract_schedule(instr)
+            parsed = ai_extract_schedule(instr, bypass_cache=bypass_cache)
             if parsed:
                 st.session_state.update(parsed)
                 st.success("Details parsed. Review below.")
@@ -307,6 +354,7 @@ elif choice == "📅 Scheduling & Coordination":
                 "attendees": [{"email": cand}] + ([{"email": panel}] if panel else []),
             }
             ev = service.events().insert(calendarId="primary", body=event, sendUpdates="all").execute()
+            get_calendar_store().upsert(ev)
             st.success(f"Event created ✅  →  {ev.get('htmlLink')}")
 
     # ---------- Reschedule ----------
@@ -317,16 +365,9 @@ elif choice == "📅 Scheduling & Coordination":
         new_time = st.time_input("New Time", datetime.time(11, 0))
 
         if st.button("Find Candidate Events"):
-            service = get_google_service("calendar", "v3")
-            now = datetime.datetime.utcnow().isoformat() + "Z"
-            res = service.events().list(
-                calendarId="primary", timeMin=now, maxResults=50, singleEvents=True, orderBy="startTime"
-            ).execute()
-            items = res.get("items", [])
-            matches = [
-                e for e in items
-                if any(att.get("email", "").lower() == search_email.lower() for att in e.get("attendees", []))
-            ]
+            store = get_calendar_store()
+            store.sync()
+            matches = store.events_for_attendee(search_email, start=datetime.datetime.utcnow())
             if not matches:
                 st.warning("No upcoming events for that candidate.")
             else:
@@ -346,19 +387,16 @@ elif choice == "📅 Scheduling & Coordination":
             event["end"]["dateTime"] = end.isoformat()
             event["end"]["timeZone"] = TIMEZONE
             upd = service.events().update(calendarId="primary", eventId=event["id"], body=event, sendUpdates="all").execute()
+            get_calendar_store().upsert(upd)
             st.success(f"Rescheduled ✅  →  {upd.get('htmlLink')}")
 
     # ---------- History ----------
     with tabs[2]:
         st.write("### Past Events (last 12 months)")
-        service = get_google_service("calendar", "v3")
+        store = get_calendar_store()
+        store.sync()
         now = datetime.datetime.utcnow()
-        start = (now - datetime.timedelta(days=365)).isoformat() + "Z"
-        end = now.isoformat() + "Z"
-        res = service.events().list(
-            calendarId="primary", timeMin=start, timeMax=end, maxResults=100, singleEvents=True, orderBy="startTime"
-        ).execute()
-        events = res.get("items", [])
+        events = store.events_between(now - datetime.timedelta(days=365), now)
         if not events:
             st.info("No past events found.")
         else:
@@ -369,14 +407,10 @@ elif choice == "📅 Scheduling & Coordination":
     # ---------- Reminders ----------
     with tabs[3]:
         st.write("### Upcoming Events (next 30 days) + Email Reminder")
-        service = get_google_service("calendar", "v3")
+        store = get_calendar_store()
+        store.sync()
         now = datetime.datetime.utcnow()
-        start = now.isoformat() + "Z"
-        end = (now + datetime.timedelta(days=30)).isoformat() + "Z"
-        res = service.events().list(
-            calendarId="primary", timeMin=start, timeMax=end, maxResults=50, singleEvents=True, orderBy="startTime"
-        ).execute()
-        events = res.get("items", [])
+        events = store.events_between(now, now + datetime.timedelta(days=30))
         if not events:
             st.info("No upcoming events.")
         else:
@@ -387,14 +421,12 @@ elif choice == "📅 Scheduling & Coordination":
                 subject = f"Reminder: {e.get('summary','Interview')}"
                 when = e["start"].get("dateTime", "")
                 attendees = [a.get("email") for a in e.get("attendees", []) if a.get("email")]
-                sent_to = []
-                for addr in attendees:
-                    body = f"Reminder for: {e.get('summary','Interview')}\nWhen: {when}\n\nSee invite for details."
-                    try:
-                        send_email_gmail(addr, subject, body)
-                        sent_to.append(addr)
-                    except Exception as ex:
-                        st.error(f"Failed to email {addr}: {ex}")
+                body = f"Reminder for: {e.get('summary','Interview')}\nWhen: {when}\n\nSee invite for details."
+                report = send_bulk_emails([(addr, subject, body) for addr in attendees])
+                for r in report:
+                    if not r.ok:
+                        st.error(f"Failed to email {r.to}: {r.error}")
+                sent_to = [r.to for r in report if r.ok]
                 if sent_to:
                     st.success(f"Reminder sent to: {', '.join(sent_to)}")
 
@@ -430,6 +462,7 @@ elif choice == "🤝 Post-Offer Candidate Connect":
         "Follow-Ups",
         "Onboarding Material",
         "Check-Ins & Concerns",
+        "Offer Pipeline",
     ])
 
     # ---------- Candidate Setup ----------
@@ -440,6 +473,8 @@ elif choice == "🤝 Post-Offer Candidate Connect":
         join_date = st.date_input("Joining Date", value=st.session_state.get("po_join", datetime.date.today()))
         if st.button("Save Candidate"):
             st.session_state.update({"po_name": name, "po_email": email, "po_role": role, "po_join": join_date})
+            if email:
+                get_engagement_store().upsert_candidate(name, email, role, join_date)
             st.success("Candidate saved ✅")
 
     # ---------- Engagement Timeline ----------
@@ -459,7 +494,8 @@ elif choice == "🤝 Post-Offer Candidate Connect":
             which = st.selectbox("Choose checkpoint", list(checkpoints.keys()))
             if st.button("Generate AI Email"):
                 dleft = (jd - datetime.date.today()).days
-                draft = generate_ai_email(st.session_state.get("po_name","Candidate"), st.session_state.get("po_role","Role"), dleft)
+                draft = generate_ai_email(st.session_state.get("po_name","Candidate"), st.session_state.get("po_role","Role"), dleft,
+                                          bypass_cache=bypass_cache)
                 st.session_state["po_draft"] = draft
                 st.success("Draft generated.")
             st.text_area("Email Draft (editable)", key="po_draft", height=220)
@@ -514,6 +550,7 @@ elif choice == "🤝 Post-Offer Candidate Connect":
                     "attendees": [{"email": st.session_state.get("po_email","")}],
                 }
                 created = cal.events().insert(calendarId="primary", body=ev, sendUpdates="all").execute()
+                get_calendar_store().upsert(created)
                 st.success(f"Check-in scheduled ✅  →  {created.get('htmlLink')}")
             except Exception as ex:
                 st.error(f"Calendar error: {ex}")
@@ -531,23 +568,120 @@ elif choice == "🤝 Post-Offer Candidate Connect":
             st.write("Saved concerns:")
             for c in st.session_state["po_concerns"]:
                 st.write(f"- [{c['when']}] {c['text']}")
+
+    # ---------- Offer Pipeline ----------
+    with tabs[5]:
+        st.write("#### All Offers in Flight")
+        store = get_engagement_store()
+        roster = st.file_uploader("Bulk add candidates (CSV: name,email,role,join_date YYYY-MM-DD)", type=["csv"])
+        if roster and st.button("Import Candidates"):
+            rows = list(csv.DictReader(io.StringIO(roster.getvalue().decode("utf-8", errors="ignore"))))
+            added = 0
+            for r in rows:
+                try:
+                    store.upsert_candidate(r["name"], r["email"], r.get("role", ""),
+                                           datetime.date.fromisoformat(r["join_date"].strip()))
+                    added += 1
+                except (KeyError, ValueError) as ex:
+                    st.error(f"Skipped row {r}: {ex}")
+            st.success(f"Imported {added} candidate(s).")
+
+        counts = store.status_counts()
+        cols = st.columns(5)
+        for col, status in zip(cols, ["pending", "drafted", "sent", "failed", "skipped"]):
+            col.metric(status.title(), counts.get(status, 0))
+        if counts.get("sending"):
+            st.warning(f"{counts['sending']} checkpoint(s) were interrupted mid-send; check the mailbox before resending.")
+
+        if st.button("Run Due Checkpoints Now"):
+            with st.spinner("Drafting and sending due engagement emails..."):
+                report = run_due_checkpoints(
+                    store,
+                    lambda n, r, d: generate_ai_email(n, r, d, bypass_cache=bypass_cache),
+                    send_bulk_emails,
+                )
+            st.success(f"Due: {report['due']} · Drafted: {report['drafted']} · Sent: {report['sent']} · "
+                       f"Failed: {report['failed'] + report['draft_errors']}")
+
+        upcoming = [r for r in store.checkpoint_rows() if r["status"] != "skipped"]
+        if upcoming:
+            st.dataframe(upcoming, height=320)
+        else:
+            st.info("No candidates in the pipeline yet.")
+
 # ====================================================
 # 5) LLM Utilization
 # ====================================================
 elif choice == "🧠 LLM Utilization":
     st.subheader("🧠 LLM Utilization & Quota Tracking")
 
-    calls = st.session_state.get("llm_calls", 0)
-    in_tokens = st.session_state.get("llm_in_tokens", 0)
-    out_tokens = st.session_state.get("llm_out_tokens", 0)
-    total_tokens = in_tokens + out_tokens
+    windows = {"Last hour": 3600, "Last 24 hours": 86400, "Last 7 days": 7 * 86400, "Last 30 days": 30 * 86400}
+    window = st.selectbox("Window", list(windows), index=1)
+    since = datetime.datetime.now().timestamp() - windows[window]
+    metrics = get_llm_metrics()
+    summary = metrics.summary(since)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("LLM API Calls", summary["calls"])
+    col2.metric("Input Tokens", summary["prompt_tokens"])
+    col3.metric("Output Tokens", summary["output_tokens"])
+    col4.metric("Total Tokens", summary["prompt_tokens"] + summary["output_tokens"])
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Latency p50", f"{summary['p50_ms'] / 1000:.2f} s")
+    col2.metric("Latency p95", f"{summary['p95_ms'] / 1000:.2f} s")
+    col3.metric("Latency p99", f"{summary['p99_ms'] / 1000:.2f} s")
+    col4.metric("Throughput", f"{summary['calls_per_min']:.2f} calls/min")
+    st.caption(f"Errors: {summary['errors']} · Retries: {summary['retries']} · Served from cache: {summary['cache_hits']}")
+
+    series = metrics.timeseries(since, bucket_s=300 if windows[window] <= 3600 else 3600)
+    if series:
+        import matplotlib.pyplot as plt
+
+        fig, (ax1, ax2) = plt.subplots(2, 1, sharex=True)
+        when = [datetime.datetime.fromtimestamp(p["bucket"]) for p in series]
+        ax1.bar(when, [p["calls"] for p in series], width=0.002 if windows[window] <= 3600 else 0.03)
+        ax1.set_ylabel("Calls")
+        ax2.plot(when, [p["prompt_tokens"] for p in series], label="Input")
+        ax2.plot(when, [p["output_tokens"] for p in series], label="Output")
+        ax2.set_ylabel("Tokens"); ax2.legend()
+        fig.autofmt_xdate()
+        st.pyplot(fig)
+        plt.close(fig)
+
+    st.write("### Per Helper")
+    helpers = metrics.by_helper(since)
+    if helpers:
+        st.table({
+            "Helper": [h["helper"] for h in helpers],
+            "Calls": [h["calls"] for h in helpers],
+            "Errors": [h["errors"] for h in helpers],
+            "Retries": [h["retries"] for h in helpers],
+            "Input Tokens": [h["prompt_tokens"] for h in helpers],
+            "Output Tokens": [h["output_tokens"] for h in helpers],
+            "p50 (s)": [round(h["p50_ms"] / 1000, 2) for h in helpers],
+            "p95 (s)": [round(h["p95_ms"] / 1000, 2) for h in helpers],
+            "p99 (s)": [round(h["p99_ms"] / 1000, 2) for h in helpers],
+        })
+    else:
+        st.info("No LLM calls recorded in this window.")
+
+    c1, c2 = st.columns(2)
+    c1.download_button("📥 Export Calls (CSV)", metrics.export_csv(since).encode(), "llm_calls.csv")
+    c2.download_button("📥 Export Metrics (Prometheus)", metrics.export_prometheus().encode(), "jadehire_llm.prom")
 
-    col1, col2, col3 = st.columns(3)
-    col1.metric("LLM API Calls", calls)
-    col2.metric("Input Tokens (approx)", in_tokens)
-    col3.metric("Output Tokens (approx)", out_tokens)
-
-    st.metric("Total Tokens (approx)", total_tokens)
+    st.markdown("---")
+    st.write("### Response Cache")
+    cache_stats = get_llm_cache().stats()
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Cache Hits", cache_stats["hits"])
+    c2.metric("Cache Misses", cache_stats["misses"])
+    c3.metric("Hit Rate", f"{(100 * cache_stats['hits'] / lookups) if lookups else 0:.0f}%")
+    c4.metric("Cached Responses", cache_stats["entries"])
+    if st.button("Clear LLM Cache"):
+        get_llm_cache().clear()
+        st.success("LLM response cache cleared.")
 
     st.markdown("---")
     st.write("### Provider Quota")
@@ -0,0 +1,199 @@
+# bench_pipeline.py
+"""End-to-end throughput/latency benchmark for JadeHire's batch paths, fully offline.
+
+    python bench_pipeline.py --out bench.json                  # full run, JSON report
+    python bench_pipeline.py --quick                           # small sizes (CI smoke run)
+    python bench_pipeline.py --baseline bench.json             # exit 1 if anything regressed
+
+Scenarios (each one uses local stand-ins, nothing leaves the machine):
+  extraction  synthetic DOCX/PDF/TXT resumes through read_many, cold then cached
+  screening   screen_resumes against FakeModel (latency, random 429/5xx, per-minute quota)
+  email       send_bulk_emails against FakeGmailService (latency, per-second quota, 503s)
+  calendar    CalendarStore full + incremental sync from FakeCalendarService, attendee lookups
+
+Every random choice is seeded (including retry backoff), so two runs with the
+same arguments do the same work; each scenario runs --repeat times and the
+report keeps the median of every metric. Compare reports from the same
+machine: metrics ending in _per_s are better when higher, p50/p95 and sync
+times (_ms) when lower; max_ms is informational and _ms changes under
+--min-delta-ms are ignored as timer noise.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [HERE, os.path.dirname(HERE)]
+
+from bench_common import add_common_args, pcts, rate, run  # noqa: E402
+
+SCENARIOS = ["extraction", "screening", "email", "calendar"]
+
+_SKILLS = """python sql spark airflow kafka snowflake dbt aws azure gcp docker kubernetes terraform react
+typescript java scala tableau powerbi pandas pytorch tensorflow mlops salesforce sap workday jira agile
+scrum leadership stakeholder negotiation recruiting onboarding payroll compliance gxp validation""".split()
+
+# ---------------------------
+# Synthetic data
+# ---------------------------
+def synthetic_resume(rng: random.Random, i: int) -> str:
+    skills = rng.sample(_SKILLS, 8)
+    lines = [f"# Candidate {i:05d}", f"candidate{i:05d}@example.com | +1 555 {i:04d}", "",
+             "## Summary", f"Engineer with {rng.randint(2, 15)} years of experience in {', '.join(skills[:3])}.",
+             "", "## Experience"]
+    for job in range(rng.randint(2, 5)):
+        lines.append(f"**Company {rng.randint(1, 400)}** - Senior Engineer ({2010 + job}-{2012 + job})")
+        lines += [f"- Delivered {rng.choice(skills)} projects using {rng.choice(skills)} and {rng.choice(skills)} "
+                  f"for {rng.randint(2, 90)} internal teams." for _ in range(rng.randint(3, 7))]
+    lines += ["", "## Education", f"B.Sc. Computer Science, University {rng.randint(1, 50)}",
+              "", "## Skills", ", ".join(skills)]
+    return "\n".join(lines)
+
+def synthetic_jd(rng: random.Random) -> str:
+    return ("Senior Data Engineer\nWe need hands-on experience with " + ", ".join(rng.sample(_SKILLS, 10)) +
+            ".\nResponsibilities: build pipelines, mentor engineers, work with stakeholders.")
+
+def write_resumes(folder: str, n: int, rng: random.Random) -> dict:
+    """n resume files (DOCX, PDF, TXT in turn) -> {path: source text}."""
+    from jadehire_render import render_docx, render_pdf
+    out = {}
+    for i in range(n):
+        text = synthetic_resume(rng, i)
+        kind = ("docx", "pdf", "txt")[i % 3]
+        path = os.path.join(folder, f"resume_{i:05d}.{kind}")
+        data = render_docx(text) if kind == "docx" else render_pdf(text) if kind == "pdf" else text.encode()
+        with open(path, "wb") as f:
+            f.write(data)
+        out[path] = text
+    return out
+
+# ---------------------------
+# Scenarios
+# ---------------------------
+def bench_extraction(args, workdir: str, rng: random.Random, state: dict) -> dict:
+    from jadehire_files import LocalFile, extract_text, file_kind, read_many
+    folder = os.path.join(workdir, "resumes")
+    os.makedirs(folder)
+    sources = write_resumes(folder, args.resumes, rng)
+    files = [LocalFile(p, os.path.basename(p)) for p in sources]
+
+    started = time.perf_counter()
+    texts = read_many(files)
+    cold = time.perf_counter() - started
+    started = time.perf_counter()
+    read_many(files)
+    warm = time.perf_counter() - started
+
+    per_file = []
+    for f in files[:args.extract_sample]:
+        data = f.getvalue()
+        t = time.perf_counter()
+        extract_text(file_kind(f.name), data)
+        per_file.append(time.perf_counter() - t)
+    state["resumes"] = texts
+    return {"files": len(files), "cold_files_per_s": rate(len(files), cold),
+            "warm_files_per_s": rate(len(files), warm), **pcts(per_file, "extract_")}
+
+def bench_screening(args, workdir: str, rng: random.Random, state: dict) -> dict:
+    from jadehire_llm import CachedLLM, FakeModel
+    from jadehire_screening import RateLimiter, screen_resumes
+    resumes = state.get("resumes") or {f"resume_{i:05d}.txt": synthetic_resume(rng, i) for i in range(args.resumes)}
+    model = FakeModel(latency=args.llm_latency, jitter=args.llm_latency / 2, failure_rate=args.llm_failure_rate,
+                      seed=args.seed, rpm=args.llm_quota_rpm)
+    llm = CachedLLM(model, cache=None, metrics=None)
+    limiter = RateLimiter(args.llm_rpm, burst=args.screen_workers) if args.llm_rpm else None
+
+    def generate(prompt, fresh=False):
+        return llm.generate(prompt, generation_config={"response_mime_type": "application/json"},
+                            bypass_cache=fresh, helper="bench").text
+
+    started = time.perf_counter()
+    results = list(screen_resumes(generate, synthetic_jd(rng), resumes, args.screen_workers, limiter))
+    elapsed = time.perf_counter() - started
+    return {"candidates": len(results), "candidates_per_s": rate(len(results), elapsed),
+            **pcts([r.seconds for r in results], "latency_"), "errors": sum(not r.ok for r in results),
+            "model_calls": model.calls, "throttled": model.throttled}
+
+def bench_email(args, workdir: str, rng: random.Random, state: dict) -> dict:
+    from jadehire_fakes import FakeGmailService
+    from jadehire_google import send_bulk_emails
+    service = FakeGmailService(latency=args.mail_latency, jitter=args.mail_latency / 2, qps=args.mail_qps,
+                               failure_rate=args.mail_failure_rate, seed=args.seed)
+    messages = [(f"candidate{i:05d}@example.com", "Your interview", f"Hello {i}, see you on Monday.")
+                for i in range(args.emails)]
+    started = time.perf_counter()
+    results = send_bulk_emails(messages, max_workers=args.mail_workers, service=service)
+    elapsed = time.perf_counter() - started
+    spans = {}
+    for raw, begin, end, _ in service.requests:
+        first, _ = spans.get(raw, (begin, end))
+        spans[raw] = (min(first, begin), end)
+    return {"messages": len(results), "messages_per_s": rate(len(results), elapsed),
+            **pcts([end - begin for begin, end in spans.values()], "latency_"),
+            "failed": sum(not r.ok for r in results), "requests": len(service.requests),
+            "throttled": sum(1 for r in service.requests if r[3] == 429)}
+
+def bench_calendar(args, workdir: str, rng: random.Random, state: dict) -> dict:
+    import datetime
+    from jadehire_fakes import FakeCalendarService
+    from jadehire_google import CalendarStore
+    service = FakeCalendarService(args.events, candidates=max(1, args.events // 10), latency=args.cal_latency,
+                                  seed=args.seed)
+    store = CalendarStore(os.path.join(workdir, "calendar.sqlite3"))
+    started = time.perf_counter()
+    store.sync(service, force=True)
+    full = time.perf_counter() - started
+    service.touch(args.cal_changes)
+    started = time.perf_counter()
+    changed = store.sync(service, force=True)
+    incremental = time.perf_counter() - started
+
+    window_start = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    window_end = window_start + datetime.timedelta(days=400)
+    lookups = []
+    for email in (rng.choice(service.candidates) for _ in range(args.lookups)):
+        t = time.perf_counter()
+        store.events_for_attendee(email, window_start, window_end)
+        lookups.append(time.perf_counter() - t)
+    return {"events": args.events, "full_sync_ms": round(full * 1000, 1),
+            "incremental_sync_ms": round(incremental * 1000, 1), "incremental_changed": changed,
+            **pcts(lookups, "lookup_")}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_common_args(ap, SCENARIOS)
+    ap.add_argument("--resumes", type=int, default=300)
+    ap.add_argument("--extract-sample", type=int, default=60, help="files timed one by one for extract p95")
+    ap.add_argument("--llm-latency", type=float, default=0.4, help="mean seconds per fake Gemini call")
+    ap.add_argument("--llm-failure-rate", type=float, default=0.02)
+    ap.add_argument("--llm-quota-rpm", type=int, default=900, help="fake server quota (429 above it)")
+    ap.add_argument("--llm-rpm", type=int, default=600, help="client-side limiter (GEMINI_RPM)")
+    ap.add_argument("--screen-workers", type=int, default=8)
+    ap.add_argument("--emails", type=int, default=400)
+    ap.add_argument("--mail-latency", type=float, default=0.08)
+    ap.add_argument("--mail-qps", type=int, default=40)
+    ap.add_argument("--mail-failure-rate", type=float, default=0.02)
+    ap.add_argument("--mail-workers", type=int, default=8)
+    ap.add_argument("--events", type=int, default=20000)
+    ap.add_argument("--cal-latency", type=float, default=0.1, help="seconds per fake Calendar request")
+    ap.add_argument("--cal-changes", type=int, default=50)
+    ap.add_argument("--lookups", type=int, default=500)
+    args = ap.parse_args(argv)
+    if args.quick:
+        args.resumes, args.extract_sample, args.emails = min(args.resumes, 45), min(args.extract_sample, 15), 80
+        args.events, args.lookups, args.llm_latency = min(args.events, 3000), min(args.lookups, 100), 0.1
+
+    workdir = tempfile.mkdtemp(prefix="jadehire_bench_")
+    # Keep every cache the code under test touches inside the scratch directory
+    os.environ["TEXT_CACHE_DIR"] = os.path.join(workdir, "text")
+    os.environ["RESUME_INDEX_PATH"] = os.path.join(workdir, "index.sqlite3")
+    bench = {"extraction": bench_extraction, "screening": bench_screening, "email": bench_email,
+             "calendar": bench_calendar}
+    return run(ap, args, bench, "jadehire_pipeline", HERE, {}, workdir=workdir)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+# bench_startup.py
+"""Cold-start and rerun timing for the JadeHire Streamlit app.
+
+    python bench_startup.py                       # print a JSON report
+    python bench_startup.py --max-cold-ms 2500    # exit 1 if cold start regresses past the budget
+
+Each sample starts a fresh interpreter, runs the app once with Streamlit's
+AppTest harness (cold: imports + first render), then reruns it and switches
+through every module (warm reruns, as on widget interaction). Pages that need
+Google OAuth are skipped.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP = os.path.join(HERE, "TalentAcquisition_JadeHire.py")
+PAGES = ["🔍 Resume Screening", "📑 Standardization", "🤝 Post-Offer Candidate Connect", "🧠 LLM Utilization"]
+HEAVY_MODULES = ["matplotlib", "numpy", "google.generativeai", "googleapiclient", "docx", "PyPDF2"]
+
+_CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t_st = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.run()
+t_cold = time.perf_counter()
+assert not at.exception, at.exception
+reruns = []
+for _ in range({reruns}):
+    t = time.perf_counter(); at.run(); reruns.append((time.perf_counter() - t) * 1000)
+pages = {{}}
+for page in {pages!r}:
+    t = time.perf_counter(); at.sidebar.radio[0].set_value(page).run(); pages[page] = (time.perf_counter() - t) * 1000
+    assert not at.exception, (page, at.exception)
+print(json.dumps({{
+    "streamlit_import_ms": (t_st - t0) * 1000,
+    "cold_ms": (t_cold - t_st) * 1000,
+    "rerun_ms": reruns,
+    "page_ms": pages,
+    "heavy_loaded_after_pages": sorted(m for m in {heavy!r} if m in sys.modules),
+}}))
+"""
+
+_COLD_HEAVY = r"""
+import json, sys
+from streamlit.testing.v1 import AppTest
+AppTest.from_file({app!r}, default_timeout=120).run()
+print(json.dumps(sorted(m for m in {heavy!r} if m in sys.modules)))
+"""
+
+def _child(code: str, workdir: str) -> str:
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    out = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                         capture_output=True, text=True, check=True)
+    return out.stdout.strip().splitlines()[-1]
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--samples", type=int, default=3, help="fresh interpreters to start")
+    ap.add_argument("--reruns", type=int, default=10, help="warm reruns per sample")
+    ap.add_argument("--max-cold-ms", type=float, default=0, help="fail if median cold start exceeds this")
+    ap.add_argument("--max-rerun-ms", type=float, default=0, help="fail if median rerun exceeds this")
+    args = ap.parse_args(argv)
+
+    samples = [json.loads(_child(_CHILD.format(app=APP, reruns=args.reruns, pages=PAGES, heavy=HEAVY_MODULES), HERE))
+               for _ in range(args.samples)]
+    cold_heavy = json.loads(_child(_COLD_HEAVY.format(app=APP, heavy=HEAVY_MODULES), HERE))
+    reruns = [ms for s in samples for ms in s["rerun_ms"]]
+    report = {
+        "samples": args.samples,
+        "streamlit_import_ms": round(statistics.median(s["streamlit_import_ms"] for s in samples), 1),
+        "cold_start_ms": round(statistics.median(s["cold_ms"] for s in samples), 1),
+        "rerun_ms_p50": round(statistics.median(reruns), 1),
+        "rerun_ms_max": round(max(reruns), 1),
+        "page_switch_ms": {p: round(statistics.median(s["page_ms"][p] for s in samples), 1) for p in PAGES},
+        "heavy_modules_loaded_on_cold_start": cold_heavy,
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    failed = False
+    if args.max_cold_ms and report["cold_start_ms"] > args.max_cold_ms:
+        print(f"cold start {report['cold_start_ms']} ms > budget {args.max_cold_ms} ms", file=sys.stderr)
+        failed = True
+    if args.max_rerun_ms and report["rerun_ms_p50"] > args.max_rerun_ms:
+        print(f"rerun {report['rerun_ms_p50']} ms > budget {args.max_rerun_ms} ms", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+# jadehire_cli.py
+"""Headless batch resume screening.
+
+    python jadehire_cli.py --jd jd.pdf --resumes ./resumes --out results.jsonl
+    python jadehire_cli.py --jd jd.txt --resumes ./resumes --out results.csv --backend fake
+
+Results are appended to the output (JSONL or CSV) as each candidate
+finishes. Successfully screened files are listed in `<out>.done`, so
+re-running the same command after a crash or quota stop resumes where it
+left off. Failures, including files that cannot be read, go to
+`<out>.errors` (same format, rewritten on every run) instead of the output,
+and are screened again on the next run; the run carries on past them and
+exits 1 at the end.
+"""
+import argparse
+import csv
+import importlib
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from jadehire_files import LocalFile, read_file_content, read_many
+from jadehire_index import ResumeIndex, get_resume_index
+from jadehire_llm import LLM_RETRIES, CachedLLM, FakeModel, gemini_model, get_llm_cache, get_llm_metrics
+from jadehire_prompt import PROMPT_TOKEN_BUDGET
+from jadehire_screening import CandidateResult, RateLimiter, screen_resumes
+
+RESUME_EXTENSIONS = (".pdf", ".docx", ".txt")
+CSV_FIELDS = ["candidate", "match", "summary", "strengths", "gaps", "error", "seconds"]
+QUOTA_MARKERS = ("429", "RESOURCE_EXHAUSTED", "ResourceExhausted", "quota")
+
+# ---------------------------
+# Backends
+# ---------------------------
+def load_model(backend: str, args):
+    """`gemini`, `fake`, or `package.module:factory` returning a GenerativeModel-like object."""
+    if backend == "gemini":
+        return gemini_model(args.model)
+    if backend == "fake":
+        return FakeModel(latency=args.fake_latency, jitter=args.fake_latency / 2,
+                         failure_rate=args.fake_failure_rate, seed=args.seed)
+    module, _, attr = backend.partition(":")
+    return getattr(importlib.import_module(module), attr or "model")()
+
+def make_generate(llm: CachedLLM):
+    def generate(prompt, fresh=False):
+        return llm.generate(prompt, generation_config={"response_mime_type": "application/json"},
+                            bypass_cache=fresh, helper="ai_screen_resumes_with_match").text
+    return generate
+
+# ---------------------------
+# Output + checkpoint
+# ---------------------------
+class ResultWriter:
+    """Appends successful records to JSONL or CSV, failures to `<out>.errors`, and records completed files."""
+
+    def __init__(self, out_path: str):
+        self.is_csv = out_path.lower().endswith(".csv")
+        self.out, self.csv = self._open(out_path, "a")
+        self.errors, self.errors_csv = self._open(out_path + ".errors", "w")
+        self.done = open(out_path + ".done", "a", encoding="utf-8")
+
+    def _open(self, path: str, mode: str):
+        new_file = mode == "w" or not os.path.exists(path) or os.path.getsize(path) == 0
+        f = open(path, mode, encoding="utf-8", newline="")
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS) if self.is_csv else None
+        if writer and new_file:
+            writer.writeheader()
+        return f, writer
+
+    @staticmethod
+    def completed(out_path: str) -> set:
+        path = out_path + ".done"
+        if not os.path.exists(path):
+            return set()
+        with open(path, "r", encoding="utf-8") as f:
+            return {line.rstrip("\n") for line in f if line.strip()}
+
+    def write(self, result):
+        row = result.to_dict()
+        out, writer = (self.out, self.csv) if result.ok else (self.errors, self.errors_csv)
+        if writer:
+            row["strengths"] = "; ".join(row["strengths"])
+            row["gaps"] = "; ".join(row["gaps"])
+            writer.writerow(row)
+        else:
+            out.write(json.dumps(row) + "\n")
+        out.flush()
+        if result.ok:
+            self.done.write(result.candidate + "\n")
+            self.done.flush()
+
+    def close(self):
+        self.out.close()
+        self.errors.close()
+        self.done.close()
+
+# ---------------------------
+# Batch run
+# ---------------------------
+def list_resumes(folder: str) -> list:
+    paths = []
+    for root, _, files in os.walk(folder):
+        for fn in files:
+            if fn.lower().endswith(RESUME_EXTENSIONS):
+                paths.append(os.path.join(root, fn))
+    return sorted(paths)
+
+def chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def shortlist(jd_text: str, folder: str, paths: list, top_k: int, index: ResumeIndex, errors: dict = None) -> list:
+    """Rank every readable resume locally and keep the top K paths; unreadable ones go to `errors`."""
+    texts = {}
+    for batch in chunks(paths, 256):
+        texts.update(read_many([LocalFile(p, os.path.relpath(p, folder)) for p in batch], errors))
+    keep = {name for name, _ in index.rank(jd_text, texts, top_k=top_k)}
+    return [p for p in paths if os.path.relpath(p, folder) in keep]
+
+def run(args) -> int:
+    jd_text = read_file_content(LocalFile(args.jd))
+    paths = list_resumes(args.resumes)
+    unreadable = {}  # relative name -> extraction error; reported as failed candidates
+    if args.top_k:
+        paths = shortlist(jd_text, args.resumes, paths, args.top_k, get_resume_index(), unreadable)
+    done = ResultWriter.completed(args.out)
+    todo = [p for p in paths if os.path.relpath(p, args.resumes) not in done]
+    print(f"{len(paths)} resumes, {len(paths) - len(todo)} already screened, {len(todo)} to go.", file=sys.stderr)
+
+    limiter = RateLimiter(args.rpm, burst=args.workers) if args.rpm else None
+    llm = CachedLLM(load_model(args.backend, args), None if args.no_cache else get_llm_cache(), get_llm_metrics(),
+                    retries=args.retries, limiter=limiter)
+    generate = make_generate(llm)
+    writer = ResultWriter(args.out)
+    started = time.perf_counter()
+    screened = failed = quota_streak = 0
+    try:
+        for name, error in unreadable.items():
+            writer.write(CandidateResult(candidate=name, error=f"unreadable: {error}"))
+            failed += 1
+        for batch in chunks(todo, max(args.workers * 8, 32)):
+            unreadable = {}
+            texts = read_many([LocalFile(p, os.path.relpath(p, args.resumes)) for p in batch], unreadable)
+            for name, error in unreadable.items():
+                writer.write(CandidateResult(candidate=name, error=f"unreadable: {error}"))
+                screened += 1
+                failed += 1
+            for result in screen_resumes(generate, jd_text, texts, max_workers=args.workers, retries=args.retries,
+                                         token_budget=args.token_budget):
+                writer.write(result)
+                screened += 1
+                failed += 0 if result.ok else 1
+                quota_streak = quota_streak + 1 if any(m in result.error for m in QUOTA_MARKERS) else 0
+                elapsed = time.perf_counter() - started
+                if screened % args.progress_every == 0 or screened == len(todo):
+                    rate = screened / elapsed * 60 if elapsed else 0.0
+                    eta = (len(todo) - screened) / (screened / elapsed) if screened else 0.0
+                    print(f"[{screened}/{len(todo)}] {rate:.1f} resumes/min, {failed} failed, ETA {eta:.0f}s",
+                          file=sys.stderr)
+            if quota_streak >= args.max_quota_failures:
+                print("Stopping: provider quota exhausted. Re-run the same command to resume.", file=sys.stderr)
+                return 2
+    finally:
+        writer.close()
+        elapsed = time.perf_counter() - started
+        summary = {
+            "screened": screened,
+            "failed": failed,
+            "seconds": round(elapsed, 2),
+            "resumes_per_min": round(screened / elapsed * 60, 1) if elapsed else 0.0,
+            "llm": get_llm_metrics().summary(time.time() - elapsed, min_window_s=0),
+        }
+        print(json.dumps(summary), file=sys.stderr)
+    return 1 if failed else 0
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Screen a directory of resumes against a JD.")
+    ap.add_argument("--jd", required=True, help="Job description file (.txt/.docx/.pdf)")
+    ap.add_argument("--resumes", required=True, help="Directory of resumes (searched recursively)")
+    ap.add_argument("--out", required=True, help="Output file; .csv for CSV, anything else is JSONL")
+    ap.add_argument("--workers", type=int, default=int(os.getenv("SCREEN_CONCURRENCY", "4")))
+    ap.add_argument("--rpm", type=int, default=int(os.getenv("GEMINI_RPM", "60")), help="0 disables rate limiting")
+    ap.add_argument("--retries", type=int, default=LLM_RETRIES,
+                    help="Retries per candidate for transient API errors (429/5xx) and for unusable replies")
+    ap.add_argument("--token-budget", type=int, default=PROMPT_TOKEN_BUDGET,
+                    help="Max prompt tokens per candidate (JD + most relevant resume sections)")
+    ap.add_argument("--top-k", type=int, default=0, help="Pre-filter with the local index and screen only the top K")
+    ap.add_argument("--backend", default="gemini", help="gemini | fake | package.module:factory")
+    ap.add_argument("--model", default=os.getenv("GEMINI_MODEL", "gemini-2.5-flash"))
+    ap.add_argument("--no-cache", action="store_true", help="Skip the LLM response cache")
+    ap.add_argument("--fake-latency", type=float, default=0.5, help="Mean seconds per call for --backend fake")
+    ap.add_argument("--fake-failure-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--max-quota-failures", type=int, default=10,
+                    help="Stop after this many consecutive quota errors")
+    ap.add_argument("--progress-every", type=int, default=25)
+    return ap.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
@@ -0,0 +1,320 @@
+# jadehire_engagement.py
+"""Post-offer engagement: persistent candidate store, due-checkpoint queue and daily scheduler.
+
+    python jadehire_engagement.py              # run today's due checkpoints once (cron-friendly)
+    python jadehire_engagement.py --fake       # same, with fake LLM + mail backends
+"""
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ENGAGEMENT_DB_PATH = os.getenv("ENGAGEMENT_DB_PATH", ".jadehire_cache/engagement.sqlite3")
+ENGAGEMENT_WORKERS = int(os.getenv("ENGAGEMENT_WORKERS", "8"))
+ENGAGEMENT_RUN_HOUR = int(os.getenv("ENGAGEMENT_RUN_HOUR", "9"))      # local hour of the daily run
+ENGAGEMENT_GRACE_DAYS = int(os.getenv("ENGAGEMENT_GRACE_DAYS", "3"))  # older missed checkpoints are skipped
+
+# Checkpoint -> offset in days from the joining date
+CHECKPOINTS = {"T-30": -30, "T-15": -15, "T-7": -7, "T-1": -1, "T+7": 7}
+
+ENGAGEMENT_PROMPT = """
+    Draft a warm, short email to {name} who accepted {role}.
+    Their Day 1 is in {days_left} days. Encourage them.
+    """
+
+def engagement_prompt(name: str, role: str, days_left: int) -> str:
+    return ENGAGEMENT_PROMPT.format(name=name, role=role, days_left=days_left)
+
+def engagement_subject(checkpoint: str) -> str:
+    return f"[JadeHire] Engagement — {checkpoint}"
+
+def checkpoint_dates(join_date: datetime.date) -> dict:
+    return {cp: join_date + datetime.timedelta(days=off) for cp, off in CHECKPOINTS.items()}
+
+# ---------------------------
+# Store
+# ---------------------------
+class EngagementStore:
+    """Candidates in flight plus one row per (candidate, checkpoint), indexed by (status, due_date).
+
+    Checkpoint status moves pending -> drafted -> sending -> sent (or failed/skipped).
+    A row is claimed as `sending` before the email goes out and is never
+    picked up again, so reruns cannot double-send.
+    """
+
+    def __init__(self, path: str = ENGAGEMENT_DB_PATH):
+        self.lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS candidates (
+                       id INTEGER PRIMARY KEY, name TEXT, email TEXT UNIQUE, role TEXT, join_date TEXT
+                   )"""
+            )
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS checkpoints (
+                       candidate_id INTEGER, checkpoint TEXT, due_date TEXT,
+                       status TEXT DEFAULT 'pending', draft TEXT, message_id TEXT, error TEXT,
+                       attempts INTEGER DEFAULT 0, updated REAL,
+                       PRIMARY KEY (candidate_id, checkpoint)
+                   )"""
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS checkpoints_due ON checkpoints(status, due_date)")
+
+    def upsert_candidate(self, name: str, email: str, role: str, join_date: datetime.date) -> int:
+        """Add or update a candidate; unsent checkpoints follow a changed joining date."""
+        email = email.strip().lower()
+        with self.lock, self.conn:
+            self.conn.execute(
+                """INSERT INTO candidates (name, email, role, join_date) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(email) DO UPDATE SET name = excluded.name, role = excluded.role,
+                                                    join_date = excluded.join_date""",
+                (name, email, role, join_date.isoformat()),
+            )
+            cid = self.conn.execute("SELECT id FROM candidates WHERE email = ?", (email,)).fetchone()[0]
+            for cp, due in checkpoint_dates(join_date).items():
+                self.conn.execute(
+                    """INSERT INTO checkpoints (candidate_id, checkpoint, due_date, updated) VALUES (?, ?, ?, ?)
+                       ON CONFLICT(candidate_id, checkpoint) DO UPDATE SET due_date = excluded.due_date,
+                           updated = excluded.updated,
+                           status = CASE WHEN status IN ('pending', 'drafted', 'skipped', 'failed')
+                                         THEN 'pending' ELSE status END,
+                           draft = CASE WHEN status IN ('sending', 'sent') THEN draft ELSE NULL END
+                       WHERE checkpoints.due_date != excluded.due_date""",
+                    (cid, cp, due.isoformat(), time.time()),
+                )
+            return cid
+
+    def remove_candidate(self, email: str):
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT id FROM candidates WHERE email = ?", (email.strip().lower(),)).fetchone()
+            if row:
+                self.conn.execute("DELETE FROM checkpoints WHERE candidate_id = ?", row)
+                self.conn.execute("DELETE FROM candidates WHERE id = ?", row)
+
+    def candidates(self) -> list:
+        with self.lock:
+            rows = self.conn.execute("SELECT id, name, email, role, join_date FROM candidates ORDER BY join_date").fetchall()
+        return [dict(zip(("id", "name", "email", "role", "join_date"), r)) for r in rows]
+
+    def checkpoint_rows(self, candidate_id: int = None) -> list:
+        sql = """SELECT c.name, c.email, k.checkpoint, k.due_date, k.status, k.attempts, k.error
+                 FROM checkpoints k JOIN candidates c ON c.id = k.candidate_id"""
+        args = ()
+        if candidate_id is not None:
+            sql += " WHERE k.candidate_id = ?"
+            args = (candidate_id,)
+        with self.lock:
+            rows = self.conn.execute(sql + " ORDER BY k.due_date, c.email", args).fetchall()
+        return [dict(zip(("name", "email", "checkpoint", "due_date", "status", "attempts", "error"), r)) for r in rows]
+
+    def status_counts(self) -> dict:
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM checkpoints GROUP BY status").fetchall())
+
+    def due(self, today: datetime.date, grace_days: int = ENGAGEMENT_GRACE_DAYS) -> list:
+        """Pending/drafted/failed checkpoints due today (or within the grace window); stale ones are skipped."""
+        oldest = (today - datetime.timedelta(days=grace_days)).isoformat()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE checkpoints SET status = 'skipped', updated = ? "
+                "WHERE status IN ('pending', 'drafted', 'failed') AND due_date < ?",
+                (time.time(), oldest),
+            )
+            rows = self.conn.execute(
+                """SELECT k.candidate_id, k.checkpoint, k.due_date, k.draft, c.name, c.email, c.role, c.join_date
+                   FROM checkpoints k JOIN candidates c ON c.id = k.candidate_id
+                   WHERE k.status IN ('pending', 'drafted', 'failed') AND k.due_date <= ?
+                   ORDER BY k.due_date""",
+                (today.isoformat(),),
+            ).fetchall()
+        keys = ("candidate_id", "checkpoint", "due_date", "draft", "name", "email", "role", "join_date")
+        return [dict(zip(keys, r)) for r in rows]
+
+    def save_draft(self, candidate_id: int, checkpoint: str, draft: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE checkpoints SET draft = ?, status = 'drafted', updated = ? "
+                "WHERE candidate_id = ? AND checkpoint = ? AND status IN ('pending', 'failed')",
+                (draft, time.time(), candidate_id, checkpoint),
+            )
+
+    def claim(self, candidate_id: int, checkpoint: str) -> bool:
+        """Atomically move a drafted (or previously failed) row to `sending`; False if already claimed."""
+        with self.lock, self.conn:
+            cur = self.conn.execute(
+                "UPDATE checkpoints SET status = 'sending', attempts = attempts + 1, updated = ? "
+                "WHERE candidate_id = ? AND checkpoint = ? AND status IN ('drafted', 'failed')",
+                (time.time(), candidate_id, checkpoint),
+            )
+            return cur.rowcount == 1
+
+    def mark_sent(self, candidate_id: int, checkpoint: str, message_id: str = ""):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE checkpoints SET status = 'sent', message_id = ?, error = NULL, updated = ? "
+                "WHERE candidate_id = ? AND checkpoint = ?",
+                (message_id, time.time(), candidate_id, checkpoint),
+            )
+
+    def mark_failed(self, candidate_id: int, checkpoint: str, error: str):
+        """A definite send failure goes back in the queue (the draft is kept) for the next run."""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE checkpoints SET status = 'failed', error = ?, updated = ? "
+                "WHERE candidate_id = ? AND checkpoint = ?",
+                (error[:500], time.time(), candidate_id, checkpoint),
+            )
+
+# ---------------------------
+# Daily run
+# ---------------------------
+def run_due_checkpoints(store: EngagementStore, draft_fn, send_fn, today: datetime.date = None,
+                        workers: int = ENGAGEMENT_WORKERS) -> dict:
+    """Draft every due checkpoint concurrently, then send them in one bulk call.
+
+    `draft_fn(name, role, days_left) -> str`; `send_fn([(to, subject, body), ...])`
+    returns per-message results with `.ok`, `.message_id` and `.error`
+    (see jadehire_google.send_bulk_emails).
+    """
+    today = today or datetime.date.today()
+    due = store.due(today)
+    report = {"due": len(due), "drafted": 0, "sent": 0, "failed": 0, "draft_errors": 0}
+
+    def draft(row):
+        if row["draft"]:
+            return row, row["draft"], None
+        days_left = (datetime.date.fromisoformat(row["join_date"]) - today).days
+        try:
+            return row, draft_fn(row["name"], row["role"], days_left), None
+        except Exception as ex:
+            return row, None, f"{type(ex).__name__}: {ex}"
+
+    ready = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for row, text, err in pool.map(draft, due):
+            if err:
+                report["draft_errors"] += 1
+                store.mark_failed(row["candidate_id"], row["checkpoint"], err)
+                continue
+            if not row["draft"]:
+                store.save_draft(row["candidate_id"], row["checkpoint"], text)
+                report["drafted"] += 1
+            if store.claim(row["candidate_id"], row["checkpoint"]):
+                ready.append((row, text))
+
+    results = send_fn([(row["email"], engagement_subject(row["checkpoint"]), text) for row, text in ready])
+    for (row, _), res in zip(ready, results):
+        if res.ok:
+            store.mark_sent(row["candidate_id"], row["checkpoint"], res.message_id)
+            report["sent"] += 1
+        else:
+            store.mark_failed(row["candidate_id"], row["checkpoint"], res.error)
+            report["failed"] += 1
+    return report
+
+
+class EngagementScheduler(threading.Thread):
+    """Daemon thread that runs `run_due_checkpoints` once a day at ENGAGEMENT_RUN_HOUR."""
+
+    def __init__(self, store: EngagementStore, draft_fn, send_fn, run_hour: int = ENGAGEMENT_RUN_HOUR):
+        super().__init__(name="jadehire-engagement", daemon=True)
+        self.store = store
+        self.draft_fn = draft_fn
+        self.send_fn = send_fn
+        self.run_hour = run_hour
+        self.stop_event = threading.Event()
+        self.last_run = None
+        self.last_report = None
+        self.last_error = ""
+
+    def next_run(self, now: datetime.datetime = None) -> datetime.datetime:
+        now = now or datetime.datetime.now()
+        run_at = now.replace(hour=self.run_hour, minute=0, second=0, microsecond=0)
+        if self.last_run == now.date():
+            run_at += datetime.timedelta(days=1)
+        return run_at  # already past and not yet run today -> runs immediately (safe: runs are idempotent)
+
+    def run(self):
+        while not self.stop_event.is_set():
+            wait = (self.next_run() - datetime.datetime.now()).total_seconds()
+            if wait > 0 and self.stop_event.wait(min(wait, 3600)):
+                break
+            if wait > 0:
+                continue
+            try:
+                self.last_report = run_due_checkpoints(self.store, self.draft_fn, self.send_fn)
+                self.last_error = ""
+            except Exception as ex:
+                self.last_error = f"{type(ex).__name__}: {ex}"
+            self.last_run = datetime.date.today()
+
+    def stop(self):
+        self.stop_event.set()
+
+
+_STORE = None
+_SCHEDULER = None
+_LOCK = threading.Lock()
+
+def _store_locked() -> EngagementStore:
+    global _STORE
+    if _STORE is None:
+        _STORE = EngagementStore()
+    return _STORE
+
+def get_engagement_store() -> EngagementStore:
+    with _LOCK:
+        return _store_locked()
+
+def start_scheduler(draft_fn, send_fn) -> EngagementScheduler:
+    """Start the process-wide scheduler once (later calls return the running one)."""
+    global _SCHEDULER
+    with _LOCK:
+        if _SCHEDULER is None or not _SCHEDULER.is_alive():
+            _SCHEDULER = EngagementScheduler(_store_locked(), draft_fn, send_fn)
+            _SCHEDULER.start()
+        return _SCHEDULER
+
+# ---------------------------
+# CLI
+# ---------------------------
+def _fake_send(messages):
+    from jadehire_google import MailResult
+    return [MailResult(to, subject, True, message_id=f"fake-{i}", attempts=1)
+            for i, (to, subject, _) in enumerate(messages)]
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Run due post-offer engagement checkpoints.")
+    ap.add_argument("--today", type=datetime.date.fromisoformat, default=None, help="YYYY-MM-DD (default: today)")
+    ap.add_argument("--fake", action="store_true", help="Use the fake LLM and a no-op mailer")
+    ap.add_argument("--workers", type=int, default=ENGAGEMENT_WORKERS)
+    args = ap.parse_args(argv)
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    from jadehire_llm import CachedLLM, FakeModel, gemini_model, get_llm_metrics
+    llm = CachedLLM(FakeModel() if args.fake else gemini_model(), None, get_llm_metrics())
+
+    def draft_fn(name, role, days_left):
+        return llm.generate(engagement_prompt(name, role, days_left), helper="generate_ai_email").text.strip()
+
+    if args.fake:
+        send_fn = _fake_send
+    else:
+        from jadehire_google import send_bulk_emails
+        send_fn = send_bulk_emails
+    report = run_due_checkpoints(get_engagement_store(), draft_fn, send_fn, today=args.today, workers=args.workers)
+    print(json.dumps(report))
+    return 1 if report["failed"] or report["draft_errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
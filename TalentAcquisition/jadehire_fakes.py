@@ -0,0 +1,164 @@
+# jadehire_fakes.py
+"""In-process stand-ins for the Google APIs (Gmail send, Calendar events) used by benchmarks and dry runs.
+
+Kept out of jadehire_google so the app never imports them.
+"""
+import datetime
+import json
+import random
+import threading
+import time
+
+
+def _http_error(status: int, reason: str):
+    import httplib2
+    from googleapiclient.errors import HttpError
+    body = json.dumps({"error": {"code": status, "message": reason}}).encode()
+    return HttpError(httplib2.Response({"status": status}), body)
+
+
+class _FakeRequest:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def execute(self, **_):
+        return self._fn()
+
+
+class _FakeQuota:
+    """At most `qps` admitted calls per wall-clock second (0 = unlimited)."""
+
+    def __init__(self, qps: int):
+        self.qps = qps
+        self.window = (0, 0)
+
+    def admit(self) -> bool:
+        if not self.qps:
+            return True
+        second = int(time.monotonic())
+        admitted = self.window[1] if self.window[0] == second else 0
+        if admitted >= self.qps:
+            return False
+        self.window = (second, admitted + 1)
+        return True
+
+
+class FakeGmailService:
+    """In-process stand-in for the Gmail client's users().messages().send().
+
+    Each send sleeps `latency` (± `jitter`); sends beyond `qps` per second fail
+    with 429 and a random `failure_rate` share with 503, as HttpErrors, so the
+    real retry path runs. Every request is logged in `requests` as
+    (raw message, started, finished, status) for latency reports.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, qps: int = 0, failure_rate: float = 0.0,
+                 seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.quota = _FakeQuota(qps)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.sent = 0
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def send(self, userId: str = "me", body: dict = None):
+        return _FakeRequest(lambda: self._send(body or {}))
+
+    def _send(self, body: dict) -> dict:
+        started = time.perf_counter()
+        with self.lock:
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+            status = 200 if self.quota.admit() else 429
+            if status == 200 and self.rng.random() < self.failure_rate:
+                status = 503
+        time.sleep(delay if status != 429 else delay / 4)
+        with self.lock:
+            self.requests.append((body.get("raw", ""), started, time.perf_counter(), status))
+            if status == 200:
+                self.sent += 1
+                message_id = f"fake-{self.sent}"
+        if status != 200:
+            raise _http_error(status, "Too many requests" if status == 429 else "Backend error")
+        return {"id": message_id}
+
+
+class FakeCalendarService:
+    """In-process stand-in for the Calendar client's events() resource.
+
+    Holds `n_events` synthetic interviews (candidate + recruiter attendees)
+    served `maxResults` per page with syncToken incremental sync; every
+    request sleeps `latency`. `touch(n)` reschedules n events so the next
+    incremental sync has something to pull.
+    """
+
+    def __init__(self, n_events: int = 1000, candidates: int = 200, latency: float = 0.05, seed: int = 0):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.version = 0
+        self.by_id, self.changed = {}, {}
+        self.candidates = [f"candidate{i:05d}@example.com" for i in range(candidates)]
+        base = datetime.datetime(2025, 1, 6, 9, tzinfo=datetime.timezone.utc)
+        for i in range(n_events):
+            start = base + datetime.timedelta(hours=self.rng.randrange(24 * 365))
+            self._put({
+                "id": f"ev{i:07d}",
+                "summary": f"Interview #{i}",
+                "start": {"dateTime": start.isoformat().replace("+00:00", "Z")},
+                "end": {"dateTime": (start + datetime.timedelta(hours=1)).isoformat().replace("+00:00", "Z")},
+                "attendees": [{"email": self.rng.choice(self.candidates)}, {"email": "recruiter@example.com"}],
+            })
+        self.requests = 0
+
+    def _put(self, event: dict):
+        self.version += 1
+        self.by_id[event["id"]] = event
+        self.changed[event["id"]] = self.version
+
+    def events(self):
+        return self
+
+    def list(self, calendarId: str = "primary", syncToken: str = None, pageToken: str = None,
+             maxResults: int = 250, **_):
+        return _FakeRequest(lambda: self._list(syncToken, pageToken, maxResults))
+
+    def _list(self, sync_token, page_token, max_results) -> dict:
+        time.sleep(self.latency)
+        with self.lock:
+            self.requests += 1
+            since = int(sync_token) if sync_token else 0
+            ids = sorted(i for i, v in self.changed.items() if v > since)
+            start = int(page_token or 0)
+            res = {"items": [dict(self.by_id[i]) for i in ids[start:start + max_results]]}
+            if start + max_results < len(ids):
+                res["nextPageToken"] = str(start + max_results)
+            else:
+                res["nextSyncToken"] = str(self.version)
+        return res
+
+    def insert(self, calendarId: str = "primary", body: dict = None, sendUpdates: str = None):
+        def run():
+            time.sleep(self.latency)
+            with self.lock:
+                self.requests += 1
+                event = dict(body or {}, id=f"ev{len(self.by_id):07d}")
+                self._put(event)
+            return event
+        return _FakeRequest(run)
+
+    def touch(self, count: int):
+        with self.lock:
+            for event_id in self.rng.sample(sorted(self.by_id), min(count, len(self.by_id))):
+                event = dict(self.by_id[event_id])
+                start = datetime.datetime.fromisoformat(event["start"]["dateTime"].replace("Z", "+00:00"))
+                start += datetime.timedelta(days=1)
+                event["start"] = {"dateTime": start.isoformat().replace("+00:00", "Z")}
+                self._put(event)
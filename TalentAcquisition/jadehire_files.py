@@ -0,0 +1,274 @@
+# jadehire_files.py
+"""Text extraction for uploaded resumes/JDs with a content-addressed cache."""
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# In-memory tier size (characters of extracted text) and optional disk tier.
+TEXT_CACHE_MEM_CHARS = int(os.getenv("TEXT_CACHE_MEM_CHARS", str(50_000_000)))
+TEXT_CACHE_DIR = os.getenv("TEXT_CACHE_DIR", ".jadehire_cache/text")  # "" disables the disk tier
+TEXT_CACHE_DISK_BYTES = int(os.getenv("TEXT_CACHE_DISK_BYTES", str(500 * 1024 * 1024)))
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 2)))
+# Extraction stops after this many PDF pages / characters per document (0 = unlimited).
+EXTRACT_MAX_PAGES = int(os.getenv("EXTRACT_MAX_PAGES", "15"))
+EXTRACT_MAX_CHARS = int(os.getenv("EXTRACT_MAX_CHARS", "120000"))
+
+# ---------------------------
+# Extraction
+# ---------------------------
+def file_kind(name: str) -> str:
+    name = name.lower()
+    for ext in ("docx", "pdf", "txt"):
+        if name.endswith("." + ext):
+            return ext
+    return "txt"
+
+def _is_text_page(text: str) -> bool:
+    """False for pages that are empty or mostly noise (e.g. a scanned image with a junk text layer)."""
+    stripped = "".join(text.split())
+    if len(stripped) < 20:
+        return False
+    return sum(ch.isalnum() for ch in stripped) / len(stripped) >= 0.5
+
+def iter_text(kind: str, data: bytes, max_pages: int = EXTRACT_MAX_PAGES):
+    """Yield text a page (PDF), paragraph/table row (DOCX) or line (TXT) at a time.
+
+    DOCX paragraphs and table rows come out in document order. Unlike PDF and
+    TXT, DOCX is not memory-capped: python-docx parses the whole document
+    before the first piece is yielded, so the caps only bound the output.
+    """
+    if kind == "docx":
+        from docx import Document
+        from docx.oxml.ns import qn
+        from docx.table import Table
+        from docx.text.paragraph import Paragraph
+        doc = Document(io.BytesIO(data))
+        for child in doc.element.body.iterchildren():
+            if child.tag == qn("w:p"):
+                yield Paragraph(child, doc).text
+            elif child.tag == qn("w:tbl"):
+                for row in Table(child, doc).rows:
+                    yield " | ".join(dict.fromkeys(c.text.strip() for c in row.cells if c.text.strip()))
+    elif kind == "pdf":
+        import PyPDF2
+        reader = PyPDF2.PdfReader(io.BytesIO(data))
+        for i, page in enumerate(reader.pages):
+            if max_pages and i >= max_pages:
+                break
+            text = page.extract_text() or ""
+            if _is_text_page(text):
+                yield text
+    else:
+        yield from io.StringIO(data.decode("utf-8", errors="ignore"))
+
+def extract_text(kind: str, data: bytes, max_pages: int = EXTRACT_MAX_PAGES,
+                 max_chars: int = EXTRACT_MAX_CHARS) -> str:
+    """Extract plain text from TXT/DOCX/PDF bytes (runs in worker processes).
+
+    Pages are read one at a time and extraction stops at `max_pages` /
+    `max_chars`, so a 40-page CV or a scanned PDF never costs more than the cap.
+    """
+    if kind not in ("docx", "pdf"):
+        data = data[:max_chars * 4] if max_chars else data  # at most 4 UTF-8 bytes per character
+    parts, size = [], 0
+    for piece in iter_text(kind, data, max_pages):
+        piece = piece.rstrip("\n")
+        parts.append(piece)
+        size += len(piece) + 1
+        if max_chars and size >= max_chars:
+            break
+    text = "\n".join(parts)
+    return text[:max_chars] if max_chars else text
+
+def _file_bytes(uploaded_file) -> bytes:
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    data = uploaded_file.read()
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+    return data
+
+def cache_key(kind: str, data: bytes) -> str:
+    """Content hash plus the extraction limits, so changing a limit re-extracts."""
+    return f"{kind}-{EXTRACT_MAX_PAGES}p{EXTRACT_MAX_CHARS}c-{hashlib.sha256(data).hexdigest()}"
+
+# ---------------------------
+# Two-tier cache
+# ---------------------------
+class TextCache:
+    """LRU of extracted text keyed by content hash, backed by an optional disk tier."""
+
+    def __init__(self, max_chars: int = TEXT_CACHE_MEM_CHARS, disk_dir: str = TEXT_CACHE_DIR,
+                 disk_max_bytes: int = TEXT_CACHE_DISK_BYTES):
+        self.max_chars = max_chars
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.mem = OrderedDict()
+        self.chars = 0
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key + ".txt")
+
+    def get(self, key: str):
+        with self.lock:
+            if key in self.mem:
+                self.mem.move_to_end(key)
+                self.hits += 1
+                return self.mem[key]
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                os.utime(path)  # keep recently used files away from eviction
+            except OSError:
+                text = None
+            if text is not None:
+                self._remember(key, text)
+                with self.lock:
+                    self.hits += 1
+                return text
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, text: str):
+        self._remember(key, text)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+            self._evict_disk()
+
+    def _remember(self, key: str, text: str):
+        with self.lock:
+            if key in self.mem:
+                self.chars -= len(self.mem.pop(key))
+            self.mem[key] = text
+            self.chars += len(text)
+            while self.chars > self.max_chars and len(self.mem) > 1:
+                _, old = self.mem.popitem(last=False)
+                self.chars -= len(old)
+
+    def _evict_disk(self):
+        """Drop least recently used files until the disk tier fits its size budget."""
+        try:
+            entries = [e for e in os.scandir(self.disk_dir) if e.name.endswith(".txt")]
+        except OSError:
+            return
+        stats = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entries]
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in sorted(stats):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+_CACHE = None
+_POOL = None
+_LOCK = threading.Lock()
+
+def get_text_cache() -> TextCache:
+    global _CACHE
+    with _LOCK:
+        if _CACHE is None:
+            _CACHE = TextCache()
+        return _CACHE
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=max(1, EXTRACT_WORKERS))
+        return _POOL
+
+# ---------------------------
+# Public readers
+# ---------------------------
+class LocalFile:
+    """Minimal upload-like wrapper so files on disk go through the same readers."""
+
+    def __init__(self, path: str, name: str = None):
+        self.path = path
+        self.name = name or path
+
+    def getvalue(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+def read_file_content(uploaded_file):
+    """Extract plain text from TXT/DOCX/PDF uploads (cached by content hash)."""
+    kind = file_kind(uploaded_file.name)
+    data = _file_bytes(uploaded_file)
+    cache = get_text_cache()
+    key = cache_key(kind, data)
+    text = cache.get(key)
+    if text is None:
+        text = extract_text(kind, data)
+        cache.put(key, text)
+    return text
+
+def _extract_or_error(kind: str, data: bytes, max_pages: int = EXTRACT_MAX_PAGES,
+                      max_chars: int = EXTRACT_MAX_CHARS) -> tuple:
+    """(text, "") or (None, error) - one unreadable file must not fail a whole batch."""
+    try:
+        return extract_text(kind, data, max_pages, max_chars), ""
+    except Exception as ex:
+        return None, f"{type(ex).__name__}: {ex}"
+
+def read_many(uploaded_files, errors: dict = None) -> dict:
+    """Extract many uploads at once; cache misses are parsed in parallel worker processes.
+
+    Files that cannot be parsed are left out of the result and recorded in
+    `errors` ({name: "ErrorType: message"}) when given; failures are never cached.
+    """
+    cache = get_text_cache()
+    out, pending = {}, {}
+    for f in uploaded_files:
+        kind = file_kind(f.name)
+        data = _file_bytes(f)
+        key = cache_key(kind, data)
+        text = cache.get(key)
+        if text is None:
+            pending.setdefault(key, (kind, data, []))[2].append(f.name)
+        else:
+            out[f.name] = text
+
+    if len(pending) == 1 or EXTRACT_WORKERS <= 1:
+        done = {key: _extract_or_error(kind, data) for key, (kind, data, _) in pending.items()}
+    elif pending:
+        pool = _get_pool()
+        futures = {key: pool.submit(_extract_or_error, kind, data, EXTRACT_MAX_PAGES, EXTRACT_MAX_CHARS)
+                   for key, (kind, data, _) in pending.items()}
+        done = {}
+        for key, fut in futures.items():
+            try:
+                done[key] = fut.result()
+            except Exception as ex:  # e.g. a worker process killed while parsing
+                done[key] = None, f"{type(ex).__name__}: {ex}"
+    else:
+        done = {}
+
+    for key, (text, error) in done.items():
+        if text is not None:
+            cache.put(key, text)
+        for name in pending[key][2]:
+            if text is None:
+                if errors is not None:
+                    errors[name] = error
+            else:
+                out[name] = text
+    return {f.name: out[f.name] for f in uploaded_files if f.name in out}
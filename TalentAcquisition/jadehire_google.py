@@ -0,0 +1,354 @@
+# jadehire_google.py
+"""Process-wide Google OAuth credentials and API clients (Calendar + Gmail)."""
+import base64
+import datetime
+import json
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from email.mime.text import MIMEText
+
+# Combined scope for Calendar + Gmail
+SCOPES = [
+    "https://www.googleapis.com/auth/calendar",
+    "https://www.googleapis.com/auth/gmail.send",
+]
+TOKEN_PATH = os.getenv("GOOGLE_TOKEN_PATH", "token.pickle")
+CLIENT_SECRET_PATH = os.getenv("GOOGLE_CLIENT_SECRET", "client_secret_deep_personal.json")
+DISCOVERY_CACHE_DIR = os.getenv("DISCOVERY_CACHE_DIR", ".jadehire_cache/discovery")
+# Optional endpoint override, e.g. a local fake Gmail server for load tests
+GMAIL_API_ENDPOINT = os.getenv("GMAIL_API_ENDPOINT", "")
+MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", "8"))
+MAIL_RETRIES = int(os.getenv("MAIL_RETRIES", "4"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# 403 reasons Gmail uses for per-user / per-message quota; retried like 429
+RETRY_403_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+_LOCK = threading.RLock()
+_CREDS = None
+_SERVICES = {}     # (api, version) -> service object shared by every session/thread
+_DOCS = {}         # (api, version) -> parsed discovery document
+_HTTP = threading.local()
+
+# ---------------------------
+# Credentials
+# ---------------------------
+def _save_credentials(creds):
+    with open(TOKEN_PATH, "wb") as f:
+        pickle.dump(creds, f)
+
+def get_credentials():
+    """Load token.pickle once, refresh it in place when expired, run OAuth only as a last resort."""
+    global _CREDS
+    with _LOCK:
+        if _CREDS is None and os.path.exists(TOKEN_PATH):
+            with open(TOKEN_PATH, "rb") as f:
+                _CREDS = pickle.load(f)
+        creds = _CREDS
+        if creds and creds.valid:
+            return creds
+        if creds and creds.expired and creds.refresh_token:
+            from google.auth.transport.requests import Request
+            try:
+                creds.refresh(Request())
+                _save_credentials(creds)
+                return creds
+            except Exception:
+                pass  # refresh token revoked/expired -> fall through to a new consent flow
+        from google_auth_oauthlib.flow import InstalledAppFlow
+        flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_PATH, SCOPES)
+        _CREDS = flow.run_local_server(port=0)
+        _save_credentials(_CREDS)
+        _SERVICES.clear()
+        return _CREDS
+
+# ---------------------------
+# Discovery documents + services
+# ---------------------------
+def _discovery_doc(api_name: str, api_version: str) -> dict:
+    """Discovery doc from memory, then the local cache dir, then the bundled/remote copy."""
+    key = (api_name, api_version)
+    if key in _DOCS:
+        return _DOCS[key]
+    path = os.path.join(DISCOVERY_CACHE_DIR, f"{api_name}.{api_version}.json")
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    else:
+        from googleapiclient import discovery, discovery_cache
+        text = discovery_cache.get_static_doc(api_name, api_version)
+        if text is None:
+            import httplib2
+            url = discovery.V2_DISCOVERY_URI.format(api=api_name, apiVersion=api_version)
+            _, content = httplib2.Http().request(url)
+            text = content.decode("utf-8")
+        os.makedirs(DISCOVERY_CACHE_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+    _DOCS[key] = json.loads(text)
+    return _DOCS[key]
+
+def _thread_http():
+    """One authorized HTTP connection per thread (httplib2 is not thread-safe)."""
+    creds = get_credentials()
+    if getattr(_HTTP, "creds", None) is not creds:
+        import google_auth_httplib2
+        import httplib2
+        _HTTP.http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+        _HTTP.creds = creds
+    return _HTTP.http
+
+def _request_builder(http, *args, **kwargs):
+    from googleapiclient.http import HttpRequest
+    return HttpRequest(_thread_http(), *args, **kwargs)
+
+def get_google_service(api_name: str, api_version: str):
+    """Shared API client per (api, version); safe to use from any session or thread."""
+    with _LOCK:
+        key = (api_name, api_version)
+        if key not in _SERVICES:
+            from googleapiclient.discovery import build_from_document
+            endpoint = GMAIL_API_ENDPOINT if api_name == "gmail" else ""
+            _SERVICES[key] = build_from_document(
+                _discovery_doc(api_name, api_version),
+                credentials=get_credentials(),
+                requestBuilder=_request_builder,
+                client_options={"api_endpoint": endpoint} if endpoint else None,
+            )
+        return _SERVICES[key]
+
+# ---------------------------
+# Gmail
+# ---------------------------
+@dataclass
+class MailResult:
+    to: str
+    subject: str
+    ok: bool
+    message_id: str = ""
+    error: str = ""
+    attempts: int = 0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+def _build_message(to_email: str, subject: str, message_text: str) -> dict:
+    msg = MIMEText(message_text)
+    msg["to"] = to_email
+    msg["subject"] = subject
+    return {"raw": base64.urlsafe_b64encode(msg.as_bytes()).decode()}
+
+def _error_reasons(ex) -> set:
+    """`reason` values from a Google API error body ({"error": {"errors": [{"reason": ...}]}})."""
+    try:
+        content = ex.content.decode("utf-8") if isinstance(ex.content, bytes) else ex.content
+        error = json.loads(content).get("error", {})
+    except (AttributeError, TypeError, ValueError):
+        return set()
+    if not isinstance(error, dict):
+        return set()
+    reasons = {e.get("reason") for e in error.get("errors", []) if isinstance(e, dict)}
+    reasons.update(d.get("reason") for d in error.get("details", []) if isinstance(d, dict))
+    return {r for r in reasons if r}
+
+def _retry_delay(ex, attempt: int) -> float:
+    """Seconds to wait before retrying `ex`, or None if it is not retryable."""
+    from googleapiclient.errors import HttpError
+    if isinstance(ex, HttpError):
+        status = ex.resp.status
+        if status not in RETRY_STATUSES and not (status == 403 and _error_reasons(ex) & RETRY_403_REASONS):
+            return None
+        retry_after = ex.resp.get("retry-after")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+    elif not isinstance(ex, (OSError, TimeoutError)):
+        return None
+    return random.uniform(0, min(32.0, 2.0 ** attempt))  # exponential backoff, full jitter
+
+def _send_with_retry(service, to_email: str, subject: str, message_text: str, retries: int) -> MailResult:
+    body = _build_message(to_email, subject, message_text)
+    for attempt in range(retries + 1):
+        try:
+            sent = service.users().messages().send(userId="me", body=body).execute()
+            return MailResult(to_email, subject, True, message_id=sent.get("id", ""), attempts=attempt + 1)
+        except Exception as ex:
+            delay = _retry_delay(ex, attempt) if attempt < retries else None
+            if delay is None:
+                return MailResult(to_email, subject, False, error=f"{type(ex).__name__}: {ex}", attempts=attempt + 1)
+            time.sleep(delay)
+
+def send_email_gmail(to_email: str, subject: str, message_text: str):
+    service = get_google_service("gmail", "v1")
+    result = _send_with_retry(service, to_email, subject, message_text, MAIL_RETRIES)
+    if not result.ok:
+        raise RuntimeError(result.error)
+    return {"id": result.message_id}
+
+def send_bulk_emails(messages, max_workers: int = MAIL_WORKERS, retries: int = MAIL_RETRIES,
+                     service=None) -> list:
+    """Send [(to, subject, body), ...] through a bounded worker pool.
+
+    Returns one MailResult per message, in input order; transient Gmail
+    errors (429/5xx, 403 rate-limit reasons, network) are retried with
+    jittered exponential backoff.
+    """
+    messages = list(messages)
+    if not messages:
+        return []
+    service = service or get_google_service("gmail", "v1")
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(messages)))) as pool:
+        return list(pool.map(lambda m: _send_with_retry(service, m[0], m[1], m[2], retries), messages))
+
+# ---------------------------
+# Calendar: local event store + incremental sync
+# ---------------------------
+CALENDAR_STORE_PATH = os.getenv("CALENDAR_STORE_PATH", ".jadehire_cache/calendar.sqlite3")
+CALENDAR_SYNC_SECONDS = int(os.getenv("CALENDAR_SYNC_SECONDS", "60"))
+
+def _event_start_utc(event: dict) -> str:
+    """Sortable UTC ISO timestamp of an event's start (all-day events start at 00:00 UTC)."""
+    start = event.get("start", {})
+    if start.get("dateTime"):
+        dt = datetime.datetime.fromisoformat(start["dateTime"].replace("Z", "+00:00"))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=datetime.timezone.utc)
+        return dt.astimezone(datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+    if start.get("date"):
+        return start["date"] + "T00:00:00"
+    return ""
+
+def _utc_key(dt: datetime.datetime) -> str:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+class CalendarStore:
+    """SQLite mirror of one calendar, kept current with Calendar `syncToken` incremental sync."""
+
+    def __init__(self, path: str = CALENDAR_STORE_PATH, calendar_id: str = "primary"):
+        self.calendar_id = calendar_id
+        self.lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS events (id TEXT PRIMARY KEY, start TEXT, body TEXT)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS events_start ON events(start)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS attendees (email TEXT, event_id TEXT)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS attendees_email ON attendees(email)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS attendees_event ON attendees(event_id)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS sync_state (calendar_id TEXT PRIMARY KEY, sync_token TEXT, synced_at REAL)"
+            )
+
+    # ----- local writes -----
+    def _upsert(self, event: dict):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO events (id, start, body) VALUES (?, ?, ?)",
+            (event["id"], _event_start_utc(event), json.dumps(event)),
+        )
+        self.conn.execute("DELETE FROM attendees WHERE event_id = ?", (event["id"],))
+        emails = {a["email"].lower() for a in event.get("attendees", []) if a.get("email")}
+        self.conn.executemany(
+            "INSERT INTO attendees (email, event_id) VALUES (?, ?)", [(e, event["id"]) for e in emails]
+        )
+
+    def _delete(self, event_id: str):
+        self.conn.execute("DELETE FROM events WHERE id = ?", (event_id,))
+        self.conn.execute("DELETE FROM attendees WHERE event_id = ?", (event_id,))
+
+    def upsert(self, event: dict):
+        """Record an event we just created/updated so reads see it before the next sync."""
+        with self.lock, self.conn:
+            self._upsert(event)
+
+    # ----- sync -----
+    def _state(self):
+        row = self.conn.execute(
+            "SELECT sync_token, synced_at FROM sync_state WHERE calendar_id = ?", (self.calendar_id,)
+        ).fetchone()
+        return row or (None, 0.0)
+
+    def sync(self, service=None, max_age: int = CALENDAR_SYNC_SECONDS, force: bool = False) -> int:
+        """Pull changes since the last sync (full paged sync the first time); returns events changed."""
+        from googleapiclient.errors import HttpError
+        with self.lock:
+            token, synced_at = self._state()
+            if not force and token and time.time() - synced_at < max_age:
+                return 0
+            service = service or get_google_service("calendar", "v3")
+            try:
+                return self._pull(service, token)
+            except HttpError as ex:
+                if ex.resp.status != 410:  # 410 Gone: sync token expired -> start over
+                    raise
+                with self.conn:
+                    self.conn.execute("DELETE FROM events")
+                    self.conn.execute("DELETE FROM attendees")
+                return self._pull(service, None)
+
+    def _pull(self, service, token) -> int:
+        changed, page_token = 0, None
+        while True:
+            params = {"calendarId": self.calendar_id, "singleEvents": True, "maxResults": 2500}
+            if token:
+                params["syncToken"] = token
+            if page_token:
+                params["pageToken"] = page_token
+            res = service.events().list(**params).execute()
+            with self.conn:
+                for event in res.get("items", []):
+                    if event.get("status") == "cancelled":
+                        self._delete(event["id"])
+                    else:
+                        self._upsert(event)
+                    changed += 1
+            page_token = res.get("nextPageToken")
+            if not page_token:
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO sync_state (calendar_id, sync_token, synced_at) VALUES (?, ?, ?)",
+                        (self.calendar_id, res.get("nextSyncToken"), time.time()),
+                    )
+                return changed
+
+    # ----- local reads -----
+    def events_between(self, start: datetime.datetime, end: datetime.datetime) -> list:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT body FROM events WHERE start >= ? AND start < ? ORDER BY start",
+                (_utc_key(start), _utc_key(end)),
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def events_for_attendee(self, email: str, start: datetime.datetime = None,
+                            end: datetime.datetime = None) -> list:
+        sql = "SELECT e.body FROM attendees a JOIN events e ON e.id = a.event_id WHERE a.email = ?"
+        args = [email.strip().lower()]
+        if start:
+            sql += " AND e.start >= ?"
+            args.append(_utc_key(start))
+        if end:
+            sql += " AND e.start < ?"
+            args.append(_utc_key(end))
+        with self.lock:
+            rows = self.conn.execute(sql + " ORDER BY e.start", args).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+
+_CAL_STORE = None
+
+def get_calendar_store() -> CalendarStore:
+    """Process-wide store for the primary calendar."""
+    global _CAL_STORE
+    with _LOCK:
+        if _CAL_STORE is None:
+            _CAL_STORE = CalendarStore()
+        return _CAL_STORE
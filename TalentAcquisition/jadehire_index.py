@@ -0,0 +1,231 @@
+# jadehire_index.py
+"""Persistent local BM25 (+ optional embedding) index used to shortlist resumes before the LLM."""
+import hashlib
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+RESUME_INDEX_PATH = os.getenv("RESUME_INDEX_PATH", ".jadehire_cache/resume_index.sqlite3")
+RESUME_EMBED_MODEL = os.getenv("RESUME_EMBED_MODEL", "")  # e.g. "all-MiniLM-L6-v2"; "" = BM25 only
+# Pruning: drop resumes not ranked for this many days, then the oldest beyond the cap (0 = off)
+RESUME_INDEX_MAX_AGE_DAYS = float(os.getenv("RESUME_INDEX_MAX_AGE_DAYS", "90"))
+RESUME_INDEX_MAX_DOCS = int(os.getenv("RESUME_INDEX_MAX_DOCS", "20000"))
+
+log = logging.getLogger(__name__)
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the to was were will with
+you your we our they their this these those i me my he she his her them not but if then than so
+""".split())
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens; keeps skill spellings like c++, c#, node.js."""
+    return [t.rstrip(".") for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS and len(t) > 1]
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+
+
+class _Embedder:
+    """Optional sentence-transformers encoder (only loaded when RESUME_EMBED_MODEL is set)."""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+
+    def encode(self, texts: list) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+
+class ResumeIndex:
+    """Incrementally updatable BM25 index over extracted resume text, persisted in SQLite."""
+
+    def __init__(self, path: str = RESUME_INDEX_PATH, embed_model: str = RESUME_EMBED_MODEL):
+        self.lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs (doc_id INTEGER PRIMARY KEY, key TEXT UNIQUE, length INTEGER, "
+                "embedding BLOB, last_seen REAL)"
+            )
+            if "last_seen" not in {row[1] for row in self.conn.execute("PRAGMA table_info(docs)")}:
+                self.conn.execute("ALTER TABLE docs ADD COLUMN last_seen REAL")  # index built before pruning
+                self.conn.execute("UPDATE docs SET last_seen = ?", (time.time(),))
+            self.conn.execute("CREATE TABLE IF NOT EXISTS postings (term TEXT, doc_id INTEGER, tf INTEGER)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS postings_term ON postings(term)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS postings_doc ON postings(doc_id)")
+        self.embedder = None
+        if embed_model:
+            try:
+                self.embedder = _Embedder(embed_model)
+            except ImportError as exc:
+                log.warning("RESUME_EMBED_MODEL=%s is set but sentence-transformers could not be imported (%s); "
+                            "ranking with BM25 only.", embed_model, exc)
+        self._load()
+
+    def _load(self):
+        self.doc_ids = {}           # key -> row position
+        self.lengths = []
+        self.embeddings = []
+        self.postings = {}          # term -> ([row positions], [tf])
+        self._arrays = {}           # term -> (np ids, np tf), rebuilt lazily
+        rows = self.conn.execute("SELECT doc_id, key, length, embedding FROM docs ORDER BY doc_id").fetchall()
+        pos_of = {}
+        for doc_id, key, length, emb in rows:
+            pos_of[doc_id] = len(self.lengths)
+            self.doc_ids[key] = len(self.lengths)
+            self.lengths.append(length)
+            self.embeddings.append(np.frombuffer(emb, dtype=np.float32) if emb else None)
+        for term, doc_id, tf in self.conn.execute("SELECT term, doc_id, tf FROM postings"):
+            ids, tfs = self.postings.setdefault(term, ([], []))
+            ids.append(pos_of[doc_id])
+            tfs.append(tf)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def add(self, texts: list) -> list:
+        """Index any texts not seen before and mark all of them as seen; returns the row position of every text."""
+        with self.lock:
+            keys = [text_key(t) for t in texts]
+            new = [t for t in dict.fromkeys(texts) if text_key(t) not in self.doc_ids]
+            vectors = self.embedder.encode(new) if (self.embedder and new) else [None] * len(new)
+            now = time.time()
+            with self.conn:
+                self.conn.executemany("UPDATE docs SET last_seen = ? WHERE key = ?",
+                                      [(now, k) for k in dict.fromkeys(keys) if k in self.doc_ids])
+                for text, vec in zip(new, vectors):
+                    counts = Counter(tokenize(text))
+                    length = sum(counts.values())
+                    cur = self.conn.execute(
+                        "INSERT INTO docs (key, length, embedding, last_seen) VALUES (?, ?, ?, ?)",
+                        (text_key(text), length, vec.tobytes() if vec is not None else None, now),
+                    )
+                    self.conn.executemany(
+                        "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                        [(term, cur.lastrowid, tf) for term, tf in counts.items()],
+                    )
+                    pos = len(self.lengths)
+                    self.doc_ids[text_key(text)] = pos
+                    self.lengths.append(length)
+                    self.embeddings.append(vec)
+                    for term, tf in counts.items():
+                        ids, tfs = self.postings.setdefault(term, ([], []))
+                        ids.append(pos)
+                        tfs.append(tf)
+                        self._arrays.pop(term, None)
+            return [self.doc_ids[k] for k in keys]
+
+    def prune(self, max_age_days: float = RESUME_INDEX_MAX_AGE_DAYS, max_docs: int = RESUME_INDEX_MAX_DOCS) -> int:
+        """Delete resumes not ranked in `max_age_days`, then the least recently seen beyond `max_docs`.
+
+        Either limit is off when 0. Returns the number of resumes removed.
+        """
+        with self.lock:
+            with self.conn:
+                stale = []
+                if max_age_days:
+                    stale += [r[0] for r in self.conn.execute(
+                        "SELECT doc_id FROM docs WHERE last_seen < ?", (time.time() - max_age_days * 86400,))]
+                if max_docs:
+                    stale += [r[0] for r in self.conn.execute(
+                        "SELECT doc_id FROM docs ORDER BY last_seen DESC, doc_id DESC LIMIT -1 OFFSET ?",
+                        (max_docs,))]
+                stale = sorted(set(stale))
+                for i in range(0, len(stale), 500):
+                    chunk = stale[i:i + 500]
+                    marks = ", ".join("?" * len(chunk))
+                    self.conn.execute(f"DELETE FROM postings WHERE doc_id IN ({marks})", chunk)
+                    self.conn.execute(f"DELETE FROM docs WHERE doc_id IN ({marks})", chunk)
+            if stale:
+                self._load()
+            return len(stale)
+
+    def _term_arrays(self, term: str):
+        arr = self._arrays.get(term)
+        if arr is None:
+            ids, tfs = self.postings[term]
+            arr = (np.asarray(ids, dtype=np.int64), np.asarray(tfs, dtype=np.float32))
+            self._arrays[term] = arr
+        return arr
+
+    def bm25(self, query: str, positions=None) -> np.ndarray:
+        """BM25 score of `query` against the documents at `positions` (default: all), in that order.
+
+        Document frequencies and the average length come from those documents only, so
+        a pool is scored the same whatever else has been indexed before.
+        """
+        pool = np.arange(len(self.lengths)) if positions is None else np.asarray(positions, dtype=np.int64)
+        docs, slots = np.unique(pool, return_inverse=True)
+        n = len(docs)
+        scores = np.zeros(n, dtype=np.float32)
+        if not n:
+            return scores
+        slot_of = np.full(len(self.lengths), -1, dtype=np.int64)
+        slot_of[docs] = np.arange(n)
+        lengths = np.asarray(self.lengths, dtype=np.float32)[docs]
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1.0))
+        for term, qtf in Counter(tokenize(query)).items():
+            if term not in self.postings:
+                continue
+            ids, tf = self._term_arrays(term)
+            slot = slot_of[ids]
+            hit = slot >= 0
+            df = int(hit.sum())
+            if not df:
+                continue
+            slot, tf = slot[hit], tf[hit]
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            scores[slot] += qtf * idf * tf * (BM25_K1 + 1) / (tf + norm[slot])
+        return scores[slots]
+
+    def rank(self, jd_text: str, resumes: dict, top_k: int = None, min_score: float = 0.0) -> list:
+        """Rank `resumes` (name -> text) against the JD; returns [(name, score 0-100)] best first.
+
+        Scores are BM25 over this pool (IDF and average length from these resumes only),
+        relative to the best resume, blended 50/50 with cosine similarity when local
+        embeddings are enabled.
+        """
+        if not resumes:
+            return []
+        names = list(resumes)
+        positions = self.add([resumes[n] for n in names])
+        with self.lock:
+            raw = self.bm25(jd_text, positions)
+            best = raw.max()
+            scores = raw / best * 100 if best > 0 else raw
+            if self.embedder is not None:
+                q = self.embedder.encode([jd_text])[0]
+                vecs = [self.embeddings[p] for p in positions]
+                if all(v is not None for v in vecs):
+                    cosine = np.clip(np.stack(vecs) @ q, 0, 1) * 100
+                    scores = 0.5 * scores + 0.5 * cosine
+        order = np.argsort(-scores, kind="stable")
+        ranked = [(names[i], round(float(scores[i]), 1)) for i in order if scores[i] >= min_score]
+        return ranked[:top_k] if top_k else ranked
+
+
+_INDEX = None
+_INDEX_LOCK = threading.Lock()
+
+def get_resume_index() -> ResumeIndex:
+    """Process-wide resume index shared by all Streamlit sessions (pruned once when opened)."""
+    global _INDEX
+    with _INDEX_LOCK:
+        if _INDEX is None:
+            _INDEX = ResumeIndex()
+            _INDEX.prune()
+        return _INDEX
@@ -0,0 +1,476 @@
+# jadehire_llm.py
+"""Single entry point for Gemini calls: persistent response cache plus call metrics."""
+import csv
+import hashlib
+import io
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from jadehire_prompt import count_tokens
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".jadehire_cache/llm_cache.sqlite3")
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+LLM_METRICS_PATH = os.getenv("LLM_METRICS_PATH", ".jadehire_cache/llm_metrics.sqlite3")
+LLM_RETRIES = int(os.getenv("LLM_RETRIES", "2"))
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+RETRY_STATUSES = {429, 500, 503, 504}
+
+# ---------------------------
+# Response cache
+# ---------------------------
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so indentation-only differences share a cache entry."""
+    return " ".join(prompt.split())
+
+def cache_key(model_name: str, prompt: str, params: dict = None) -> str:
+    payload = json.dumps(
+        {"model": model_name, "prompt": normalize_prompt(prompt), "params": params or {}},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed response cache with TTL and max-size (LRU) eviction."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, ttl: int = LLM_CACHE_TTL,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            if path != ":memory:":
+                self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_cache (
+                       key TEXT PRIMARY KEY,
+                       model TEXT,
+                       response TEXT,
+                       created REAL,
+                       last_used REAL
+                   )"""
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache(last_used)")
+
+    def get(self, key: str):
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT response, created FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] <= self.ttl:
+                self.conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+                self.hits += 1
+                return row[0]
+            if row:
+                self.conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self.misses += 1
+            return None
+
+    def put(self, key: str, model_name: str, response: str):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, response, now, now),
+            )
+            self.conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl,))
+            self.conn.execute(
+                """DELETE FROM llm_cache WHERE key IN (
+                       SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+# ---------------------------
+# Call metrics
+# ---------------------------
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+class LLMMetrics:
+    """Persists one row per model call (real token counts, latency, retries, errors) in SQLite."""
+
+    COLUMNS = ["ts", "helper", "model", "prompt_tokens", "output_tokens", "latency_ms", "retries", "error", "cached"]
+
+    def __init__(self, path: str = LLM_METRICS_PATH):
+        self.lock = threading.Lock()
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self.lock, self.conn:
+            if path != ":memory:":
+                self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_calls (
+                       ts REAL, helper TEXT, model TEXT,
+                       prompt_tokens INTEGER, output_tokens INTEGER,
+                       latency_ms REAL, retries INTEGER, error TEXT, cached INTEGER
+                   )"""
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS llm_calls_ts ON llm_calls(ts)")
+
+    def record(self, helper: str, model: str, prompt_tokens: int = 0, output_tokens: int = 0,
+               latency_ms: float = 0.0, retries: int = 0, error: str = "", cached: bool = False):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO llm_calls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), helper, model, prompt_tokens, output_tokens, latency_ms, retries, error, int(cached)),
+            )
+
+    def _rows(self, since: float, helper: str = None) -> list:
+        sql = "SELECT " + ", ".join(self.COLUMNS) + " FROM llm_calls WHERE ts >= ?"
+        args = [since]
+        if helper:
+            sql += " AND helper = ?"
+            args.append(helper)
+        with self.lock:
+            return self.conn.execute(sql + " ORDER BY ts", args).fetchall()
+
+    @staticmethod
+    def _summarize(rows: list, window_s: float) -> dict:
+        live = [r for r in rows if not r[8]]  # provider calls only; cache hits cost nothing
+        latencies = sorted(r[5] for r in live if not r[7])
+        return {
+            "calls": len(live),
+            "cache_hits": len(rows) - len(live),
+            "errors": sum(1 for r in live if r[7]),
+            "retries": sum(r[6] for r in live),
+            "prompt_tokens": sum(r[3] for r in live),
+            "output_tokens": sum(r[4] for r in live),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "p99_ms": percentile(latencies, 99),
+            "calls_per_min": len(live) / max(window_s / 60, 1e-9),
+        }
+
+    def summary(self, since: float = 0.0, min_window_s: float = 60.0) -> dict:
+        """Totals since `since`; calls_per_min uses a window of at least `min_window_s` (0 = real elapsed time)."""
+        rows = self._rows(since)
+        start = since or (rows[0][0] if rows else time.time())
+        return self._summarize(rows, max(time.time() - start, min_window_s))
+
+    def by_helper(self, since: float = 0.0) -> list:
+        rows = self._rows(since)
+        start = since or (rows[0][0] if rows else time.time())
+        window = max(time.time() - start, 60)
+        groups = {}
+        for r in rows:
+            groups.setdefault(r[1], []).append(r)
+        return [{"helper": h, **self._summarize(g, window)} for h, g in sorted(groups.items())]
+
+    def timeseries(self, since: float = 0.0, bucket_s: int = 3600) -> list:
+        """Calls and tokens per time bucket (provider calls only)."""
+        with self.lock:
+            rows = self.conn.execute(
+                """SELECT CAST(ts / ? AS INTEGER) * ?, COUNT(*), SUM(prompt_tokens), SUM(output_tokens)
+                   FROM llm_calls WHERE ts >= ? AND cached = 0 GROUP BY 1 ORDER BY 1""",
+                (bucket_s, bucket_s, since),
+            ).fetchall()
+        return [{"bucket": b, "calls": c, "prompt_tokens": p or 0, "output_tokens": o or 0} for b, c, p, o in rows]
+
+    def export_csv(self, since: float = 0.0) -> str:
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(self.COLUMNS)
+        writer.writerows(self._rows(since))
+        return buf.getvalue()
+
+    def export_prometheus(self) -> str:
+        """Prometheus text exposition of lifetime counters and latency quantiles per helper."""
+        lines = []
+        for h in self.by_helper():
+            label = f'helper="{h["helper"]}"'
+            lines += [
+                f'jadehire_llm_calls_total{{{label}}} {h["calls"]}',
+                f'jadehire_llm_cache_hits_total{{{label}}} {h["cache_hits"]}',
+                f'jadehire_llm_errors_total{{{label}}} {h["errors"]}',
+                f'jadehire_llm_retries_total{{{label}}} {h["retries"]}',
+                f'jadehire_llm_prompt_tokens_total{{{label}}} {h["prompt_tokens"]}',
+                f'jadehire_llm_output_tokens_total{{{label}}} {h["output_tokens"]}',
+            ]
+            for q in (50, 95, 99):
+                lines.append(f'jadehire_llm_latency_ms{{{label},quantile="0.{q}"}} {h[f"p{q}_ms"]:.1f}')
+        return "\n".join(lines) + "\n"
+
+# ---------------------------
+# Model backends
+# ---------------------------
+def gemini_model(model_name: str = GEMINI_MODEL):
+    """Configure google.generativeai from GEMINI_API_KEY and return a GenerativeModel."""
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    return genai.GenerativeModel(model_name)
+
+
+class _FakeUsage:
+    def __init__(self, prompt_tokens: int, output_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+
+
+class _FakeResponse:
+    def __init__(self, text: str, usage: _FakeUsage, chunks: list = None, delay: float = 0.0):
+        self.text = text
+        self.usage_metadata = usage
+        self._chunks = chunks or [text]
+        self._delay = delay
+
+    def __iter__(self):
+        for piece in self._chunks:
+            time.sleep(self._delay)
+            yield _FakeResponse(piece, self.usage_metadata)
+
+
+class FakeModel:
+    """Offline stand-in for GenerativeModel with simulated latency and failures.
+
+    JSON-mode screening prompts get a deterministic match score derived from
+    JD/resume word overlap; everything else gets a short canned reply. With
+    `rpm` set, calls beyond rpm/60 in any one-second window fail with 429 like
+    the real per-minute quota.
+    """
+
+    model_name = "fake-gemini"
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 0,
+                 rpm: int = 0):
+        import random
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.per_second = math.ceil(rpm / 60) if rpm else 0
+        self.window = (0, 0)  # (second, calls admitted in it)
+        self.throttled = 0
+
+    def _reply(self, prompt: str, generation_config: dict = None) -> str:
+        if (generation_config or {}).get("response_mime_type") == "application/json" and "Job Description:" in prompt:
+            jd, _, resume = prompt.partition("Job Description:")[2].partition("Candidate Resume")
+            jd_words, cv_words = set(jd.lower().split()), set(resume.lower().split())
+            match = int(100 * len(jd_words & cv_words) / max(len(jd_words), 1))
+            return json.dumps({"match": match, "summary": f"{match}% keyword overlap with the JD.",
+                               "strengths": sorted(jd_words & cv_words)[:3], "gaps": sorted(jd_words - cv_words)[:3]})
+        return "Dear candidate,\n\nThis is a simulated response.\n\nBest regards,\nJadeHire"
+
+    def generate_content(self, prompt: str, generation_config: dict = None, stream: bool = False):
+        with self.lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+            fail = self.rng.random() < self.failure_rate
+            if self.per_second:
+                second = int(time.monotonic())
+                admitted = self.window[1] if self.window[0] == second else 0
+                if admitted >= self.per_second:
+                    self.throttled += 1
+                    fail = True
+                else:
+                    self.window = (second, admitted + 1)
+        if fail:
+            time.sleep(delay / 2)
+            err = RuntimeError("simulated 429 RESOURCE_EXHAUSTED")
+            err.code = 429
+            raise err
+        text = self._reply(prompt, generation_config)
+        usage = _FakeUsage(count_tokens(prompt), count_tokens(text))
+        if stream:
+            words = text.split(" ")
+            chunks = [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+            return _FakeResponse(text, usage, chunks, delay / max(len(chunks), 1))
+        time.sleep(delay)
+        return _FakeResponse(text, usage)
+
+# ---------------------------
+# Cached model wrapper
+# ---------------------------
+@dataclass
+class LLMResponse:
+    text: str
+    cached: bool = False
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+    latency_ms: float = 0.0
+
+
+def _is_retryable(ex) -> bool:
+    return getattr(ex, "code", None) in RETRY_STATUSES or isinstance(ex, (ConnectionError, TimeoutError))
+
+def usage_tokens(resp) -> tuple:
+    """(prompt, output) token counts reported by the provider for a response."""
+    usage = getattr(resp, "usage_metadata", None)
+    if usage is None:
+        return 0, 0
+    return int(getattr(usage, "prompt_token_count", 0) or 0), int(getattr(usage, "candidates_token_count", 0) or 0)
+
+
+class CachedLLM:
+    """Wraps a genai GenerativeModel; every helper should call the model through here."""
+
+    def __init__(self, model, cache: LLMCache = None, metrics: LLMMetrics = None, retries: int = LLM_RETRIES,
+                 limiter=None):
+        self.model = model
+        self.cache = cache
+        self.metrics = metrics
+        self.retries = retries
+        self.limiter = limiter  # anything with .acquire(); only provider calls are throttled, not cache hits
+        self.model_name = getattr(model, "model_name", type(model).__name__)
+
+    def _record(self, helper: str, **kwargs):
+        if self.metrics is not None:
+            self.metrics.record(helper or "unknown", self.model_name, **kwargs)
+
+    def generate(self, prompt: str, generation_config: dict = None, bypass_cache: bool = False,
+                 helper: str = "") -> LLMResponse:
+        """Return the model's text for `prompt`; `bypass_cache` forces a fresh call (and refreshes the entry).
+
+        `helper` names the calling function in the metrics store. Transient
+        provider errors (429/5xx) are retried with exponential backoff.
+        """
+        key = cache_key(self.model_name, prompt, generation_config)
+        if self.cache is not None and not bypass_cache:
+            text = self.cache.get(key)
+            if text is not None:
+                self._record(helper, cached=True)
+                return LLMResponse(text, cached=True)
+
+        kwargs = {"generation_config": generation_config} if generation_config else {}
+        started = time.perf_counter()
+        for attempt in range(self.retries + 1):
+            try:
+                if self.limiter is not None:
+                    self.limiter.acquire()
+                resp = self.model.generate_content(prompt, **kwargs)
+                text = resp.text
+                break
+            except Exception as ex:
+                if attempt < self.retries and _is_retryable(ex):
+                    time.sleep(min(2 ** attempt, 16))
+                    continue
+                self._record(helper, latency_ms=(time.perf_counter() - started) * 1000, retries=attempt,
+                             error=f"{type(ex).__name__}: {ex}"[:500])
+                raise
+        latency_ms = (time.perf_counter() - started) * 1000
+        prompt_tokens, output_tokens = usage_tokens(resp)
+        self._record(helper, prompt_tokens=prompt_tokens, output_tokens=output_tokens,
+                     latency_ms=latency_ms, retries=attempt)
+        if self.cache is not None:
+            self.cache.put(key, self.model_name, text)
+        return LLMResponse(text, prompt_tokens=prompt_tokens, output_tokens=output_tokens, latency_ms=latency_ms)
+
+
+    def stream(self, prompt: str, generation_config: dict = None, bypass_cache: bool = False,
+               helper: str = "", cancel: threading.Event = None):
+        """Yield text chunks as the model produces them (a cache hit yields the whole text at once).
+
+        The final text is cached and metered exactly like `generate`. Closing the
+        generator early, or setting `cancel`, stops the upstream request and
+        nothing is cached.
+        """
+        key = cache_key(self.model_name, prompt, generation_config)
+        if self.cache is not None and not bypass_cache:
+            text = self.cache.get(key)
+            if text is not None:
+                self._record(helper, cached=True)
+                yield text
+                return
+
+        kwargs = {"generation_config": generation_config} if generation_config else {}
+        started = time.perf_counter()
+        parts, resp, attempt, completed, failed = [], None, 0, False, False
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    if self.limiter is not None:
+                        self.limiter.acquire()
+                    resp = self.model.generate_content(prompt, stream=True, **kwargs)
+                    for chunk in resp:
+                        if cancel is not None and cancel.is_set():
+                            return
+                        piece = chunk.text
+                        parts.append(piece)
+                        yield piece
+                    completed = True
+                    break
+                except Exception as ex:
+                    if not parts and attempt < self.retries and _is_retryable(ex):
+                        time.sleep(min(2 ** attempt, 16))
+                        continue
+                    failed = True
+                    self._record(helper, latency_ms=(time.perf_counter() - started) * 1000, retries=attempt,
+                                 error=f"{type(ex).__name__}: {ex}"[:500])
+                    raise
+        finally:
+            latency_ms = (time.perf_counter() - started) * 1000
+            if completed:
+                prompt_tokens, output_tokens = usage_tokens(resp)
+                self._record(helper, prompt_tokens=prompt_tokens, output_tokens=output_tokens,
+                             latency_ms=latency_ms, retries=attempt)
+                if self.cache is not None:
+                    self.cache.put(key, self.model_name, "".join(parts))
+            elif resp is not None and not failed:
+                _cancel_stream(resp)
+                self._record(helper, latency_ms=latency_ms, retries=attempt, error="cancelled")
+
+
+def _cancel_stream(resp):
+    """Best-effort abort of an in-flight streaming response (gRPC call or HTTP iterator)."""
+    iterator = getattr(resp, "_iterator", None)
+    for name in ("cancel", "close"):
+        fn = getattr(iterator, name, None)
+        if callable(fn):
+            try:
+                fn()
+            except Exception:
+                pass
+            return
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+def get_llm_cache() -> LLMCache:
+    """Process-wide response cache shared by all Streamlit sessions."""
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = LLMCache()
+        return _CACHE
+
+
+_METRICS = None
+
+def get_llm_metrics() -> LLMMetrics:
+    """Process-wide metrics store shared by all Streamlit sessions."""
+    global _METRICS
+    with _CACHE_LOCK:
+        if _METRICS is None:
+            _METRICS = LLMMetrics()
+        return _METRICS
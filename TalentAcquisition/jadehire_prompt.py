@@ -0,0 +1,228 @@
+# jadehire_prompt.py
+"""Local token counting and budget-aware packing of documents into LLM prompts."""
+import math
+import os
+import re
+import string
+import threading
+import unicodedata
+from collections import Counter
+
+# Total prompt tokens per call (template + JD + resume) and the JD's guaranteed share of it.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "8000"))
+JD_TOKEN_SHARE = float(os.getenv("JD_TOKEN_SHARE", "0.35"))
+# Standardization rewrites the whole resume, so it gets its own, much larger budget (0 = cleanup only).
+STANDARDIZE_TOKEN_BUDGET = int(os.getenv("STANDARDIZE_TOKEN_BUDGET", "32000"))
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")  # tiktoken encoding; "" = built-in estimate
+
+# ---------------------------
+# Token counting
+# ---------------------------
+_ENCODER = None
+_ENCODER_LOCK = threading.Lock()
+
+# Pieces a BPE tokenizer typically emits separately: words, digit runs, symbols, non-Latin characters.
+_PIECE_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+def _get_encoder():
+    """tiktoken encoder if installed (and its vocab is available), else False."""
+    global _ENCODER
+    with _ENCODER_LOCK:
+        if _ENCODER is None:
+            _ENCODER = False
+            if TOKENIZER_ENCODING:
+                try:
+                    import tiktoken
+                    _ENCODER = tiktoken.get_encoding(TOKENIZER_ENCODING)
+                except Exception:
+                    pass
+        return _ENCODER
+
+def _estimate_tokens(text: str) -> int:
+    """BPE-shaped estimate: long words split every ~4 letters, digits every 3, each symbol is one."""
+    total = 0
+    for piece in _PIECE_RE.findall(text):
+        if piece[0].isdigit():
+            total += math.ceil(len(piece) / 3)
+        elif piece[0].isascii() and piece[0].isalpha():
+            total += 1 if len(piece) <= 6 else math.ceil(len(piece) / 4)
+        else:
+            total += 1
+    return total
+
+def count_tokens(text: str) -> int:
+    """Number of tokens `text` will cost in a prompt."""
+    if not text:
+        return 0
+    enc = _get_encoder()
+    if enc:
+        return len(enc.encode(text, disallowed_special=()))
+    return _estimate_tokens(text)
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of `text` within `max_tokens`, cut at a line break where possible."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    enc = _get_encoder()
+    if enc:
+        cut = enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+    else:
+        lo, hi = 0, len(text)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if _estimate_tokens(text[:mid]) <= max_tokens:
+                lo = mid
+            else:
+                hi = mid - 1
+        cut = text[:lo]
+    nl = cut.rfind("\n")
+    return cut[:nl] if nl > len(cut) // 2 else cut
+
+# ---------------------------
+# Cleaning
+# ---------------------------
+_BOILERPLATE_RE = re.compile(
+    r"^(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*(of|/)\s*\d+|\d{1,3}|curriculum vitae|resume|r[eé]sum[eé]"
+    r"|references (are )?available( up)?on request\.?|confidential)$",
+    re.IGNORECASE,
+)
+_SPACE_RE = re.compile(r"[ \t\u00a0\u2000-\u200b\u3000]+")
+
+def _is_junk(line: str) -> bool:
+    """OCR/extraction noise: mostly symbols, or a bare bullet/rule."""
+    if len(line) <= 2:
+        return not any(ch.isalnum() for ch in line)
+    useful = sum(ch.isalnum() or ch.isspace() for ch in line)
+    return useful / len(line) < 0.5
+
+def clean_text(text: str, repeat_limit: int = 3) -> str:
+    """Collapse whitespace and drop page furniture, junk lines and repeated headers/footers.
+
+    A line seen `repeat_limit` or more times (e.g. a name/phone footer on every
+    page) is kept only at its first occurrence.
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    lines = []
+    for raw in text.splitlines():
+        line = _SPACE_RE.sub(" ", "".join(ch for ch in raw if ch.isprintable() or ch == "\t")).strip()
+        if line and (_BOILERPLATE_RE.match(line) or _is_junk(line)):
+            continue
+        lines.append(line)
+    counts = Counter(line for line in lines if line)
+    out, seen, blank = [], set(), False
+    for line in lines:
+        if not line:
+            if out and not blank:
+                out.append("")
+            blank = True
+            continue
+        if counts[line] >= repeat_limit and line in seen:
+            continue
+        if out and out[-1] == line:
+            continue
+        seen.add(line)
+        out.append(line)
+        blank = False
+    return "\n".join(out).strip()
+
+# ---------------------------
+# Sections + packing
+# ---------------------------
+_HEADING_WORDS = frozenset("""
+summary profile objective about experience employment work history career professional education
+academic qualifications skills technical competencies expertise projects certifications certificates
+licenses awards achievements publications languages interests training courses volunteer references
+""".split())
+
+def _is_heading(line: str) -> bool:
+    if not line or len(line) > 48 or line.endswith((".", ",", ";")):
+        return False
+    words = re.findall(r"[A-Za-z]+", line)
+    if not words or len(words) > 5:
+        return False
+    if line.endswith(":") or (line.isupper() and len(line) > 3):
+        return True
+    return any(w.lower() in _HEADING_WORDS for w in words) and all(w[0].isupper() for w in words)
+
+def split_sections(text: str) -> list:
+    """Split cleaned resume text into blocks at heading lines; block 0 is the header (name, contact)."""
+    sections, current = [], []
+    for line in text.splitlines():
+        if _is_heading(line) and any(current):
+            sections.append("\n".join(current).strip())
+            current = []
+        current.append(line)
+    if any(current):
+        sections.append("\n".join(current).strip())
+    return [s for s in sections if s]
+
+def _relevance(sections: list, query: str) -> list:
+    """BM25 score of each section against the query."""
+    from jadehire_index import BM25_B, BM25_K1, tokenize  # lazy: keeps numpy off the app's startup path
+    terms = set(tokenize(query))
+    docs = [Counter(tokenize(s)) for s in sections]
+    n = len(docs)
+    avg_len = sum(sum(d.values()) for d in docs) / max(n, 1) or 1.0
+    df = Counter(t for d in docs for t in d if t in terms)
+    scores = []
+    for d in docs:
+        length = sum(d.values())
+        score = 0.0
+        for t in terms & d.keys():
+            idf = math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5))
+            score += idf * d[t] * (BM25_K1 + 1) / (d[t] + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_len))
+        scores.append(score)
+    return scores
+
+def pack_sections(text: str, budget: int, query: str = "") -> str:
+    """Fit `text` into `budget` tokens, keeping its header and the sections most relevant to `query`.
+
+    Sections keep their original order; whatever budget is left after whole
+    sections is spent on a truncated copy of the best section that did not fit. Without a query the text is simply truncated.
+    """
+    text = clean_text(text)
+    if count_tokens(text) <= budget:
+        return text
+    sections = split_sections(text)
+    if not query or len(sections) < 2:
+        return truncate_tokens(text, budget)
+    sizes = [count_tokens(s) + 1 for s in sections]
+    scores = _relevance(sections, query)
+    order = [0] + sorted(range(1, len(sections)), key=lambda i: (-scores[i], sizes[i], i))
+    keep, skipped, left = {}, [], budget
+    for i in order:
+        if sizes[i] <= left:
+            keep[i] = sections[i]
+            left -= sizes[i]
+        else:
+            skipped.append(i)
+    if skipped and left >= 32:
+        i = skipped[0]
+        keep[i] = truncate_tokens(sections[i], left - 1)
+    return "\n\n".join(keep[i] for i in sorted(keep) if keep[i])
+
+def pack_pair(primary: str, secondary: str, budget: int, primary_share: float = JD_TOKEN_SHARE,
+              relevant: bool = True) -> tuple:
+    """Split `budget` between two documents, e.g. (JD, resume) or (format sample, resume).
+
+    `primary` is cleaned and guaranteed `primary_share` of the budget (more when
+    `secondary` is short); `secondary` gets the rest, packed by relevance to
+    `primary` when `relevant` is set.
+    """
+    primary = clean_text(primary)
+    sec_clean = clean_text(secondary)
+    p_tokens, s_tokens = count_tokens(primary), count_tokens(sec_clean)
+    if p_tokens + s_tokens <= budget:
+        return primary, sec_clean
+    p_budget = min(p_tokens, max(int(budget * primary_share), budget - s_tokens))
+    primary = truncate_tokens(primary, p_budget)
+    left = budget - count_tokens(primary)
+    return primary, pack_sections(sec_clean, left, query=primary if relevant else "")
+
+def fit_prompt(template: str, budget: int = PROMPT_TOKEN_BUDGET, **fixed) -> int:
+    """Tokens left for variable content once `template` (formatted with `fixed` and empty slots) is counted."""
+    slots = {name: "" for _, name, _, _ in string.Formatter().parse(template) if name}
+    slots.update(fixed)
+    return max(0, budget - count_tokens(template.format(**slots)))
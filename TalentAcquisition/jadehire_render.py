@@ -0,0 +1,227 @@
+# jadehire_render.py
+"""DOCX/PDF rendering of standardized resumes and the bulk standardization pipeline."""
+import io
+import os
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", str(os.cpu_count() or 2)))
+STANDARDIZE_CONCURRENCY = int(os.getenv("STANDARDIZE_CONCURRENCY", "4"))
+
+# ---------------------------
+# Text -> blocks
+# ---------------------------
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+_BOLD_LINE_RE = re.compile(r"^\*\*([^*]+)\*\*:?$")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•●▪]|\d+[.)])\s+(.*)$")
+_BOLD_RE = re.compile(r"\*\*(.+?)\*\*")
+
+def parse_blocks(text: str) -> list:
+    """Split model output (plain text or light Markdown) into (kind, level, text) blocks.
+
+    kind is "heading", "bullet" or "para"; consecutive plain lines are joined
+    into one paragraph.
+    """
+    blocks, para = [], []
+
+    def flush():
+        if para:
+            blocks.append(("para", 0, " ".join(para)))
+            para.clear()
+
+    for raw in (text or "").replace("\r\n", "\n").split("\n"):
+        line = raw.strip()
+        if not line or set(line) <= set("-=_*"):
+            flush()
+            continue
+        m = _HEADING_RE.match(line)
+        if m:
+            flush()
+            blocks.append(("heading", min(len(m.group(1)), 3), m.group(2).strip("* ")))
+            continue
+        m = _BOLD_LINE_RE.match(line)
+        if m or (line.isupper() and len(line) <= 48 and any(ch.isalpha() for ch in line)):
+            flush()
+            blocks.append(("heading", 2, (m.group(1) if m else line).strip()))
+            continue
+        m = _BULLET_RE.match(raw)
+        if m:
+            flush()
+            blocks.append(("bullet", 0, m.group(1).strip()))
+            continue
+        para.append(line)
+    flush()
+    return blocks
+
+def _runs(text: str):
+    """Yield (text, bold) pieces for inline **bold** markup."""
+    pos = 0
+    for m in _BOLD_RE.finditer(text):
+        if m.start() > pos:
+            yield text[pos:m.start()], False
+        yield m.group(1), True
+        pos = m.end()
+    if pos < len(text):
+        yield text[pos:], False
+
+# ---------------------------
+# Renderers (run in worker processes)
+# ---------------------------
+def render_docx(text: str, title: str = "", template: bytes = None) -> bytes:
+    """Render to .docx; a .docx `template` (e.g. the Jade sample) supplies styles, headers and footers."""
+    from docx import Document
+    doc = Document(io.BytesIO(template)) if template else Document()
+    if template:
+        body = doc.element.body
+        for child in list(body):
+            if not child.tag.endswith("}sectPr"):
+                body.remove(child)
+    # Set style ids directly: python-docx resolves a style (name or object) with a scan of
+    # every style in the document per paragraph, which dominates render time on long resumes.
+    style_ids = {s.name: s.style_id for s in doc.styles}
+
+    def add(text: str = "", style: str = None):
+        para = doc.add_paragraph(text)
+        if style in style_ids:
+            para._p.style = style_ids[style]
+        return para
+
+    if title:
+        add(title, "Title")
+    for kind, level, content in parse_blocks(text):
+        if kind == "heading":
+            if f"Heading {level}" in style_ids:
+                add(content, f"Heading {level}")
+            else:
+                add().add_run(content).bold = True
+            continue
+        if kind == "bullet":
+            para = add(style="List Bullet") if "List Bullet" in style_ids else add("• ")
+        else:
+            para = add()
+        for piece, bold in _runs(content):
+            run = para.add_run(piece)
+            if bold:
+                run.bold = True
+    out = io.BytesIO()
+    doc.save(out)
+    return out.getvalue()
+
+def _pdf_markup(text: str) -> str:
+    text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+    return _BOLD_RE.sub(r"<b>\1</b>", text)
+
+def render_pdf(text: str, title: str = "") -> bytes:
+    """Render to PDF with reportlab's platypus layout (A4, wrapped paragraphs, bullets)."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    styles = getSampleStyleSheet()
+    heading = {1: styles["Heading1"], 2: styles["Heading2"], 3: styles["Heading3"]}
+    story = [Paragraph(_pdf_markup(title), styles["Title"])] if title else []
+    for kind, level, content in parse_blocks(text):
+        if kind == "heading":
+            story.append(Paragraph(_pdf_markup(content), heading[level]))
+        elif kind == "bullet":
+            story.append(Paragraph(_pdf_markup(content), styles["Normal"], bulletText="•"))
+        else:
+            story.append(Paragraph(_pdf_markup(content), styles["Normal"]))
+            story.append(Spacer(1, 4))
+    out = io.BytesIO()
+    SimpleDocTemplate(out, pagesize=A4, leftMargin=2 * cm, rightMargin=2 * cm, topMargin=2 * cm,
+                      bottomMargin=2 * cm, title=title).build(story or [Spacer(1, 1)])
+    return out.getvalue()
+
+def render_both(text: str, title: str = "", template: bytes = None) -> tuple:
+    """(docx_bytes, pdf_bytes) for one document."""
+    return render_docx(text, title, template), render_pdf(text, title)
+
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(max_workers=max(1, RENDER_WORKERS))
+        return _POOL
+
+# ---------------------------
+# Bulk standardization
+# ---------------------------
+@dataclass
+class StandardizedResume:
+    candidate: str
+    text: str = ""
+    docx: bytes = b""
+    pdf: bytes = b""
+    error: str = ""
+    warning: str = ""
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+    @property
+    def stem(self) -> str:
+        return os.path.splitext(os.path.basename(self.candidate))[0] or "resume"
+
+def _standardize_one(standardize, name: str, resume_text: str, template: bytes, render: bool) -> StandardizedResume:
+    started = time.perf_counter()
+    result = StandardizedResume(candidate=name)
+    try:
+        result.text = standardize(resume_text)
+        if render:
+            # Rendering is CPU-bound: hand it to the process pool, this thread just waits.
+            result.docx, result.pdf = _get_pool().submit(render_both, result.text, "", template).result()
+    except Exception as ex:
+        result.error = f"{type(ex).__name__}: {ex}"
+    result.seconds = round(time.perf_counter() - started, 3)
+    return result
+
+def standardize_many(standardize, resumes: dict, max_workers: int = STANDARDIZE_CONCURRENCY,
+                     template: bytes = None, render: bool = True):
+    """Standardize and render every resume concurrently, yielding results as they finish.
+
+    `standardize(resume_text) -> str` is the model call; one failure never
+    stops the batch.
+    """
+    if not resumes:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(resumes)))) as pool:
+        futures = [pool.submit(_standardize_one, standardize, name, text, template, render)
+                   for name, text in resumes.items()]
+        for fut in as_completed(futures):
+            yield fut.result()
+
+def build_zip(results) -> bytes:
+    """One ZIP with <name>_standardized.docx/.pdf per success and errors.txt for failures."""
+    out = io.BytesIO()
+    used, errors = set(), []
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+        for r in sorted(results, key=lambda r: r.candidate):
+            if not r.ok:
+                errors.append(f"{r.candidate}: {r.error}")
+                continue
+            stem, n = r.stem, 1
+            while stem in used:
+                n += 1
+                stem = f"{r.stem}_{n}"
+            used.add(stem)
+            if r.docx:
+                zf.writestr(f"{stem}_standardized.docx", r.docx)
+            if r.pdf:
+                zf.writestr(f"{stem}_standardized.pdf", r.pdf)
+            if not (r.docx or r.pdf):
+                zf.writestr(f"{stem}_standardized.txt", r.text)
+        if errors:
+            zf.writestr("errors.txt", "\n".join(errors) + "\n")
+    return out.getvalue()
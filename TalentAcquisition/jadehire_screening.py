@@ -0,0 +1,173 @@
+# jadehire_screening.py
+"""Per-candidate resume screening engine for JadeHire."""
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+
+from jadehire_prompt import PROMPT_TOKEN_BUDGET, fit_prompt, pack_pair
+
+# ---------------------------
+# Rate limiting
+# ---------------------------
+class RateLimiter:
+    """Thread-safe token bucket limiting calls to `rate_per_min`."""
+
+    def __init__(self, rate_per_min: int, burst: int = 1):
+        self.interval = 60.0 / max(rate_per_min, 1)
+        self.capacity = max(burst, 1)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call slot is available."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.interval
+            time.sleep(wait)
+
+
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+def get_shared_limiter(rate_per_min: int, burst: int = 1) -> RateLimiter:
+    """Return the process-wide limiter for a given rate (shared by all sessions)."""
+    with _LIMITERS_LOCK:
+        key = (rate_per_min, burst)
+        if key not in _LIMITERS:
+            _LIMITERS[key] = RateLimiter(rate_per_min, burst)
+        return _LIMITERS[key]
+
+# ---------------------------
+# Per-candidate records
+# ---------------------------
+@dataclass
+class CandidateResult:
+    candidate: str
+    match: int = 0
+    summary: str = ""
+    strengths: list = field(default_factory=list)
+    gaps: list = field(default_factory=list)
+    error: str = ""
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+SCREEN_PROMPT = """
+You are an AI recruiter. Compare the following job description with ONE candidate's resume
+and rate how suitable the candidate is for the role.
+
+Return JSON ONLY, exactly in this shape:
+{{
+  "match": <integer 0-100>,
+  "summary": "<short reasoning>",
+  "strengths": ["<strength>", ...],
+  "gaps": ["<gap>", ...]
+}}
+
+Job Description:
+{jd_text}
+
+Candidate Resume ({name}):
+{resume_text}
+"""
+
+def build_screen_prompt(jd_text: str, name: str, resume_text: str, token_budget: int = PROMPT_TOKEN_BUDGET) -> str:
+    """Screening prompt within `token_budget`: cleaned JD plus the resume sections most relevant to it."""
+    jd_text, resume_text = pack_pair(jd_text, resume_text, fit_prompt(SCREEN_PROMPT, token_budget, name=name))
+    return SCREEN_PROMPT.format(jd_text=jd_text, name=name, resume_text=resume_text)
+
+def parse_screen_response(name: str, text: str) -> CandidateResult:
+    """Turn the model's JSON reply into a CandidateResult (raises ValueError if unusable)."""
+    txt = text.strip().replace("```json", "").replace("```", "")
+    start, end = txt.find("{"), txt.rfind("}")
+    if start == -1 or end == -1:
+        raise ValueError("no JSON object in model response")
+    data = json.loads(txt[start:end + 1])
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+    match = data.get("match", 0)
+    if isinstance(match, str):
+        digits = re.search(r"\d+", match)
+        match = int(digits.group()) if digits else 0
+    if not isinstance(match, (int, float)):
+        raise ValueError(f"invalid match {match!r}")
+    return CandidateResult(
+        candidate=name,
+        match=max(0, min(100, int(match))),
+        summary=str(data.get("summary", "")).strip(),
+        strengths=[str(s) for s in data.get("strengths", []) or []],
+        gaps=[str(g) for g in data.get("gaps", []) or []],
+    )
+
+# ---------------------------
+# Screening engine
+# ---------------------------
+def screen_candidate(generate, jd_text: str, name: str, resume_text: str,
+                     limiter: RateLimiter = None, retries: int = 2,
+                     token_budget: int = PROMPT_TOKEN_BUDGET) -> CandidateResult:
+    """Score one resume; `generate(prompt, fresh=False) -> str` is the model call.
+
+    Only unusable replies (no valid JSON) are retried here, with `fresh=True`
+    so a cached bad reply is not served again. Provider errors (429/5xx,
+    network) propagate: `generate` is expected to own their backoff, as
+    CachedLLM does, so a quota error is not multiplied by a second retry loop.
+    """
+    started = time.perf_counter()
+    prompt = build_screen_prompt(jd_text, name, resume_text, token_budget)
+    for attempt in range(retries + 1):
+        if limiter:
+            limiter.acquire()
+        try:
+            result = parse_screen_response(name, generate(prompt, fresh=attempt > 0))
+        except ValueError:
+            if attempt == retries:
+                raise
+            continue
+        result.seconds = round(time.perf_counter() - started, 3)
+        return result
+
+def _screen_or_error(generate, jd_text: str, name: str, resume_text: str, limiter, retries: int,
+                     token_budget: int) -> CandidateResult:
+    """screen_candidate, with any failure returned as a CandidateResult so one resume never sinks the batch."""
+    started = time.perf_counter()
+    try:
+        return screen_candidate(generate, jd_text, name, resume_text, limiter, retries, token_budget)
+    except Exception as ex:
+        return CandidateResult(candidate=name, error=f"{type(ex).__name__}: {ex}",
+                               seconds=round(time.perf_counter() - started, 3))
+
+def screen_resumes(generate, jd_text: str, resumes: dict, max_workers: int = 4,
+                   limiter: RateLimiter = None, retries: int = 2, token_budget: int = PROMPT_TOKEN_BUDGET):
+    """Screen every resume concurrently, yielding CandidateResults as they finish.
+
+    `retries` applies to unusable replies only; failed candidates come back with `error` set.
+    """
+    if not resumes:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(resumes)))) as pool:
+        futures = [
+            pool.submit(_screen_or_error, generate, jd_text, name, text, limiter, retries, token_budget)
+            for name, text in resumes.items()
+        ]
+        for fut in as_completed(futures):
+            yield fut.result()
+
+def rank_results(results) -> list:
+    """Successful results by match (desc), failures last."""
+    return sorted(results, key=lambda r: (not r.ok, -r.match, r.candidate))
@@ -0,0 +1,49 @@
+# test_jadehire_cli.py
+"""python -m pytest -q test_jadehire_cli.py"""
+import json
+
+import pytest
+
+import jadehire_files
+import jadehire_index
+import jadehire_llm
+from jadehire_cli import parse_args, run
+from jadehire_files import TextCache
+from jadehire_index import ResumeIndex
+from jadehire_llm import LLMMetrics
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    monkeypatch.setattr(jadehire_files, "_CACHE", TextCache(disk_dir=str(tmp_path / "text")))
+    monkeypatch.setattr(jadehire_llm, "_METRICS", LLMMetrics(str(tmp_path / "metrics.db")))
+    monkeypatch.setattr(jadehire_index, "_INDEX", ResumeIndex(str(tmp_path / "index.db"), embed_model=""))
+
+def _lines(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line for line in f.read().splitlines() if line.strip()]
+
+@pytest.mark.parametrize("top_k", [0, 5])
+def test_corrupt_resume_is_recorded_and_rerun_resumes(tmp_path, top_k):
+    jd = tmp_path / "jd.txt"
+    jd.write_text("Data engineer: Python, Spark, Airflow", encoding="utf-8")
+    folder = tmp_path / "resumes"
+    folder.mkdir()
+    (folder / "a.txt").write_text("Jane Doe\nPython, Spark, Airflow", encoding="utf-8")
+    (folder / "b.txt").write_text("John Roe\nJava, Kafka", encoding="utf-8")
+    (folder / "c.pdf").write_bytes(b"this is not a pdf")
+    out = tmp_path / "results.jsonl"
+    argv = ["--jd", str(jd), "--resumes", str(folder), "--out", str(out), "--backend", "fake",
+            "--fake-latency", "0", "--no-cache", "--rpm", "0", "--workers", "2", "--top-k", str(top_k)]
+
+    assert run(parse_args(argv)) == 1
+    assert sorted(json.loads(l)["candidate"] for l in _lines(out)) == ["a.txt", "b.txt"]
+    errors = [json.loads(l) for l in _lines(str(out) + ".errors")]
+    assert [e["candidate"] for e in errors] == ["c.pdf"] and errors[0]["error"].startswith("unreadable:")
+    assert sorted(_lines(str(out) + ".done")) == ["a.txt", "b.txt"]
+
+    # the rerun skips what succeeded and retries only the unreadable file
+    assert run(parse_args(argv)) == 1
+    assert len(_lines(out)) == 2
+    assert [json.loads(l)["candidate"] for l in _lines(str(out) + ".errors")] == ["c.pdf"]
+    assert sorted(_lines(str(out) + ".done")) == ["a.txt", "b.txt"]
@@ -0,0 +1,60 @@
+# test_jadehire_engagement.py
+"""python -m pytest -q test_jadehire_engagement.py"""
+import datetime
+from functools import partial
+
+import pytest
+
+from jadehire_engagement import EngagementStore, run_due_checkpoints
+from jadehire_fakes import FakeGmailService
+from jadehire_google import send_bulk_emails
+
+JOIN = datetime.date(2026, 3, 31)
+T30 = JOIN - datetime.timedelta(days=30)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EngagementStore(str(tmp_path / "engagement.sqlite3"))
+    store.upsert_candidate("Jane Doe", "Jane@Example.com", "Data Engineer", JOIN)
+    return store
+
+@pytest.fixture
+def gmail():
+    return FakeGmailService(latency=0)
+
+def _run(store, gmail, today):
+    send_fn = partial(send_bulk_emails, service=gmail, retries=0)
+    return run_due_checkpoints(store, lambda name, role, days_left: f"Hi {name}, {days_left} days to go.",
+                               send_fn, today=today, workers=2)
+
+def _status(store):
+    return {r["checkpoint"]: r["status"] for r in store.checkpoint_rows()}
+
+def test_rerun_sends_each_checkpoint_once(store, gmail):
+    assert _run(store, gmail, T30)["sent"] == 1
+    assert _run(store, gmail, T30) == {"due": 0, "drafted": 0, "sent": 0, "failed": 0, "draft_errors": 0}
+    assert gmail.sent == 1 and len(gmail.requests) == 1
+    assert _status(store)["T-30"] == "sent"
+
+def test_checkpoint_stuck_in_sending_is_not_resent(store, gmail):
+    # a crash between claim and mark_sent leaves the row in `sending`
+    row = store.due(T30)[0]
+    store.save_draft(row["candidate_id"], row["checkpoint"], "draft")
+    assert store.claim(row["candidate_id"], row["checkpoint"])
+    assert _run(store, gmail, T30)["due"] == 0
+    assert gmail.sent == 0
+    assert _status(store)["T-30"] == "sending"
+
+def test_new_joining_date_requeues_only_unsent_checkpoints(store, gmail):
+    _run(store, gmail, T30)
+    later = JOIN + datetime.timedelta(days=14)
+    store.upsert_candidate("Jane Doe", "jane@example.com", "Data Engineer", later)
+    rows = {r["checkpoint"]: r for r in store.checkpoint_rows()}
+    assert rows["T-30"]["status"] == "sent"
+    assert all(r["status"] == "pending" for cp, r in rows.items() if cp != "T-30")
+    assert rows["T-15"]["due_date"] == (later - datetime.timedelta(days=15)).isoformat()
+    # the already-sent T-30 is not sent again on its new date; T-15 goes out on its own
+    assert _run(store, gmail, later - datetime.timedelta(days=30))["sent"] == 0
+    assert _run(store, gmail, later - datetime.timedelta(days=15))["sent"] == 1
+    assert gmail.sent == 2
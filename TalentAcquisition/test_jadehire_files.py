@@ -0,0 +1,55 @@
+# test_jadehire_files.py
+"""python -m pytest -q test_jadehire_files.py"""
+import io
+
+import pytest
+from docx import Document
+
+import jadehire_files
+from jadehire_files import LocalFile, TextCache, cache_key, extract_text, read_many
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = TextCache(disk_dir=str(tmp_path / "text"))
+    monkeypatch.setattr(jadehire_files, "_CACHE", cache)
+    return cache
+
+def _files(tmp_path):
+    good = tmp_path / "a.txt"
+    good.write_text("Jane Doe\nPython, Spark, Airflow", encoding="utf-8")
+    other = tmp_path / "b.txt"
+    other.write_text("John Roe\nJava, Kafka", encoding="utf-8")
+    bad = tmp_path / "c.pdf"
+    bad.write_bytes(b"this is not a pdf")
+    return [LocalFile(str(p), p.name) for p in (good, bad, other)]
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_corrupt_file_does_not_fail_the_batch(tmp_path, cache, monkeypatch, workers):
+    monkeypatch.setattr(jadehire_files, "EXTRACT_WORKERS", workers)
+    errors = {}
+    texts = read_many(_files(tmp_path), errors)
+    assert list(texts) == ["a.txt", "b.txt"]
+    assert texts["a.txt"].startswith("Jane Doe")
+    assert list(errors) == ["c.pdf"] and errors["c.pdf"]
+    # the failure is not cached: the next call parses it again and fails again
+    assert cache.get(cache_key("pdf", b"this is not a pdf")) is None
+    again = {}
+    assert list(read_many(_files(tmp_path), again)) == ["a.txt", "b.txt"]
+    assert list(again) == ["c.pdf"]
+
+def test_errors_map_is_optional(tmp_path, cache):
+    assert list(read_many(_files(tmp_path))) == ["a.txt", "b.txt"]
+
+def test_docx_tables_stay_in_document_order():
+    doc = Document()
+    doc.add_paragraph("Jane Doe")
+    doc.add_paragraph("Experience")
+    table = doc.add_table(rows=2, cols=2)
+    for r, (left, right) in enumerate([("Acme", "2019-2023"), ("Globex", "2023-")]):
+        table.cell(r, 0).text, table.cell(r, 1).text = left, right
+    doc.add_paragraph("Skills: Python, Spark")
+    buf = io.BytesIO()
+    doc.save(buf)
+    assert extract_text("docx", buf.getvalue()).splitlines() == [
+        "Jane Doe", "Experience", "Acme | 2019-2023", "Globex | 2023-", "Skills: Python, Spark"]
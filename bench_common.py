@@ -0,0 +1,130 @@
+# bench_common.py
+"""Shared plumbing for the offline benchmarks (TalentAcquisition/bench_pipeline.py,
+HealthcareCompliance/bench_sop.py): common flags, repeated scenario runs with
+per-metric medians, the JSON report and the baseline comparison.
+
+Metric naming drives the comparison: names ending in _per_s are better when
+higher, _ms when lower; max_ms is informational and _ms changes under
+--min-delta-ms are ignored as timer noise.
+"""
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# ---------------------------
+# Metrics
+# ---------------------------
+def pcts(seconds: list, prefix: str = "") -> dict:
+    """Nearest-rank p50/p95 and the max of `seconds`, in milliseconds."""
+    ms = sorted(s * 1000 for s in seconds)
+    if not ms:
+        return {f"{prefix}p50_ms": 0.0, f"{prefix}p95_ms": 0.0, f"{prefix}max_ms": 0.0}
+    pick = lambda pct: ms[min(len(ms) - 1, max(0, -(-pct * len(ms) // 100) - 1))]
+    return {f"{prefix}p50_ms": round(pick(50), 2), f"{prefix}p95_ms": round(pick(95), 2),
+            f"{prefix}max_ms": round(ms[-1], 2)}
+
+def rate(count: int, seconds: float) -> float:
+    return round(count / seconds, 2) if seconds else 0.0
+
+def median_runs(runs: list) -> dict:
+    """Per-metric median over repeated runs of one scenario."""
+    return {k: round(statistics.median(r[k] for r in runs), 2) for k in runs[0]}
+
+def compare(report: dict, baseline: dict, min_delta_ms: float = 1.0) -> list:
+    """(scenario, metric, old, new, change) per comparable metric; change > 0 means worse."""
+    rows = []
+    for scenario, metrics in report["results"].items():
+        old_metrics = baseline.get("results", {}).get(scenario, {})
+        for name, new in metrics.items():
+            old = old_metrics.get(name)
+            if not isinstance(old, (int, float)) or not old or name.endswith("max_ms") \
+                    or not name.endswith(("_per_s", "_ms")):
+                continue
+            if name.endswith("_ms"):
+                change = 0.0 if abs(new - old) < min_delta_ms else (new - old) / old
+            else:
+                change = (old - new) / old
+            rows.append((scenario, name, old, new, round(change, 3)))
+    return rows
+
+def git_commit(cwd: str) -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=cwd, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return ""
+
+# ---------------------------
+# Runner
+# ---------------------------
+def add_common_args(ap, scenarios: list):
+    """Flags every benchmark shares; add the scenario-specific ones around these."""
+    ap.add_argument("--only", default=",".join(scenarios), help="comma-separated scenarios to run")
+    ap.add_argument("--quick", action="store_true", help="small sizes for a fast smoke run")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--repeat", type=int, default=3, help="runs per scenario; the report keeps medians")
+    ap.add_argument("--out", help="write the JSON report here")
+    ap.add_argument("--baseline", help="earlier report to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    ap.add_argument("--min-delta-ms", type=float, default=1.0, help="ignore smaller latency changes")
+
+def run_scenarios(ap, args, bench: dict, workdir: str, *extra) -> dict:
+    """Run each scenario in --only --repeat times -> {scenario: median metrics}.
+
+    `bench[name](args, repdir, rng, *extra)` gets a fresh directory and an rng
+    seeded per scenario and repetition, so "cold" stays cold and runs repeat.
+    """
+    random.seed(args.seed)  # module-level random drives retry backoff jitter
+    results = {}
+    for name in [s.strip() for s in args.only.split(",") if s.strip()]:
+        if name not in bench:
+            ap.error(f"unknown scenario {name!r} (choose from {', '.join(bench)})")
+        runs = []
+        for rep in range(max(1, args.repeat)):
+            repdir = os.path.join(workdir, f"{name}_{rep}")
+            os.makedirs(repdir)
+            started = time.perf_counter()
+            runs.append(bench[name](args, repdir, random.Random(f"{args.seed}:{name}:{rep}"), *extra))
+            print(f"{name} #{rep + 1}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        results[name] = median_runs(runs)
+    return results
+
+def run(ap, args, bench: dict, title: str, cwd: str, *extra, workdir: str = None) -> int:
+    """Run the scenarios, print (and optionally save) the report, then compare with --baseline.
+
+    Returns the exit code: 1 when any metric regressed beyond --tolerance.
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix=f"{title}_bench_")
+    try:
+        results = run_scenarios(ap, args, bench, workdir, *extra)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "bench": title,
+        "commit": git_commit(cwd),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count()},
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        "results": results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        rows = compare(report, json.load(f), args.min_delta_ms)
+    for scenario, name, old, new, change in rows:
+        flag = "REGRESSED" if change > args.tolerance else ""
+        print(f"{scenario:<11} {name:<28} {old:>12} -> {new:<12} {-change:+.1%} {flag}", file=sys.stderr)
+    return 1 if any(r[4] > args.tolerance for r in rows) else 0